@@ -0,0 +1,188 @@
+"""
+Download Cache
+On-disk cache of verified downloads for the dashboard file client
+
+Contents are stored once per BLAKE2b digest (content-addressed), and an
+index maps each file name to the digest and size the server announced for
+it. Reopening a cached file sends a conditional GET_FILE (if_none_match);
+the server answers NOT_MODIFIED if the file is unchanged, so only a few
+bytes cross the network. Entries are evicted least recently used first once
+the cache exceeds max_bytes. Recency from cache hits is written to the
+index with the next put() or clear(), or at exit, not on every hit.
+"""
+import os
+import json
+import atexit
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'Nova-Link', 'files')
+DEFAULT_CACHE_SIZE = 256 * 1024 * 1024
+INDEX_NAME = 'index.json'
+
+
+class CachedFile:
+    def __init__(self, name, size, file_hash, blob_path):
+        """A cache hit, readable like a finished Download"""
+        self.name = name
+        self.file_size = size
+        self.size = size
+        self.received = size
+        self.file_hash = file_hash
+        self.verified = True
+        self.encoding = None
+        self.data = None
+        self.path = None  # not a file the user saved
+        self.blob_path = blob_path
+
+    def preview(self, limit):
+        """First limit bytes of the cached file"""
+        with open(self.blob_path, 'rb') as f:
+            return f.read(limit)
+
+
+class DownloadCache:
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_CACHE_SIZE, max_file_size=None):
+        """Cache in directory holding at most max_bytes of file contents
+
+        max_file_size: larger files are not cached (default: a quarter of
+                       max_bytes, so one file cannot flush the whole cache)
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_file_size = max_bytes // 4 if max_file_size is None else max_file_size
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()  # used from the network and UI threads
+        self._entries = OrderedDict()  # name -> {"hash", "size"}, least recently used first
+        self._dirty = False  # order changed since the index was saved
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+        atexit.register(self.flush)
+
+    # ------------------ INDEX ------------------ #
+    def _load(self):
+        try:
+            with open(os.path.join(self.directory, INDEX_NAME), encoding='utf-8') as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            entries = []
+        if not isinstance(entries, list):
+            entries = []  # not an index we wrote; start empty rather than crash
+        for item in entries:
+            try:
+                name, entry = item
+                file_hash, size = entry['hash'], entry['size']
+            except (TypeError, ValueError, KeyError):
+                continue
+            if (isinstance(name, str) and isinstance(file_hash, str) and isinstance(size, int)
+                    and os.path.isfile(self._blob_path(file_hash))):
+                self._entries[name] = {'hash': file_hash, 'size': size}
+        self._evict()
+
+    def _save(self):
+        path = os.path.join(self.directory, INDEX_NAME)
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(list(self._entries.items()), f)
+        os.replace(path + '.tmp', path)
+        self._dirty = False
+
+    def flush(self):
+        """Save the index if cache hits have reordered it"""
+        with self._lock:
+            if self._dirty:
+                try:
+                    self._save()
+                except OSError:
+                    pass  # recency is a hint; losing it only affects eviction order
+
+    def _blob_path(self, file_hash):
+        return os.path.join(self.directory, file_hash)
+
+    @property
+    def total_bytes(self):
+        """Bytes stored; names sharing contents count once"""
+        with self._lock:
+            return self._total_bytes()
+
+    def _total_bytes(self):
+        return sum({entry['hash']: entry['size'] for entry in self._entries.values()}.values())
+
+    # ------------------ LOOKUP ------------------ #
+    def lookup(self, name):
+        """Digest of the cached version of name (for if_none_match), or None"""
+        with self._lock:
+            entry = self._entries.get(name)
+            return entry['hash'] if entry else None
+
+    def get(self, name, file_hash):
+        """The cached file if it still has file_hash, else None; counts as a use"""
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None or entry['hash'] != file_hash:
+                self.misses += 1
+                return None
+            blob = self._blob_path(file_hash)
+            if not os.path.isfile(blob):
+                del self._entries[name]  # removed behind our back
+                self._dirty = True
+                self.misses += 1
+                return None
+            self._entries.move_to_end(name)
+            self._dirty = True
+            self.hits += 1
+            return CachedFile(name, entry['size'], file_hash, blob)
+
+    # ------------------ STORING ------------------ #
+    def put(self, download):
+        """Store a finished, verified download (saved to path or held in
+        data); returns True if cached"""
+        if download.verified is not True or download.size > self.max_file_size:
+            return False
+        blob = self._blob_path(download.file_hash)
+        if not os.path.isfile(blob):
+            # A temp file of our own: another thread may be storing the same digest
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    if download.path is not None:
+                        with open(download.path, 'rb') as source:
+                            shutil.copyfileobj(source, f)
+                    else:
+                        f.write(download.data)
+                os.replace(tmp_path, blob)
+            except BaseException:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+                raise
+
+        with self._lock:
+            self._entries.pop(download.name, None)
+            self._entries[download.name] = {'hash': download.file_hash, 'size': download.size}
+            self._evict()
+            self._save()
+        return True
+
+    def _evict(self):
+        """Drop least recently used names until the contents fit max_bytes"""
+        while self._entries and self._total_bytes() > self.max_bytes:
+            _, entry = self._entries.popitem(last=False)
+            if all(other['hash'] != entry['hash'] for other in self._entries.values()):
+                try:
+                    os.remove(self._blob_path(entry['hash']))
+                except OSError:
+                    pass
+
+    def clear(self):
+        with self._lock:
+            for entry in self._entries.values():
+                try:
+                    os.remove(self._blob_path(entry['hash']))
+                except OSError:
+                    pass
+            self._entries.clear()
+            self._save()
@@ -0,0 +1,613 @@
+"""
+Dashboard File Client
+Blocking client for the file server, independent of Tk. The dashboard runs
+run() on a background thread and marshals the callbacks onto the UI thread.
+
+The client opens with a HELLO frame and speaks the framed protocol
+(servers/file_protocol.py) when the server answers in kind; servers that
+reply with the text listing get the original text protocol.
+
+Downloads never grow a buffer chunk by chunk: small files are received with
+recv_into straight into a buffer preallocated at the announced size, larger
+ones are streamed to download_dir through one reusable receive buffer, so
+memory stays constant whatever the file size. On the framed protocol a large
+download interrupted by a dropped connection resumes from its .part file,
+and completed downloads are checked against the server's BLAKE2b digest.
+
+On a version 2 (multiplexed) connection requests carry ids and any number
+can be in flight; file chunks for different requests arrive interleaved and
+are routed to their own Download, so a listing or a small file is never
+stuck behind a large transfer. Such connections also offer compression;
+compressed chunks are decompressed into the Download as they arrive.
+
+With parallel_streams > 1, each whole-file request first asks for a
+zero-length range to learn the file's size. Files of at least
+parallel_threshold bytes are then fetched by a ParallelDownload over extra
+connections; smaller ones are requested on this connection as usual.
+"""
+import os
+import json
+import socket
+import threading
+
+from servers.file_protocol import (
+    HEADER, HELLO, LIST, FILE_LIST, GET_FILE, FILE_START, FILE_DATA, FILE_CHUNK, NOT_MODIFIED, ERROR,
+    MULTIPLEXED_VERSION, MAX_HELLO_PAYLOAD, FrameDecoder, ProtocolError, encode_message, decode_message, hello, new_hash, hash_file
+)
+from servers.file_compression import Decompressor, available_codecs
+from gui.parallel_download import ParallelDownload
+
+RECV_BUFFER_SIZE = 1024 * 1024
+MEMORY_LIMIT = 4 * 1024 * 1024
+PARALLEL_THRESHOLD = 64 * 1024 * 1024
+
+# Kinds of pending request
+WHOLE_FILE, RANGE, PROBE, LISTING = 'file', 'range', 'probe', 'list'
+DEFAULT_DOWNLOAD_DIR = os.path.join(os.path.expanduser('~'), 'Downloads', 'Nova-Link')
+
+
+class Download:
+    def __init__(self, name, file_size, start=0, length=None, file_hash=None, download_dir=None,
+                 encoding=None):
+        """Destination of bytes [start, start + length) of a file
+
+        Received into a preallocated buffer (data), or streamed to
+        download_dir/name (path) via a .part file when download_dir is given.
+        A .part file outlives a dropped connection; a disk download with
+        start > 0 resumes the .part already holding the first start bytes.
+
+        When file_hash is given and the transfer ends up holding the whole
+        file, it is verified with BLAKE2b as the bytes arrive.
+
+        encoding: codec the bytes arrive compressed with; write() decompresses
+        """
+        if length is None:
+            length = file_size - start
+        self.name = name
+        self.file_size = file_size
+        self.start = start
+        self.size = start + length  # received counts up to size
+        self.received = start
+        self.file_hash = file_hash
+        self.encoding = encoding
+        self.verified = None
+        self.data = None
+        self.path = None
+        self._view = None
+        self._file = None
+        self._hasher = None
+        self._decompressor = Decompressor(encoding) if encoding else None
+
+        whole_file = self.size == file_size and (start == 0 or download_dir is not None)
+        if file_hash and whole_file:
+            self._hasher = new_hash()
+
+        if download_dir is None:
+            self.data = bytearray(length)
+            self._view = memoryview(self.data)
+        else:
+            os.makedirs(download_dir, exist_ok=True)
+            self.path = download_path(download_dir, name)
+            if start:
+                self._resume(start)
+            else:
+                self._file = open(self.path + '.part', 'wb')
+                with open(self.path + '.part.json', 'w', encoding='utf-8') as meta:
+                    json.dump({'name': name, 'size': file_size, 'hash': file_hash}, meta)
+
+    def _resume(self, start):
+        if self._hasher is not None:
+            self._hasher = hash_file(self.path + '.part', limit=start)
+        self._file = open(self.path + '.part', 'r+b')
+        self._file.truncate(start)
+        self._file.seek(start)
+
+    @property
+    def complete(self):
+        return self.received >= self.size
+
+    def window(self, limit):
+        """Writable view of the next bytes for recv_into, None when streaming
+        to disk or decompressing"""
+        if self._view is None or self._decompressor is not None:
+            return None
+        position = self.received - self.start
+        return self._view[position:position + limit]
+
+    def advance(self, n):
+        """Record n bytes written through window()"""
+        if self._hasher is not None:
+            position = self.received - self.start
+            self._hasher.update(self._view[position:position + n])
+        self.received += n
+
+    def write(self, chunk):
+        if self._decompressor is not None:
+            # Fails as soon as the output passes the announced length
+            chunk = self._decompressor.decompress(chunk, limit=self.size - self.received)
+        if self._file is not None:
+            self._file.write(chunk)
+        else:
+            position = self.received - self.start
+            self._view[position:position + len(chunk)] = chunk
+        if self._hasher is not None:
+            self._hasher.update(chunk)
+        self.received += len(chunk)
+
+    def finish(self):
+        """Close the download, returns False if it failed verification"""
+        if self._hasher is not None:
+            self.verified = self._hasher.hexdigest() == self.file_hash
+        self._view = None
+        if self._file is None:
+            return self.verified is not False
+
+        self._file.close()
+        self._file = None
+        if self.verified is False:
+            self._discard()
+            return False
+        os.replace(self.path + '.part', self.path)
+        remove_quietly(self.path + '.part.json')
+        return True
+
+    def abort(self):
+        """Stop receiving; a partial file on disk is kept for resuming"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._view = None
+
+    def _discard(self):
+        remove_partial(self.path)
+
+    def preview(self, limit):
+        """First limit bytes of the finished download"""
+        if self.data is not None:
+            return bytes(self.data[:limit])
+        with open(self.path, 'rb') as f:
+            return f.read(limit)
+
+
+def download_path(download_dir, name):
+    # Server names are plain file names; never let one escape the directory
+    return os.path.join(download_dir, os.path.basename(name) or 'download')
+
+
+def remove_quietly(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def remove_partial(path):
+    """Delete the .part file and sidecar of a download to path"""
+    remove_quietly(path + '.part')
+    remove_quietly(path + '.part.json')
+
+
+def partial_download(download_dir, name):
+    """(bytes on disk, file hash) of a resumable .part file, or None"""
+    path = download_path(download_dir, name)
+    try:
+        with open(path + '.part.json', 'r', encoding='utf-8') as meta:
+            file_hash = json.load(meta).get('hash')
+        received = os.path.getsize(path + '.part')
+    except (OSError, ValueError):
+        return None
+    if not file_hash or not received:
+        return None
+    return received, file_hash
+
+
+class FileClient:
+    def __init__(self, host, port, timeout=5, recv_buffer_size=RECV_BUFFER_SIZE,
+                 memory_limit=MEMORY_LIMIT, download_dir=DEFAULT_DOWNLOAD_DIR,
+                 parallel_streams=1, max_parallel_streams=8, parallel_threshold=PARALLEL_THRESHOLD,
+                 compression=True, cache=None):
+        """Initialize client for one file server
+
+        recv_buffer_size: bytes requested per recv call
+        memory_limit: files up to this size are kept in memory, larger ones
+                      are saved to download_dir
+        parallel_streams: connections a large download starts with (1: off);
+                          grows up to max_parallel_streams while it helps
+        compression: offer the codecs we can decode; the server still sends
+                     small or incompressible files raw
+        cache: DownloadCache for verified downloads; cached files are
+               requested conditionally and opened locally if unchanged
+        """
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.memory_limit = memory_limit
+        self.download_dir = download_dir
+        self.parallel_streams = parallel_streams
+        self.max_parallel_streams = max(parallel_streams, max_parallel_streams)
+        self.parallel_threshold = parallel_threshold
+        self.compression = compression
+        self.cache = cache
+        self.sock = None
+        self.framed = False
+        self.version = None  # negotiated framed protocol version
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+        # Callbacks, called from the thread running run(). on_progress fires
+        # per received chunk; UIs should poll bytes_received and
+        # current_download on a timer instead.
+        self.on_file_list = lambda files: None
+        self.on_file_received = lambda download: None
+        self.on_progress = lambda download: None
+        self.on_error = lambda message: None
+        self.on_disconnect = lambda: None
+
+        self._closed = False
+        self._pending = b''
+        self._send_lock = threading.Lock()  # also guards _requests and _next_id
+        self._recv_view = memoryview(bytearray(recv_buffer_size))
+        self._next_id = 1
+        self._requests = {}  # request id -> (name, kind), in the order sent
+        self._downloads = {}  # request id -> Download in progress
+        self._sequential_id = None  # request FILE_DATA belongs to (version 1, text)
+        self._parallel = []  # ParallelDownloads in progress
+        self._parallel_bytes = 0  # received by finished ParallelDownloads
+
+    @property
+    def multiplexed(self):
+        return self.framed and self.version >= MULTIPLEXED_VERSION
+
+    # ------------------ CONNECTION ------------------ #
+    def connect(self):
+        """Connect and negotiate the protocol, returns True if framed"""
+        self.sock = socket.create_connection((self.host, self.port), self.timeout)
+        self._send(hello(compression=available_codecs() if self.compression else None))
+
+        # A framed server answers HELLO; a text server sends "FILE_LIST..."
+        first = self._recv()
+        if not first:
+            raise ConnectionError("Server closed the connection")
+        self.framed = first[0] == HELLO
+        data = bytes(first)
+        if self.framed:
+            # Read the whole HELLO, so the version is known before any request
+            while len(data) < HEADER.size or len(data) < HEADER.size + HEADER.unpack_from(data)[1]:
+                if len(data) >= HEADER.size and HEADER.unpack_from(data)[1] > MAX_HELLO_PAYLOAD:
+                    raise ProtocolError("HELLO frame exceeds limit")
+                more = self._recv()
+                if not more:
+                    raise ConnectionError("Server closed the connection")
+                data += more
+            length = HEADER.unpack_from(data)[1]
+            self.version = decode_message(data[HEADER.size:HEADER.size + length]).get('version', 1)
+        self._pending = data  # run() handles the HELLO again and whatever followed it
+
+        self.sock.settimeout(None)  # blocking reads from here on
+        return self.framed
+
+    def close(self):
+        self._closed = True
+        for download in list(self._parallel):
+            download.cancel()
+        if self.sock is not None:
+            try:
+                self.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self.sock.close()
+
+    def _send(self, data):
+        with self._send_lock:
+            self.sock.sendall(data)
+        self.bytes_sent += len(data)
+
+    def _recv_into(self, view):
+        n = self.sock.recv_into(view)
+        self.bytes_received += n
+        return n
+
+    def _recv(self, size=None):
+        """Read into the shared receive buffer; the view is valid until the next call"""
+        view = self._recv_view if size is None else self._recv_view[:size]
+        return view[:self._recv_into(view)]
+
+    # ------------------ REQUESTS ------------------ #
+    def _send_request(self, name, kind, fields=None, frame_type=GET_FILE):
+        """Register and send a request, returns its id
+
+        Multiplexed replies echo the id; otherwise replies arrive in the
+        order requests were sent, which the lock keeps equal to id order.
+        The text protocol takes one request at a time, so later ones wait
+        until _send_next_legacy().
+        """
+        with self._send_lock:
+            request_id = self._next_id
+            self._next_id += 1
+            if not self.framed:
+                data = f"GET_FILE:{name}".encode('utf-8')
+            else:
+                fields = dict(fields or {})
+                if self.multiplexed:
+                    fields['id'] = request_id
+                data = encode_message(frame_type, **fields)
+            self._requests[request_id] = (name, kind)
+            if not self.framed and len(self._requests) > 1:
+                return request_id
+            self.sock.sendall(data)
+        self.bytes_sent += len(data)
+        return request_id
+
+    def _pop_request(self, request_id=None):
+        """(id, name, kind) of the request a reply answers; the oldest if unnamed"""
+        with self._send_lock:
+            if request_id is None:
+                request_id = next(iter(self._requests), None)
+            name, kind = self._requests.pop(request_id, (None, WHOLE_FILE))
+        return request_id, name, kind
+
+    def request_file(self, name, offset=None, length=None):
+        """Request a file, or with offset/length just that byte range
+
+        Whole-file requests resume a partial download of the same file
+        version left in download_dir, and are answered from the cache when
+        the server reports the cached version unchanged. Ranges need the
+        framed protocol.
+        On a multiplexed connection any number of requests may be in flight.
+        """
+        kind = RANGE if offset is not None or length is not None else WHOLE_FILE
+        if not self.framed:
+            if kind == RANGE:
+                raise ValueError("Range requests need the framed protocol")
+            return self._send_request(name, kind)
+
+        fields = {'name': name}
+        if kind == RANGE:
+            fields.update(offset=offset or 0, length=length)
+        elif self.download_dir is not None:
+            partial = partial_download(self.download_dir, name)
+            if partial is not None:
+                fields.update(offset=partial[0], if_hash=partial[1])
+            elif self.parallel_streams > 1:
+                kind = PROBE
+                fields.update(offset=0, length=0)
+        if kind != RANGE and self.cache is not None:
+            cached_hash = self.cache.lookup(name)
+            if cached_hash is not None:
+                fields['if_none_match'] = cached_hash
+        return self._send_request(name, kind, fields)
+
+    def request_list(self):
+        """Ask for a fresh listing; text servers only send it on connect"""
+        if not self.framed:
+            return False
+        if self.multiplexed:
+            self._send_request(None, LISTING, frame_type=LIST)
+        else:
+            self._send(encode_message(LIST))  # answered without an id, like the greeting
+        return True
+
+    # ------------------ DOWNLOADS ------------------ #
+    @property
+    def downloads(self):
+        """Transfers in progress, oldest first; safe to poll from another thread"""
+        return list(self._downloads.values()) + list(self._parallel)
+
+    @property
+    def current_download(self):
+        """The oldest transfer in progress, or None"""
+        downloads = self.downloads
+        return downloads[0] if downloads else None
+
+    @property
+    def total_bytes_received(self):
+        """Bytes received on this connection and by parallel downloads"""
+        return self.bytes_received + self._parallel_bytes + sum(
+            download.bytes_received for download in list(self._parallel)
+        )
+
+    def _probed(self, name, file_size, file_hash):
+        """Fetch a probed file in parallel if it is large enough, else normally"""
+        if file_size < self.parallel_threshold:
+            self._send_request(name, WHOLE_FILE, {'name': name})
+            return
+
+        download = ParallelDownload(
+            self.host, self.port, name, file_size, file_hash,
+            download_path(self.download_dir, name), streams=self.parallel_streams,
+            max_streams=self.max_parallel_streams, timeout=self.timeout
+        )
+        self._parallel.append(download)
+        threading.Thread(target=self._run_parallel, args=(download,), daemon=True).start()
+
+    def _run_parallel(self, download):
+        try:
+            os.makedirs(self.download_dir, exist_ok=True)
+            succeeded = download.run()
+        except OSError as e:
+            succeeded, download.error = False, f"Download of {download.name} failed: {e}"
+        self._parallel.remove(download)
+        self._parallel_bytes += download.bytes_received
+        if succeeded:
+            self._cache_download(download)
+            self.on_file_received(download)
+        elif not self._closed:
+            self.on_error(download.error)
+
+    def _start_download(self, request_id, name, file_size, offset=0, length=None,
+                        file_hash=None, kind=WHOLE_FILE, encoding=None):
+        if length is None:
+            length = file_size - offset
+        if kind == RANGE:
+            download_dir = None  # ranges are handed over in memory
+        elif offset:
+            download_dir = self.download_dir  # resuming a .part file
+        else:
+            download_dir = self.download_dir if length > self.memory_limit else None
+            if kind == WHOLE_FILE and download_dir is None and self.download_dir is not None:
+                # The server restarted a resume from 0 (the file changed);
+                # the old .part would be offered again on every request
+                remove_partial(download_path(self.download_dir, name))
+
+        download = Download(name, file_size, offset, length, file_hash, download_dir, encoding)
+        self._downloads[request_id] = download
+        if download.complete:
+            self._received(request_id)  # empty: no data frames will follow
+        return download
+
+    def _received(self, request_id, chunk=None, n=0):
+        """Account for a chunk (or n bytes already in place), finish when complete"""
+        download = self._downloads.get(request_id)
+        if download is None:
+            return  # e.g. the empty FILE_DATA after an empty file or a probe
+        if chunk is not None:
+            try:
+                download.write(chunk)
+            except ValueError as e:  # undecodable compressed data
+                del self._downloads[request_id]
+                download.abort()
+                self.on_error(f"Download of {download.name} failed: {e}")
+                return
+        else:
+            download.advance(n)
+        self.on_progress(download)
+        if download.complete:
+            del self._downloads[request_id]
+            if download.finish():
+                self._cache_download(download)
+                self.on_file_received(download)
+            else:
+                self.on_error(f"Integrity check failed for {download.name}; download discarded")
+
+    def _cache_download(self, download):
+        if self.cache is not None:
+            try:
+                self.cache.put(download)
+            except OSError:
+                pass  # caching is best effort; the download itself succeeded
+
+    def _cached(self, name, file_hash):
+        """Open the cached copy the server confirmed, or fetch the file if
+        it has been evicted since the request"""
+        cached = self.cache.get(name, file_hash) if self.cache is not None else None
+        if cached is None:
+            self._send_request(name, WHOLE_FILE, {'name': name})
+        else:
+            self.on_file_received(cached)
+
+    # ------------------ RECEIVING ------------------ #
+    def run(self):
+        """Read and dispatch server messages until the connection closes"""
+        try:
+            if self.framed:
+                self._run_framed()
+            else:
+                self._run_legacy()
+        except OSError:
+            pass  # socket closed
+        finally:
+            for download in list(self._downloads.values()):
+                download.abort()
+            self._downloads.clear()
+            if not self._closed:
+                self.on_disconnect()
+
+    def _run_framed(self):
+        decoder = FrameDecoder()
+        data, self._pending = self._pending, b''
+        while data:
+            for frame_type, payload, _, stream_id in decoder.feed(data):
+                self._handle_frame(frame_type, payload, stream_id)
+
+            # Rest of an in-memory download's data frame: receive straight into its buffer
+            while decoder.payload_remaining:
+                request_id = self._data_request(decoder.stream_id)
+                download = self._downloads.get(request_id)
+                window = download.window(decoder.payload_remaining) if download else None
+                if window is None:
+                    break
+                n = self._recv_into(window)
+                if not n:
+                    return
+                decoder.advance(n)
+                self._received(request_id, n=n)
+
+            data = self._recv()
+
+    def _data_request(self, stream_id):
+        # FILE_CHUNK frames name their request; FILE_DATA belongs to the last FILE_START
+        return self._sequential_id if stream_id is None else stream_id
+
+    def _handle_frame(self, frame_type, payload, stream_id):
+        if frame_type in (FILE_CHUNK, FILE_DATA):
+            self._received(self._data_request(stream_id), payload)
+            return
+        if frame_type == HELLO:
+            self.version = decode_message(payload).get('version', 1)
+            return
+
+        fields = decode_message(payload)
+        if frame_type == FILE_START:
+            request_id, _, kind = self._pop_request(fields.get('id'))
+            self._sequential_id = request_id
+            if kind == PROBE:
+                self._probed(fields['name'], fields['size'], fields.get('hash'))
+                return
+            self._start_download(
+                request_id, fields['name'], fields['size'], fields.get('offset', 0),
+                fields.get('length'), fields.get('hash'), kind, fields.get('encoding')
+            )
+        elif frame_type == NOT_MODIFIED:
+            self._pop_request(fields.get('id'))
+            self._cached(fields['name'], fields['hash'])
+        elif frame_type == FILE_LIST:
+            if 'id' in fields:
+                self._pop_request(fields['id'])
+            self.on_file_list(fields.get('files', []))
+        elif frame_type == ERROR:
+            if 'id' in fields or not self.multiplexed:
+                self._pop_request(fields.get('id'))
+            self.on_error(fields.get('error', 'Unknown error'))
+
+    def _run_legacy(self):
+        """Original text protocol: unframed, so messages are told apart by prefix"""
+        data, self._pending = self._pending, b''
+        while data:
+            text = bytes(data).decode('utf-8', errors='ignore')
+            if text.startswith('FILE_LIST'):
+                files = [name for name in text[len('FILE_LIST'):].strip().split('\n') if name]
+                self.on_file_list(files)
+            elif text.startswith('FILE_SIZE:'):
+                request_id, name, _ = self._pop_request()
+                self._receive_legacy_file(request_id, name, int(text.split(':', 1)[1]))
+                self._send_next_legacy()
+            elif text.startswith('ERROR:'):
+                self._pop_request()
+                self.on_error(text[len('ERROR:'):])
+                self._send_next_legacy()
+            data = self._recv()
+
+    def _send_next_legacy(self):
+        with self._send_lock:
+            name = next(iter(self._requests.values()), (None,))[0]
+            if name is None:
+                return
+            data = f"GET_FILE:{name}".encode('utf-8')
+            self.sock.sendall(data)
+        self.bytes_sent += len(data)
+
+    def _receive_legacy_file(self, request_id, name, size):
+        download = self._start_download(request_id, name or 'download', size)
+        self._send(b'ACK')
+        while request_id in self._downloads:
+            remaining = size - download.received
+            window = download.window(remaining)
+            if window is not None:
+                n = self._recv_into(window)
+                chunk = None
+            else:
+                chunk = self._recv(min(remaining, len(self._recv_view)))
+                n = len(chunk)
+            if not n:
+                raise ConnectionError("Server closed mid-transfer")
+            self._received(request_id, chunk, n)
@@ -0,0 +1,46 @@
+"""
+File Filter
+Case-insensitive name filter behind the dashboard's file list
+
+Filtering runs over pre-folded names and narrows the previous matches when
+the query is only extended, so typing stays fast with 100k names.
+"""
+
+
+class FileFilter:
+    def __init__(self, names=()):
+        """Case-insensitive substring filter over a list of names"""
+        self.names = []
+        self.query = ''
+        self.matches = range(0)  # indices into names, in listing order
+        self._folded = []
+        self.set_names(names)
+
+    def set_names(self, names):
+        """Replace the listing, keeping the current query"""
+        self.names = [name for name in names if name.strip()]
+        self._folded = [name.casefold() for name in self.names]
+        query, self.query = self.query, ''
+        self.matches = range(len(self.names))
+        self.filter(query)
+
+    def filter(self, query):
+        """Apply query, returns False if the matches did not change"""
+        query = query.strip().casefold()
+        if query == self.query:
+            return False
+        if self.query and query.startswith(self.query):
+            candidates = self.matches  # a longer query only ever narrows
+        else:
+            candidates = range(len(self.names))
+        folded = self._folded
+        self.matches = [i for i in candidates if query in folded[i]] if query else range(len(self.names))
+        self.query = query
+        return True
+
+    def __len__(self):
+        return len(self.matches)
+
+    def name(self, position):
+        """Name of the position-th match"""
+        return self.names[self.matches[position]]
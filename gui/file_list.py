@@ -0,0 +1,159 @@
+"""
+Virtual File List
+Scrollable, filterable list of server files that stays fast with 100k names
+
+Only the rows that fit on screen exist as widgets. Scrolling does not move
+widgets; it changes which names the same row buttons show. Filtering
+(FileFilter) waits for a pause in typing.
+"""
+import customtkinter as ctk
+
+from gui.file_filter import FileFilter
+
+ROW_HEIGHT = 40
+ROW_PADDING = 2
+WHEEL_ROWS = 3
+# Filter once typing pauses this long, not on every keystroke
+FILTER_DELAY_MS = 80
+
+
+class VirtualFileList(ctk.CTkFrame):
+    def __init__(self, master, on_select=lambda name: None, row_height=ROW_HEIGHT, **kwargs):
+        """File list with a filter box; on_select(name) runs when a row is clicked"""
+        super().__init__(master, **kwargs)
+        self.on_select = on_select
+        self.row_height = row_height
+        self.file_filter = FileFilter()
+
+        self._top = 0  # match shown in the first row
+        self._visible = 0  # rows that fit
+        self._rows = []  # recycled buttons
+        self._row_text = []  # text each row shows, so unchanged rows are not reconfigured
+        self._filter_job = None
+
+        self.grid_columnconfigure(0, weight=1)
+        self.grid_rowconfigure(1, weight=1)
+
+        self.query = ctk.StringVar()
+        self.search_entry = ctk.CTkEntry(
+            self, textvariable=self.query, placeholder_text="🔍 Filter files",
+            height=36, corner_radius=10, fg_color="#102437", border_color="#1E3A5F"
+        )
+        self.search_entry.grid(row=0, column=0, sticky="ew", pady=(0, 8))
+        self.search_entry.bind("<Return>", self._open_first_match)
+        self.query.trace_add("write", self._schedule_filter)
+
+        self.count_label = ctk.CTkLabel(
+            self, text="", font=ctk.CTkFont(size=13), text_color="#78909C"
+        )
+        self.count_label.grid(row=0, column=1, padx=(10, 0), pady=(0, 8))
+
+        self.rows_frame = ctk.CTkFrame(self, fg_color="transparent")
+        self.rows_frame.grid(row=1, column=0, sticky="nsew")
+        self.rows_frame.grid_propagate(False)  # the frame sizes the rows, not the reverse
+        self.rows_frame.grid_columnconfigure(0, weight=1)
+        self.rows_frame.bind("<Configure>", self._on_resize, add="+")
+        self._bind_wheel(self.rows_frame)
+
+        self.scrollbar = ctk.CTkScrollbar(self, command=self._on_scrollbar)
+        self.scrollbar.grid(row=1, column=1, sticky="ns", padx=(4, 0))
+
+    # ------------------ DATA ------------------ #
+    def set_files(self, names):
+        """Show a new listing, keeping the filter text"""
+        self.file_filter.set_names(names)
+        self._top = 0
+        self._render()
+
+    def _schedule_filter(self, *args):
+        if self._filter_job is not None:
+            self.after_cancel(self._filter_job)
+        self._filter_job = self.after(FILTER_DELAY_MS, self._apply_filter)
+
+    def _apply_filter(self):
+        self._filter_job = None
+        if self.file_filter.filter(self.query.get()):
+            self._top = 0
+            self._render()
+
+    def _open_first_match(self, event=None):
+        if self._filter_job is not None:
+            self.after_cancel(self._filter_job)
+            self._apply_filter()
+        if len(self.file_filter):
+            self.on_select(self.file_filter.name(0))
+
+    # ------------------ ROWS ------------------ #
+    def _on_resize(self, event):
+        visible = max(1, event.height // self.row_height)
+        while len(self._rows) < visible:
+            self._rows.append(self._make_row(len(self._rows)))
+            self._row_text.append(None)
+        self._visible = visible
+        self._render()
+
+    def _make_row(self, index):
+        row = ctk.CTkButton(
+            self.rows_frame,
+            text="",
+            height=self.row_height - 2 * ROW_PADDING,
+            fg_color="#1E3A5F",
+            hover_color="#00B0FF",
+            anchor="w",
+            command=lambda: self._select(index)
+        )
+        self._bind_wheel(row)
+        return row
+
+    def _select(self, index):
+        position = self._top + index
+        if position < len(self.file_filter):
+            self.on_select(self.file_filter.name(position))
+
+    def _render(self):
+        """Point the row widgets at the matches from _top on"""
+        total = len(self.file_filter)
+        self._top = max(0, min(self._top, total - self._visible))
+        for index, row in enumerate(self._rows):
+            position = self._top + index
+            text = self.file_filter.name(position) if index < self._visible and position < total else None
+            if text == self._row_text[index]:
+                continue
+            if text is None:
+                row.grid_remove()
+            else:
+                row.configure(text=text)
+                if self._row_text[index] is None:
+                    row.grid(row=index, column=0, sticky="ew", pady=ROW_PADDING)
+            self._row_text[index] = text
+
+        if total:
+            self.scrollbar.set(self._top / total, min(1.0, (self._top + self._visible) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+        shown = len(self.file_filter.names)
+        self.count_label.configure(
+            text=f"{total} of {shown}" if total != shown else f"{shown} files"
+        )
+
+    # ------------------ SCROLLING ------------------ #
+    def scroll(self, rows):
+        self._top += rows
+        self._render()
+
+    def _on_scrollbar(self, *args):
+        # ('moveto', fraction) or ('scroll', n, 'units' | 'pages')
+        if args[0] == 'moveto':
+            self._top = int(float(args[1]) * len(self.file_filter))
+            self._render()
+        elif args[0] == 'scroll':
+            self.scroll(int(args[1]) * (self._visible if args[2] == 'pages' else 1))
+
+    def _bind_wheel(self, widget):
+        widget.bind("<MouseWheel>", self._on_wheel, add="+")  # Windows, macOS
+        widget.bind("<Button-4>", self._on_wheel, add="+")  # X11
+        widget.bind("<Button-5>", self._on_wheel, add="+")
+
+    def _on_wheel(self, event):
+        up = event.num == 4 or getattr(event, 'delta', 0) > 0
+        self.scroll(-WHEEL_ROWS if up else WHEEL_ROWS)
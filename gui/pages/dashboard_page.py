@@ -1,9 +1,16 @@
 import customtkinter as ctk
 from tkinter import messagebox
-import socket
 import threading
 import time
 import sys
+import os
+
+# Repo root, so the file client and protocol import when run standalone
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from gui.file_client import FileClient
+from gui.download_cache import DownloadCache
+from gui.file_list import VirtualFileList
+from gui.transfer_meter import TransferMeter, format_eta
 
 # Configure appearance
 ctk.set_appearance_mode("Dark")
@@ -17,12 +24,23 @@ SERVER_DETAILS = {
     "Alpha1 (Low Latency)": {"host": "10.159.187.143", "port": 5555}
 }
 
+# Most text the file viewer shows; the rest of a file stays on disk
+VIEWER_LIMIT = 256 * 1024
+
+# Counters and progress are redrawn at this rate, however fast data arrives
+UI_REFRESH_HZ = 15
+
+# Connections a large download starts with; grows while throughput improves
+PARALLEL_STREAMS = 4
+MAX_PARALLEL_STREAMS = 8
+
 class DashboardPage(ctk.CTkFrame):
     def __init__(self, parent, controller):
         super().__init__(parent, fg_color="#0A1A2B")  # Dark background
         self.controller = controller
-        self.client_socket = None
-        self.stop_threads = False
+        self.file_client = None
+        # Reopened files are checked with the server and opened locally if unchanged
+        self.download_cache = DownloadCache()
 
         # Connection State
         self.is_connected = ctk.BooleanVar(value=False)
@@ -32,6 +50,13 @@ class DashboardPage(ctk.CTkFrame):
         self.pkts_sent = 0
         self.pkts_recv = 0
 
+        # UI refresh timer and rate meters (sampled by the timer)
+        self._refresh_job = None
+        self._stats_text = None
+        self.recv_meter = TransferMeter()
+        self.download_meter = TransferMeter()
+        self._metered_download = None
+
         # Grid Config
         self.grid_rowconfigure(0, weight=1)
         self.grid_columnconfigure(0, weight=1)
@@ -160,6 +185,18 @@ class DashboardPage(ctk.CTkFrame):
         self.lbl_recv.pack(side="right", padx=20, pady=10)
         # ----------------------------------
 
+        # Download Progress (shown while a file transfers)
+        self.progress_label = ctk.CTkLabel(
+            status_section,
+            text="",
+            font=ctk.CTkFont(size=13, family="Consolas"),
+            text_color="#B0BEC5"
+        )
+        self.progress_bar = ctk.CTkProgressBar(
+            status_section, width=600, height=10, progress_color="#00C4FF"
+        )
+        self.progress_bar.set(0)
+
         # Accessible Files Label
         self.files_label = ctk.CTkLabel(
             status_section,
@@ -169,9 +206,10 @@ class DashboardPage(ctk.CTkFrame):
         )
         # Hidden by default
 
-        # Container for files
-        self.files_container = ctk.CTkScrollableFrame(
+        # Container for files (only visible rows exist as widgets)
+        self.files_container = VirtualFileList(
             status_section,
+            on_select=self._request_file,
             width=600,
             height=400,
             corner_radius=10,
@@ -180,15 +218,79 @@ class DashboardPage(ctk.CTkFrame):
         # Hidden by default
 
     # ------------------ HELPER: UPDATE STATS UI ------------------ #
-    def _update_pkt_ui(self):
-        """Updates the packet counters on the UI safely from threads"""
-        def format_bytes(n):
-            if n < 1024: return f"{n} B"
-            elif n < 1024**2: return f"{n/1024:.1f} KB"
-            else: return f"{n/1024**2:.1f} MB"
-
-        self.lbl_sent.configure(text=f"Sent: {format_bytes(self.pkts_sent)}")
-        self.lbl_recv.configure(text=f"Recv: {format_bytes(self.pkts_recv)}")
+    @staticmethod
+    def _format_bytes(n):
+        if n < 1024: return f"{n} B"
+        elif n < 1024**2: return f"{n/1024:.1f} KB"
+        elif n < 1024**3: return f"{n/1024**2:.1f} MB"
+        else: return f"{n/1024**3:.2f} GB"
+
+    def _update_pkt_ui(self, rate=0.0):
+        """Updates the packet counters; labels are only reconfigured on change"""
+        sent = f"Sent: {self._format_bytes(self.pkts_sent)}"
+        recv = f"Recv: {self._format_bytes(self.pkts_recv)}"
+        if rate:
+            recv += f" ({self._format_bytes(int(rate))}/s)"
+        if (sent, recv) != self._stats_text:
+            self._stats_text = (sent, recv)
+            self.lbl_sent.configure(text=sent)
+            self.lbl_recv.configure(text=recv)
+
+    def _update_progress_ui(self, download, queued=0):
+        """Shows download progress with throughput and ETA; hidden when idle
+
+        queued: further transfers in flight behind this one
+        """
+        if download is None:
+            if self._metered_download is not None:
+                self._metered_download = None
+                self.progress_label.pack_forget()
+                self.progress_bar.pack_forget()
+            return
+
+        if download is not self._metered_download:
+            self._metered_download = download
+            self.download_meter.reset()
+            self.progress_label.pack(after=self.stats_frame, anchor="w", padx=30)
+            self.progress_bar.pack(after=self.progress_label, padx=20, pady=(0, 10))
+
+        received, size = download.received, download.size
+        rate = self.download_meter.update(received)
+        eta = self.download_meter.eta(size - received)
+        self.progress_label.configure(
+            text=f"{download.name}: {self._format_bytes(received)} / {self._format_bytes(size)}"
+                 f"  ·  {self._format_bytes(int(rate))}/s  ·  ETA {format_eta(eta)}"
+                 + (f"  ·  +{queued} more" if queued else "")
+        )
+        self.progress_bar.set(received / size if size else 1)
+
+    # ------------------ UI REFRESH TIMER ------------------ #
+    def _start_ui_refresh(self):
+        if self._refresh_job is None:
+            self.recv_meter.reset()
+            self._refresh_ui()
+
+    def _stop_ui_refresh(self):
+        if self._refresh_job is not None:
+            self.after_cancel(self._refresh_job)
+            self._refresh_job = None
+        self._update_progress_ui(None)
+        self._update_pkt_ui()
+
+    def _refresh_ui(self):
+        """Redraw counters and progress from the client's state
+
+        The network thread only bumps counters; one timer turns them into
+        widget updates at UI_REFRESH_HZ, so the event loop never floods.
+        """
+        client = self.file_client
+        if client is not None:
+            self.pkts_sent = client.bytes_sent
+            self.pkts_recv = client.total_bytes_received
+            self._update_pkt_ui(self.recv_meter.update(self.pkts_recv))
+            downloads = client.downloads
+            self._update_progress_ui(downloads[0] if downloads else None, len(downloads) - 1)
+        self._refresh_job = self.after(1000 // UI_REFRESH_HZ, self._refresh_ui)
 
     # ------------------ CONNECTION BINDINGS ------------------ #
     def _setup_connection_bindings(self):
@@ -206,6 +308,7 @@ class DashboardPage(ctk.CTkFrame):
             # Show files section
             self.files_label.pack(anchor="w", padx=10, pady=(30, 5))
             self.files_container.pack(padx=10, pady=(0, 20), fill="both", expand=True)
+            self.after(0, self._start_ui_refresh)
         else:
             self.status_label.configure(text="DISCONNECTED", text_color="#F44336")
             self.status_circle.configure(text="●", text_color="#F44336")
@@ -215,25 +318,20 @@ class DashboardPage(ctk.CTkFrame):
             self.server_optionmenu.configure(state="normal")
 
             # Clear and hide files section
-            for widget in self.files_container.winfo_children():
-                widget.destroy()
+            self.files_container.set_files([])
             self.files_label.pack_forget()
             self.files_container.pack_forget()
+            self._stop_ui_refresh()
 
     # ------------------ CONNECT/DISCONNECT ------------------ #
     def _toggle_connection(self):
         if self.is_connected.get():
             # Disconnect Logic
-            self.stop_threads = True
-            if self.client_socket:
-                try:
-                    self.client_socket.close()
-                except:
-                    pass
+            if self.file_client:
+                self.file_client.close()
             self.is_connected.set(False)
         else:
             # Connect Logic
-            self.stop_threads = False
             # Reset counters
             self.pkts_sent = 0
             self.pkts_recv = 0
@@ -245,7 +343,6 @@ class DashboardPage(ctk.CTkFrame):
         """Runs in a background thread to handle the connection attempt."""
         # 1. Animation
         for i in range(6):  # ~3 seconds pulsing
-            if self.stop_threads: return
             color = "#FFC107" if i % 2 == 0 else "#FFEB3B"
             self.status_circle.configure(text="●", text_color=color)
             time.sleep(0.5)
@@ -253,20 +350,27 @@ class DashboardPage(ctk.CTkFrame):
         # 2. Update UI to 'Connecting'
         self.connect_button.configure(state="disabled", text="Connecting...")
         
-        # 3. Try Socket Connection
+        # 3. Try Connection (negotiates framed or text protocol)
         try:
             target = SERVER_DETAILS[self.current_server.get()]
-            
-            self.client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            self.client_socket.settimeout(5) # 5 second timeout
-            self.client_socket.connect((target["host"], target["port"]))
-            self.client_socket.settimeout(None) # Remove timeout for blocking recv
+
+            client = FileClient(
+                target["host"], target["port"], timeout=5,
+                parallel_streams=PARALLEL_STREAMS, max_parallel_streams=MAX_PARALLEL_STREAMS,
+                cache=self.download_cache
+            )
+            client.on_file_list = lambda files: self.after(0, lambda: self._display_files(files))
+            client.on_file_received = lambda d: self.after(0, lambda: self._show_downloaded_file(d))
+            client.on_error = lambda message: print(f"Server error: {message}")
+            client.on_disconnect = lambda: self.after(0, lambda: self.is_connected.set(False))
+            self.file_client = client
+            client.connect()
 
             # If successful:
             self.is_connected.set(True)
             
             # Start the listener thread for files/messages
-            threading.Thread(target=self._receive_server_messages, daemon=True).start()
+            threading.Thread(target=client.run, daemon=True).start()
 
         except Exception as e:
             # Connection failed
@@ -278,111 +382,24 @@ class DashboardPage(ctk.CTkFrame):
         finally:
             self.connect_button.configure(state="normal")
 
-    def _receive_server_messages(self):
-        """Runs in background to listen for FILE_LIST or downloads."""
-        try:
-            while not self.stop_threads:
-                # Basic receive
-                data_bytes = self.client_socket.recv(1024)
-                if len(data_bytes) > 0:
-                    self.pkts_recv += len(data_bytes)
-                    self.after(0, self._update_pkt_ui)
-                # -------------------------
-                
-                data = data_bytes.decode(errors="ignore")
-                if not data:
-                    break
-
-                # --- PROTOCOL: FILE LIST ---
-                if "FILE_LIST" in data:
-                    # Example format: "FILE_LIST file1.txt\nfile2.py"
-                    clean_data = data.replace("FILE_LIST", "").strip()
-                    if clean_data:
-                        files = clean_data.split("\n")
-                        self.after(0, lambda f=files: self._display_file_buttons(f))
-                    continue
-
-                # --- PROTOCOL: DOWNLOAD START ---
-                if data.startswith("FILE_SIZE:"):
-                    try:
-                        filesize = int(data.split(":")[1])
-                        
-                        # Send ACK to server so it knows to start sending bytes
-                        self.client_socket.sendall(b"ACK")
-                        
-                        # --- PACKET SENT COUNT ---
-                        self.pkts_sent += 1
-                        self.after(0, self._update_pkt_ui)
-                        # -------------------------
-
-                        # Read exact bytes
-                        file_bytes = b""
-                        remaining = filesize
-                        
-                        while remaining > 0 and not self.stop_threads:
-                            chunk = self.client_socket.recv(min(4096, remaining))
-                            if not chunk: break
-                            
-                            # --- PACKET RECV COUNT (CHUNK) ---
-                            self.pkts_recv += len(chunk)
-                            self.after(0, self._update_pkt_ui)
-                            # ---------------------------------
-                            
-                            file_bytes += chunk
-                            remaining -= len(chunk)
-
-                        # Show the file content
-                        try:
-                            content = file_bytes.decode('utf-8')
-                        except:
-                            content = file_bytes.decode('utf-8', errors='replace')
-                            
-                        self.after(0, lambda c=content: self._show_file_viewer("Downloaded File", c))
-
-                    except ValueError:
-                        print("Error parsing file size")
-                    continue
-
-        except OSError:
-            pass # Socket closed
-        except Exception as e:
-            print(f"Receive error: {e}")
-        finally:
-            # If loop breaks (server disconnected), update UI
-            if not self.stop_threads:
-                self.after(0, lambda: self.is_connected.set(False))
-
-    def _display_file_buttons(self, files):
-        # Clear old file buttons
-        for widget in self.files_container.winfo_children():
-            widget.destroy()
-
-        # Create a button for each file
-        for filename in files:
-            if not filename.strip(): continue
-            btn = ctk.CTkButton(
-                self.files_container,
-                text=filename,
-                width=500,
-                fg_color="#1E3A5F",
-                hover_color="#00B0FF",
-                command=lambda f=filename: self._request_file(f)
-            )
-            btn.pack(pady=5)
+    def _show_downloaded_file(self, download):
+        # Show the file content, only as much as a text viewer can hold
+        content = download.preview(VIEWER_LIMIT).decode('utf-8', errors='replace')
+        if download.size > VIEWER_LIMIT:
+            content += f"\n\n... showing {self._format_bytes(VIEWER_LIMIT)} of {self._format_bytes(download.size)}"
+        if download.path:
+            content = f"Saved to {download.path}\n\n" + content
+        self._show_file_viewer(download.name or "Downloaded File", content)
+
+    def _display_files(self, files):
+        # Rows are recycled, so even huge listings cost one pass over the names
+        self.files_container.set_files(files)
 
     def _request_file(self, filename):
-        if self.client_socket:
+        if self.file_client:
             try:
-                # Protocol: GET_FILE:filename
-                msg = f"GET_FILE:{filename}"
-                self.client_socket.sendall(msg.encode())
-                
-                # --- PACKET SENT COUNT ---
-                self.pkts_sent += len(msg.encode())
-                self.after(0, self._update_pkt_ui)
-                # -------------------------
-                
-            except Exception as e:
+                self.file_client.request_file(filename)
+            except OSError as e:
                 print(f"Send error: {e}")
 
     def _show_file_viewer(self, filename, content):
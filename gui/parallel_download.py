@@ -0,0 +1,258 @@
+"""
+Parallel Download
+Fetches one large file as byte ranges over several framed connections at
+once and writes each range into a preallocated file with positional writes,
+so one slow TCP stream no longer bounds throughput on high-latency links.
+
+Each stream makes one request at a time, so it speaks protocol version 1,
+where a whole range is one FILE_DATA frame sent with a single sendfile.
+
+Starts with a few streams and keeps adding one while the measured aggregate
+throughput still improves. Ranges arrive out of order, so the BLAKE2b check
+runs once over the finished file instead of while streaming.
+"""
+import os
+import socket
+import threading
+from collections import deque
+
+from servers.file_protocol import (
+    FILE_LIST, GET_FILE, FILE_START, FILE_DATA, ERROR,
+    FrameDecoder, ProtocolError, encode_message, decode_message, hello, hash_file
+)
+
+RANGE_SIZE = 16 * 1024 * 1024
+RECV_BUFFER_SIZE = 1024 * 1024
+# Adding a stream must raise throughput by this fraction to keep growing
+STREAM_GAIN = 0.10
+
+
+def preallocate(fd, size):
+    """Reserve size bytes for fd, so positional writes never extend the file"""
+    if hasattr(os, 'posix_fallocate'):
+        try:
+            os.posix_fallocate(fd, 0, size)
+            return
+        except OSError:
+            pass  # e.g. unsupported by the filesystem
+    os.ftruncate(fd, size)
+
+
+class PositionalWriter:
+    def __init__(self, fd):
+        """Thread-safe writes at absolute offsets: os.pwrite where available,
+        otherwise a locked seek + write"""
+        self.fd = fd
+        self._lock = None if hasattr(os, 'pwrite') else threading.Lock()
+
+    def write_at(self, data, offset):
+        view = memoryview(data)
+        while view:
+            if self._lock is None:
+                n = os.pwrite(self.fd, view, offset)
+            else:
+                with self._lock:
+                    os.lseek(self.fd, offset, os.SEEK_SET)
+                    n = os.write(self.fd, view)
+            view = view[n:]
+            offset += n
+
+
+class ParallelDownload:
+    def __init__(self, host, port, name, file_size, file_hash, path, streams=4,
+                 max_streams=8, range_size=RANGE_SIZE, timeout=5, interval=1.0, max_retries=3):
+        """Download name to path over up to max_streams connections
+
+        streams: connections opened at once
+        max_streams: upper bound for adaptive growth (equal to streams: fixed)
+        interval: seconds between throughput measurements
+        """
+        self.host = host
+        self.port = port
+        self.name = name
+        self.file_size = file_size
+        self.size = file_size
+        self.file_hash = file_hash
+        self.path = path
+        self.streams = max(1, min(streams, max_streams))
+        self.max_streams = max_streams
+        self.timeout = timeout
+        self.interval = interval
+        self.max_retries = max_retries
+
+        self.received = 0
+        self.bytes_received = 0  # including protocol overhead
+        self.active_streams = 0
+        self.verified = None
+        self.error = None
+
+        self._ranges = deque(
+            (offset, min(range_size, file_size - offset))
+            for offset in range(0, file_size, range_size)
+        )
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._cancelled = False
+        self._writer = None
+        self._finished = threading.Event()  # set when the last stream exits
+
+    def cancel(self):
+        self._cancelled = True
+
+    # ------------------ COORDINATOR ------------------ #
+    def run(self):
+        """Download and verify, returns True on success (self.error otherwise)"""
+        flags = os.O_RDWR | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0)
+        fd = os.open(self.path + '.part', flags)
+        try:
+            preallocate(fd, self.file_size)
+            self._writer = PositionalWriter(fd)
+            workers = [self._spawn() for _ in range(self.streams)]
+            self._adapt(workers)
+            for worker in workers:
+                worker.join()
+        finally:
+            os.close(fd)
+
+        if self.error is None and self._cancelled:
+            self.error = f"Download of {self.name} cancelled"
+        if self.error is None and self.received != self.file_size:
+            self.error = f"Download of {self.name} incomplete"
+        if self.error is None:
+            self.verified = hash_file(self.path + '.part').hexdigest() == self.file_hash
+            if not self.verified:
+                self.error = f"Integrity check failed for {self.name}; download discarded"
+
+        if self.error is not None:
+            try:
+                os.remove(self.path + '.part')
+            except OSError:
+                pass
+            return False
+        os.replace(self.path + '.part', self.path)
+        return True
+
+    def _spawn(self):
+        with self._lock:
+            self.active_streams += 1
+        worker = threading.Thread(target=self._worker, daemon=True)
+        worker.start()
+        return worker
+
+    def _adapt(self, workers):
+        """Add streams while each one still raises aggregate throughput"""
+        best_rate = 0.0
+        growing = self.streams < self.max_streams
+        last = self.received
+        while not self._finished.wait(self.interval):
+            current = self.received
+            rate, last = (current - last) / self.interval, current
+            if not growing or not rate or not self._ranges or self._failed:
+                continue  # nothing to decide, or no data yet (connecting, server hashing)
+            if rate > best_rate * (1 + STREAM_GAIN) and len(workers) < self.max_streams:
+                best_rate = rate
+                workers.append(self._spawn())
+            else:
+                growing = False
+
+    @property
+    def _failed(self):
+        return self._cancelled or self.error is not None
+
+    # ------------------ WORKERS ------------------ #
+    def _next_range(self):
+        with self._lock:
+            return self._ranges.popleft() if self._ranges and not self._failed else None
+
+    def _worker(self):
+        """One connection fetching ranges until none are left"""
+        try:
+            while not self._failed:
+                try:
+                    self._fetch_ranges()
+                    return
+                except (OSError, ValueError, KeyError, ProtocolError) as e:
+                    with self._lock:
+                        self._failures += 1
+                        if self._failures > self.max_retries and self.error is None:
+                            self.error = f"Download of {self.name} failed: {e}"
+        finally:
+            with self._lock:
+                self.active_streams -= 1
+                if not self.active_streams:
+                    self._finished.set()
+
+    def _fetch_ranges(self):
+        sock = socket.create_connection((self.host, self.port), self.timeout)
+        decoder = FrameDecoder()
+        buffer = memoryview(bytearray(RECV_BUFFER_SIZE))
+        try:
+            sock.sendall(hello(version=1))
+            self._read_until_listing(sock, decoder, buffer)
+            while True:
+                next_range = self._next_range()
+                if next_range is None:
+                    return
+                offset, length = next_range
+                done = [0]
+                try:
+                    self._fetch(sock, decoder, buffer, offset, length, done)
+                finally:
+                    if done[0] < length:
+                        # Hand the rest of the range to whichever stream is next
+                        with self._lock:
+                            self._ranges.appendleft((offset + done[0], length - done[0]))
+        finally:
+            sock.close()
+
+    def _recv_into(self, sock, view):
+        n = sock.recv_into(view)
+        if not n:
+            raise ConnectionError("Server closed the connection")
+        with self._lock:
+            self.bytes_received += n
+        return n
+
+    def _read_until_listing(self, sock, decoder, buffer):
+        while True:
+            n = self._recv_into(sock, buffer)
+            if any(frame_type == FILE_LIST for frame_type, _, _, _ in decoder.feed(buffer[:n])):
+                return
+
+    def _fetch(self, sock, decoder, buffer, offset, length, done):
+        """Fetch one range straight into the file; done[0] counts bytes written"""
+        sock.sendall(encode_message(
+            GET_FILE, name=self.name, offset=offset, length=length, if_hash=self.file_hash
+        ))
+
+        while done[0] < length and not self._cancelled:
+            remaining = decoder.payload_remaining
+            if remaining:
+                # Range body: receive and write at its position, no parsing
+                n = self._recv_into(sock, buffer[:min(remaining, len(buffer))])
+                decoder.advance(n)
+                self._write(buffer[:n], offset + done[0])
+                done[0] += n
+                continue
+
+            n = self._recv_into(sock, buffer)
+            for frame_type, payload, _, _ in decoder.feed(buffer[:n]):
+                if frame_type == FILE_START:
+                    fields = decode_message(payload)
+                    if fields['hash'] != self.file_hash or fields['offset'] != offset:
+                        raise ValueError(f"{self.name} changed on the server")
+                elif frame_type == FILE_DATA:
+                    self._write(payload, offset + done[0])
+                    done[0] += len(payload)
+                elif frame_type == ERROR:
+                    raise ValueError(decode_message(payload).get('error', 'Unknown error'))
+
+    def _write(self, data, offset):
+        self._writer.write_at(data, offset)
+        with self._lock:
+            self.received += len(data)
+
+    def preview(self, limit):
+        """First limit bytes of the finished download"""
+        with open(self.path, 'rb') as f:
+            return f.read(limit)
@@ -0,0 +1,53 @@
+"""
+Transfer Meter
+Throughput and ETA of a growing byte counter, sampled by the UI refresh
+timer rather than by the network thread
+"""
+import time
+from collections import deque
+
+
+class TransferMeter:
+    def __init__(self, window=2.0):
+        """Rate over a sliding window of samples
+
+        window: seconds of history; shorter reacts faster, longer is steadier
+        """
+        self.window = window
+        self._samples = deque()  # (time, total bytes)
+
+    def reset(self):
+        self._samples.clear()
+
+    def update(self, total, now=None):
+        """Record the counter's current value, returns the rate in bytes/sec"""
+        if now is None:
+            now = time.monotonic()
+        samples = self._samples
+        if samples and total < samples[-1][1]:
+            samples.clear()  # counter restarted (new transfer)
+        samples.append((now, total))
+        while len(samples) > 2 and now - samples[1][0] >= self.window:
+            samples.popleft()
+        return self.rate
+
+    @property
+    def rate(self):
+        if len(self._samples) < 2:
+            return 0.0
+        (t0, b0), (t1, b1) = self._samples[0], self._samples[-1]
+        return (b1 - b0) / (t1 - t0) if t1 > t0 else 0.0
+
+    def eta(self, remaining):
+        """Seconds until remaining bytes arrive at the current rate, None if stalled"""
+        rate = self.rate
+        return remaining / rate if rate > 0 else None
+
+
+def format_eta(seconds):
+    if seconds is None:
+        return "--:--"
+    seconds = int(seconds + 0.5)
+    if seconds >= 3600:
+        return f"{seconds // 3600}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+    return f"{seconds // 60}:{seconds % 60:02d}"
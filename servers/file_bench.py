@@ -0,0 +1,161 @@
+"""
+File Server Benchmark
+Opens many concurrent dashboard-protocol connections against a file server
+and downloads a file repeatedly on each, reporting throughput and latency.
+
+Usage:
+    python -m servers.file_bench --start-server --clients 1000 --file file1.txt
+    python -m servers.file_bench --host 10.8.0.1 --clients 200 --requests 20 --file big.iso
+    python -m servers.file_bench --start-server --protocol legacy
+"""
+import sys
+import time
+import asyncio
+import argparse
+
+from servers.file_protocol import (
+    FILE_LIST, GET_FILE, FILE_DATA, ERROR,
+    FrameDecoder, encode_message, decode_message, hello
+)
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(pct / 100.0 * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+async def read_frames(reader, decoder):
+    """Frames from a connection as they are parsed; ERROR frames raise"""
+    while True:
+        data = await reader.read(1 << 20)
+        if not data:
+            raise ConnectionError("Server closed the connection")
+        for frame_type, payload, final, _ in decoder.feed(data):
+            if frame_type == ERROR:
+                raise RuntimeError(decode_message(payload)['error'])
+            yield frame_type, payload, final
+
+
+async def run_framed_client(host, port, name, requests, latencies):
+    """One framed connection: handshake, then download name requests times
+
+    Requests are sequential, so this speaks version 1 (one FILE_DATA frame
+    per file) and measures the raw transfer path.
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    frames = read_frames(reader, FrameDecoder())
+    received = 0
+    try:
+        writer.write(hello(version=1))
+        async for frame_type, _, _ in frames:
+            if frame_type == FILE_LIST:
+                break
+
+        for _ in range(requests):
+            started = time.perf_counter()
+            writer.write(encode_message(GET_FILE, name=name))
+            await writer.drain()
+
+            async for frame_type, payload, final in frames:
+                if frame_type == FILE_DATA:
+                    received += len(payload)
+                    if final:
+                        break
+            latencies.append(time.perf_counter() - started)
+    finally:
+        writer.close()
+    return received
+
+
+async def run_client(host, port, name, requests, latencies):
+    """One text-protocol connection: read the listing, then download name requests times"""
+    reader, writer = await asyncio.open_connection(host, port)
+    received = 0
+    try:
+        await reader.read(65536)  # FILE_LIST
+        for _ in range(requests):
+            started = time.perf_counter()
+            writer.write(f'GET_FILE:{name}'.encode('utf-8'))
+            await writer.drain()
+
+            reply = (await reader.read(64)).decode('utf-8')
+            if not reply.startswith('FILE_SIZE:'):
+                raise RuntimeError(f"Unexpected reply: {reply!r}")
+            size = int(reply.split(':', 1)[1])
+
+            writer.write(b'ACK')
+            await writer.drain()
+            remaining = size
+            while remaining:
+                chunk = await reader.read(min(remaining, 1 << 20))
+                if not chunk:
+                    raise ConnectionError("Server closed mid-transfer")
+                remaining -= len(chunk)
+
+            received += size
+            latencies.append(time.perf_counter() - started)
+    finally:
+        writer.close()
+    return received
+
+
+async def run(args):
+    server = None
+    host, port = args.host, args.port
+    if args.start_server:
+        from servers.file_server import FileServer
+        server = FileServer(args.root, '127.0.0.1', 0)
+        await server.start()
+        host, port = '127.0.0.1', server.port
+
+    client = run_framed_client if args.protocol == 'framed' else run_client
+    latencies = []
+    started = time.perf_counter()
+    results = await asyncio.gather(
+        *(client(host, port, args.file, args.requests, latencies)
+          for _ in range(args.clients)),
+        return_exceptions=True
+    )
+    elapsed = time.perf_counter() - started
+
+    if server is not None:
+        await server.close()
+
+    errors = [r for r in results if isinstance(r, Exception)]
+    total = sum(r for r in results if not isinstance(r, Exception))
+    latencies.sort()
+
+    print(f"📊 {args.clients} {args.protocol} client(s) x {args.requests} download(s) of {args.file}")
+    print(f"   Transfers:  {len(latencies)} in {elapsed:.2f}s ({len(latencies) / elapsed:.0f}/s)")
+    print(f"   Throughput: {total / elapsed / 2 ** 20:.1f} MiB/s")
+    print(f"   Latency:    p50 {percentile(latencies, 50) * 1000:.1f} ms, "
+          f"p99 {percentile(latencies, 99) * 1000:.1f} ms")
+    print(f"   Errors:     {len(errors)}" + (f" (first: {errors[0]!r})" if errors else ""))
+    return 1 if errors else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the dashboard file server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5555)
+    parser.add_argument('--start-server', action='store_true',
+                        help='run a file server in-process on a free port')
+    parser.add_argument('--root', default=None, help='directory for --start-server')
+    parser.add_argument('--file', default='file1.txt', help='file to download')
+    parser.add_argument('--clients', type=int, default=100, help='concurrent connections')
+    parser.add_argument('--requests', type=int, default=10, help='downloads per connection')
+    parser.add_argument('--protocol', choices=('framed', 'legacy'), default='framed',
+                        help='framed protocol or the original text protocol')
+    args = parser.parse_args(argv)
+
+    if args.root is None:
+        from servers.file_server import DEFAULT_ROOT
+        args.root = DEFAULT_ROOT
+    return asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,154 @@
+"""
+File Transfer Compression
+Streaming codecs for file data on the wire, shared by the file server and
+the dashboard client
+
+The client lists the codecs it can decode in HELLO and the server picks the
+first one it supports. Each transfer is then compressed or not on its own:
+small files and data that does not shrink (by extension, or a trial
+compression of a sample) are sent raw, so CPU is only spent where it saves
+bytes. zlib is always available; zstd needs the zstandard package.
+"""
+import os
+import zlib
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+ZSTD = 'zstd'
+ZLIB = 'zlib'
+
+DECODE_ERRORS = (zlib.error,) + ((zstandard.ZstdError,) if zstandard is not None else ())
+
+# Fast levels: on a slow tunnel the wire is the bottleneck, not the ratio
+ZSTD_LEVEL = 3
+ZLIB_LEVEL = 1
+
+# Below this, compression saves less than a round of framing overhead
+MIN_COMPRESS_SIZE = 4096
+SAMPLE_SIZE = 64 * 1024
+# A sample must shrink by at least this fraction for the file to be compressed
+MIN_SAVING = 0.10
+
+# Formats that are already compressed
+INCOMPRESSIBLE_EXTENSIONS = frozenset({
+    '.7z', '.avi', '.br', '.bz2', '.docx', '.flac', '.gif', '.gz', '.jar', '.jpeg',
+    '.jpg', '.lz4', '.m4a', '.mkv', '.mov', '.mp3', '.mp4', '.ogg', '.png', '.pptx',
+    '.rar', '.tgz', '.webm', '.webp', '.whl', '.xlsx', '.xz', '.zip', '.zst',
+})
+
+
+class CompressionError(ValueError):
+    """Compressed data that cannot be decoded"""
+
+
+def available_codecs():
+    """Codecs this installation can use, most preferred first"""
+    return [ZSTD, ZLIB] if zstandard is not None else [ZLIB]
+
+
+def choose_codec(offered):
+    """The first codec we support from a peer's list, or None"""
+    supported = available_codecs()
+    for codec in offered or ():
+        if codec in supported:
+            return codec
+    return None
+
+
+def worth_compressing(name, size, sample):
+    """True if a file of size bytes starting with sample should be compressed
+
+    sample: leading bytes of the file (SAMPLE_SIZE is plenty)
+    """
+    if size < MIN_COMPRESS_SIZE:
+        return False
+    if os.path.splitext(name)[1].lower() in INCOMPRESSIBLE_EXTENSIONS:
+        return False
+    if not sample:
+        return False
+    compressed = zlib.compress(sample, 1)
+    return len(compressed) <= len(sample) * (1 - MIN_SAVING)
+
+
+class Compressor:
+    def __init__(self, codec):
+        """Compresses one transfer in pieces; call flush() after the last one"""
+        self.codec = codec
+        if codec == ZSTD and zstandard is not None:
+            self._stream = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+        elif codec == ZLIB:
+            self._stream = zlib.compressobj(ZLIB_LEVEL)
+        else:
+            raise ValueError(f"Unsupported codec: {codec}")
+
+    def compress(self, data):
+        """Compressed bytes ready to send, possibly empty while buffering"""
+        return self._stream.compress(data)
+
+    def flush(self):
+        """The rest of the compressed stream"""
+        return self._stream.flush()
+
+
+class _LimitedOutput:
+    def __init__(self):
+        """Sink for zstd output that stops at a limit instead of buffering it all"""
+        self.parts = []
+        self.size = 0
+        self.limit = None
+
+    def write(self, data):
+        self.size += len(data)
+        if self.limit is not None and self.size > self.limit:
+            raise CompressionError(f"Decompressed data exceeds {self.limit} bytes")
+        self.parts.append(bytes(data))
+        return len(data)
+
+    def take(self):
+        data = b''.join(self.parts)
+        self.parts = []
+        self.size = 0
+        return data
+
+
+class Decompressor:
+    def __init__(self, codec):
+        """Decompresses one transfer from pieces in any split"""
+        self.codec = codec
+        if codec == ZSTD and zstandard is not None:
+            # A stream writer hands output over in pieces, so a limit can be
+            # enforced before the whole expansion is in memory
+            self._output = _LimitedOutput()
+            self._stream = zstandard.ZstdDecompressor().stream_writer(self._output)
+        elif codec == ZLIB:
+            self._stream = zlib.decompressobj()
+        else:
+            raise ValueError(f"Unsupported codec: {codec}")
+
+    def decompress(self, data, limit=None):
+        """Decompressed bytes of the next piece
+
+        limit: most bytes the piece may expand to; CompressionError is raised
+               as soon as the output passes it, so a small hostile frame
+               cannot inflate into memory first
+        """
+        try:
+            if self.codec == ZLIB:
+                if limit is None:
+                    return self._stream.decompress(data)
+                output = self._stream.decompress(data, limit + 1)
+                if len(output) > limit:
+                    raise CompressionError(f"Decompressed data exceeds {limit} bytes")
+                return output
+            self._output.limit = limit
+            try:
+                self._stream.write(data)
+            except CompressionError:
+                self._output.take()
+                raise
+            return self._output.take()
+        except DECODE_ERRORS as e:
+            raise CompressionError(f"Corrupt {self.codec} data: {e}") from e
@@ -0,0 +1,256 @@
+"""
+Dashboard File Protocol
+Binary framing shared by the file server and the dashboard client
+
+Every frame is a 9-byte header (type: u8, payload length: u64, network
+byte order) followed by the payload. Control payloads are UTF-8 JSON.
+FILE_DATA payloads are raw file bytes of any size, so the decoder hands
+them out in pieces as they arrive instead of buffering whole frames.
+
+GET_FILE may ask for a byte range. FILE_START then describes the bytes that
+follow and carries a BLAKE2b digest of the whole file, so a client can verify
+a download incrementally and resume a partial one. With if_hash set, the
+range is honoured only if the file still has that digest; otherwise the
+server sends the whole file from offset 0 (like HTTP If-Range). With
+if_none_match set to the digest of a copy the client already holds, an
+unchanged file is answered with NOT_MODIFIED instead of its contents (like
+HTTP If-None-Match).
+
+A framed client opens with HELLO, and both sides use the lower of the two
+versions. In version 1 requests are answered one at a time and a file
+arrives as a single FILE_DATA frame. Version 2 multiplexes: requests carry a
+client-chosen "id" that is echoed in the reply, several may be in flight,
+and files arrive as FILE_CHUNK frames (a u32 request id, then at most
+CHUNK_SIZE bytes) interleaved with other replies. A listing is therefore
+never stuck behind a large download. Version 1 suits connections that make
+one request at a time (parallel range streams, benchmarks) because a whole
+range goes out in one sendfile call.
+
+A version 2 client may list the codecs it decodes in HELLO ("compression":
+["zstd", "zlib"]) and the server answers with the one it will use. A
+FILE_START with "encoding" then means that transfer's FILE_CHUNK payloads
+form one compressed stream; "length" and "hash" still describe the
+uncompressed bytes. See servers/file_compression.py.
+
+Servers that only speak the original text protocol (FILE_LIST / GET_FILE: /
+FILE_SIZE: / ACK) send their text listing instead, which lets either side
+fall back to it.
+"""
+import json
+import struct
+import hashlib
+
+HEADER = struct.Struct('!BQ')
+STREAM_ID = struct.Struct('!I')
+PROTOCOL = 'nova-link-files'
+VERSION = 2
+MULTIPLEXED_VERSION = 2
+CHUNK_SIZE = 256 * 1024
+
+# Frame types
+HELLO = 0x01        # both ways: {"protocol", "version", "compression"?}
+LIST = 0x02         # client: {"id"?}, request the listing
+FILE_LIST = 0x03    # server: {"id"?, "files": [name, ...]}
+GET_FILE = 0x04     # client: {"id"?, "name", "offset"?, "length"?, "if_hash"?, "if_none_match"?}
+FILE_START = 0x05   # server: {"id"?, "name", "size", "offset", "length", "hash", "encoding"?}
+FILE_DATA = 0x06    # server, version 1: the whole range as raw bytes
+FILE_CHUNK = 0x07   # server, version 2: u32 request id + part of the range
+NOT_MODIFIED = 0x08 # server: {"id"?, "name", "size", "hash"}, the client's copy is current
+ERROR = 0x0F        # server: {"id"?, "error"}
+
+STREAMED_TYPES = frozenset({FILE_DATA, FILE_CHUNK})
+FRAME_TYPES = frozenset({
+    HELLO, LIST, FILE_LIST, GET_FILE, FILE_START, FILE_DATA, FILE_CHUNK, NOT_MODIFIED, ERROR
+})
+
+# Control payloads are buffered whole; anything larger is a broken peer
+MAX_CONTROL_PAYLOAD = 64 * 1024 * 1024
+MAX_HELLO_PAYLOAD = 4096
+
+LEGACY_LIST_PREFIX = b'FILE_LIST'
+
+HASH_NAME = 'blake2b-256'
+
+
+class ProtocolError(Exception):
+    """The peer sent bytes that are not a valid frame"""
+
+
+def encode_frame(frame_type, payload=b''):
+    """Header plus payload, ready to send"""
+    return HEADER.pack(frame_type, len(payload)) + payload
+
+
+def encode_message(frame_type, **fields):
+    """A control frame carrying fields as JSON"""
+    return encode_frame(frame_type, json.dumps(fields, separators=(',', ':')).encode('utf-8'))
+
+
+def decode_message(payload):
+    """Fields of a control frame"""
+    return json.loads(bytes(payload).decode('utf-8')) if payload else {}
+
+
+def new_hash():
+    """Hasher for FILE_START digests"""
+    return hashlib.blake2b(digest_size=32)
+
+
+def hash_file(path, limit=None, chunk_size=1024 * 1024):
+    """Digest of a file (or of its first limit bytes), read in chunks"""
+    hasher = new_hash()
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    remaining = limit
+    with open(path, 'rb') as f:
+        while remaining is None or remaining > 0:
+            n = f.readinto(view if remaining is None else view[:min(remaining, chunk_size)])
+            if not n:
+                break
+            hasher.update(view[:n])
+            if remaining is not None:
+                remaining -= n
+    return hasher
+
+
+def hello(version=VERSION, compression=None):
+    """HELLO frame; compression is the client's codec list or the server's choice"""
+    if compression is None:
+        return encode_message(HELLO, protocol=PROTOCOL, version=version)
+    return encode_message(HELLO, protocol=PROTOCOL, version=version, compression=compression)
+
+
+def chunk_header(request_id, length):
+    """Header of a FILE_CHUNK frame carrying length bytes for request_id"""
+    return HEADER.pack(FILE_CHUNK, STREAM_ID.size + length) + STREAM_ID.pack(request_id)
+
+
+def starts_with_hello(data):
+    """True if data opens with a HELLO frame header (the framed handshake)"""
+    if len(data) < HEADER.size:
+        return False
+    frame_type, length = HEADER.unpack_from(data)
+    return frame_type == HELLO and length <= MAX_HELLO_PAYLOAD
+
+
+class FrameDecoder:
+    def __init__(self, max_control_payload=MAX_CONTROL_PAYLOAD):
+        """Incremental frame parser; feed it bytes exactly as they arrive
+
+        Frames may be split across or packed into reads in any way.
+        """
+        self.max_control_payload = max_control_payload
+        self.stream_id = None  # request id of the FILE_CHUNK being parsed
+        self._buffer = bytearray()  # partial header, stream id or control payload
+        self._type = None
+        self._remaining = 0
+        self._awaiting_id = False
+
+    def feed(self, data):
+        """Parse data, returns a list of (frame_type, payload, final, stream_id)
+
+        Control frames come out whole (final is always True). FILE_DATA and
+        FILE_CHUNK payloads come out as memoryview slices of data, final on
+        the last piece of the frame, so they must be consumed before data is
+        reused. stream_id is the request id of a FILE_CHUNK, else None.
+        """
+        events = []
+        view = memoryview(data)
+        while view:
+            if self._type is None:
+                view = self._read_header(view)
+                if self._type is None:
+                    break
+            if self._awaiting_id:
+                view = self._read_stream_id(view)
+                if self._awaiting_id:
+                    break
+            if self._remaining == 0:
+                events.append((self._type, b'', True, self.stream_id))
+                self._end_frame()
+                continue
+            if not view:
+                break  # header only; the payload comes with a later feed
+
+            piece = view[:self._remaining]
+            view = view[len(piece):]
+            self._remaining -= len(piece)
+            final = self._remaining == 0
+
+            if self._type in STREAMED_TYPES:
+                events.append((self._type, piece, final, self.stream_id))
+            else:
+                self._buffer += piece
+                if final:
+                    events.append((self._type, bytes(self._buffer), True, None))
+                    self._buffer.clear()
+
+            if final:
+                self._end_frame()
+        return events
+
+    @property
+    def payload_remaining(self):
+        """Bytes left of the streamed frame being parsed, 0 between frames"""
+        if self._type not in STREAMED_TYPES or self._awaiting_id:
+            return 0
+        return self._remaining
+
+    def advance(self, n):
+        """Account for n streamed payload bytes the caller read itself
+
+        Lets a receiver recv_into its destination buffer directly instead of
+        feeding the bytes through feed(). Returns True if the frame is complete.
+        """
+        if n > self.payload_remaining:
+            raise ValueError(f"Only {self.payload_remaining} payload bytes remain")
+        self._remaining -= n
+        if self._remaining:
+            return False
+        self._end_frame()
+        return True
+
+    def _end_frame(self):
+        self._type = None
+        self.stream_id = None
+
+    def _take(self, view, size):
+        """Collect size bytes across feeds, returns (bytes or None, rest of view)"""
+        if not self._buffer and len(view) >= size:
+            return view[:size], view[size:]
+        needed = size - len(self._buffer)
+        self._buffer += view[:needed]
+        view = view[needed:]
+        if len(self._buffer) < size:
+            return None, view
+        taken = bytes(self._buffer)
+        self._buffer.clear()
+        return taken, view
+
+    def _read_header(self, view):
+        """Consume header bytes from view, returns what is left of it"""
+        header, view = self._take(view, HEADER.size)
+        if header is None:
+            return view
+        frame_type, length = HEADER.unpack_from(header)
+
+        if frame_type not in FRAME_TYPES:
+            raise ProtocolError(f"Unknown frame type {frame_type:#x}")
+        if frame_type not in STREAMED_TYPES and length > self.max_control_payload:
+            raise ProtocolError(f"Control frame of {length} bytes exceeds limit")
+        if frame_type == FILE_CHUNK:
+            if length < STREAM_ID.size:
+                raise ProtocolError("FILE_CHUNK frame without a request id")
+            length -= STREAM_ID.size
+            self._awaiting_id = True
+
+        self._type = frame_type
+        self._remaining = length
+        return view
+
+    def _read_stream_id(self, view):
+        stream_id, view = self._take(view, STREAM_ID.size)
+        if stream_id is not None:
+            self.stream_id = STREAM_ID.unpack_from(stream_id)[0]
+            self._awaiting_id = False
+        return view
@@ -0,0 +1,458 @@
+"""
+Nova-Link File Server
+Serves a directory to the dashboard's file browser over TCP, one asyncio
+task per client, with zero-copy (sendfile) transfers.
+
+Clients that open with a HELLO frame get the framed protocol described in
+servers/file_protocol.py. On version 2 connections every GET_FILE is served
+by its own task, and their chunks interleave under a per-connection write
+lock. Text files are compressed on the wire when the client offers a codec
+(servers/file_compression.py); compressed transfers are read and compressed
+in worker threads instead of sent with sendfile. Clients that send nothing
+within HELLO_TIMEOUT get the original text protocol:
+    server -> client   FILE_LIST\n<name>\n<name>...     on connect
+    client -> server   GET_FILE:<name>
+    server -> client   FILE_SIZE:<n>                     or ERROR:<reason>
+    client -> server   ACK
+    server -> client   <n raw bytes>
+
+Usage:
+    python -m servers.file_server --root servers/alpha_files --port 5555
+"""
+import os
+import sys
+import json
+import asyncio
+import logging
+import argparse
+
+from servers.file_protocol import (
+    HEADER, HELLO, LIST, FILE_LIST, GET_FILE, FILE_START, FILE_DATA, NOT_MODIFIED, ERROR,
+    VERSION, MULTIPLEXED_VERSION, CHUNK_SIZE,
+    FrameDecoder, ProtocolError, encode_frame, encode_message, decode_message,
+    hello, starts_with_hello, chunk_header, hash_file
+)
+from servers.file_compression import (
+    MIN_COMPRESS_SIZE, SAMPLE_SIZE, Compressor, choose_codec, worth_compressing
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'alpha_files')
+ACK_TIMEOUT = 30
+# How long a new connection may stay silent before it is treated as legacy
+HELLO_TIMEOUT = 0.3
+# Concurrent transfers per multiplexed connection; further GET_FILEs wait
+MAX_STREAMS = 16
+
+
+def read_at(f, offset, count):
+    """Up to count bytes of f from offset"""
+    f.seek(offset)
+    return f.read(count)
+
+
+def compress_at(f, compressor, offset, count, final):
+    """Compress count bytes of f from offset, finishing the stream if final"""
+    data = read_at(f, offset, count)
+    if len(data) != count:
+        raise ConnectionError(f"{f.name} changed while being sent")
+    compressed = compressor.compress(data)
+    return compressed + compressor.flush() if final else compressed
+
+
+class DirectoryListing:
+    def __init__(self, root):
+        """Cached listing of the regular files directly inside root
+
+        The directory is rescanned only when its mtime changes (a file was
+        added, removed or renamed), so serving a listing is one stat call.
+        """
+        self.root = os.path.abspath(root)
+        self._mtime_ns = None
+        self._paths = {}
+        self._legacy_payload = b''
+        self._framed_payload = b''
+        self._files_json = b'[]'
+
+    def _refresh(self):
+        mtime_ns = os.stat(self.root).st_mtime_ns
+        if mtime_ns == self._mtime_ns:
+            return
+
+        with os.scandir(self.root) as entries:
+            paths = {
+                entry.name: entry.path
+                for entry in entries
+                if entry.is_file() and not entry.name.startswith('.')
+            }
+        self._paths = dict(sorted(paths.items()))
+        self._legacy_payload = ('FILE_LIST\n' + '\n'.join(self._paths)).encode('utf-8')
+        self._files_json = json.dumps(list(self._paths), separators=(',', ':')).encode('utf-8')
+        self._framed_payload = encode_frame(FILE_LIST, b'{"files":' + self._files_json + b'}')
+        self._mtime_ns = mtime_ns
+        logger.info(f"📂 Indexed {len(self._paths)} file(s) in {self.root}")
+
+    def names(self):
+        self._refresh()
+        return list(self._paths)
+
+    def legacy_payload(self):
+        """The FILE_LIST message, encoded once per directory change"""
+        self._refresh()
+        return self._legacy_payload
+
+    def framed_payload(self, request_id=None):
+        """The FILE_LIST frame; the name list is encoded once per directory change"""
+        self._refresh()
+        if request_id is None:
+            return self._framed_payload
+        return encode_frame(
+            FILE_LIST,
+            b'{"id":' + json.dumps(request_id).encode('utf-8') + b',"files":' + self._files_json + b'}'
+        )
+
+    def path(self, name):
+        """Path of a listed file, or None; names outside the listing
+        (including any containing path separators) are never served"""
+        self._refresh()
+        return self._paths.get(name)
+
+
+class FramedSession:
+    def __init__(self, writer, max_streams=MAX_STREAMS):
+        """State of one framed connection"""
+        self.writer = writer
+        self.version = 1
+        self.codec = None  # compression negotiated in HELLO, multiplexed only
+        self.write_lock = asyncio.Lock()  # keeps frames from different streams whole
+        self.streams = asyncio.Semaphore(max_streams)
+        self.tasks = set()
+
+    @property
+    def multiplexed(self):
+        return self.version >= MULTIPLEXED_VERSION
+
+    async def send(self, data):
+        async with self.write_lock:
+            self.writer.write(data)
+            await self.writer.drain()
+
+
+def reply(frame_type, request_id, **fields):
+    """Control frame answering a request, echoing its id if it had one"""
+    if request_id is not None:
+        fields['id'] = request_id
+    return encode_message(frame_type, **fields)
+
+
+class FileServer:
+    def __init__(self, root=DEFAULT_ROOT, host='0.0.0.0', port=5555, backlog=4096,
+                 compression=True):
+        """Initialize file server for one directory
+
+        compression: compress transfers for clients that offer a codec
+        """
+        self.listing = DirectoryListing(root)
+        self.host = host
+        self.port = port
+        self.backlog = backlog
+        self.compression = compression
+        self.connections = 0
+        self.bytes_sent = 0
+        self._server = None
+        self._hashes = {}  # path -> ((size, mtime_ns), future of hex digest)
+        self._compressible = {}  # path -> ((size, mtime_ns), bool)
+
+    async def start(self):
+        self._server = await asyncio.start_server(
+            self.handle_client, self.host, self.port, backlog=self.backlog
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+        logger.info(f"🚀 Serving {self.listing.root} on {self.host}:{self.port}")
+        return self._server
+
+    async def serve_forever(self):
+        server = self._server or await self.start()
+        async with server:
+            await server.serve_forever()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def handle_client(self, reader, writer):
+        """Serve one dashboard connection until it closes"""
+        peer = writer.get_extra_info('peername')
+        self.connections += 1
+        try:
+            # Framed clients speak first; legacy clients wait for the listing
+            try:
+                head = await asyncio.wait_for(reader.readexactly(HEADER.size), HELLO_TIMEOUT)
+            except asyncio.TimeoutError:
+                head = b''
+
+            if starts_with_hello(head):
+                await self._serve_framed(reader, writer, head)
+            else:
+                await self._serve_legacy(reader, writer, head)
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.TimeoutError):
+            pass
+        except ProtocolError as e:
+            logger.warning(f"⚠️ Dropping {peer}: {e}")
+        except Exception as e:
+            logger.error(f"❌ Error serving {peer}: {e}")
+        finally:
+            self.connections -= 1
+            writer.close()
+
+    async def _serve_framed(self, reader, writer, data):
+        session = FramedSession(writer)
+        decoder = FrameDecoder()
+        try:
+            while data:
+                for frame_type, payload, _, _ in decoder.feed(data):
+                    await self._handle_frame(session, frame_type, payload)
+                data = await reader.read(65536)
+            # The client stopped sending; let its transfers finish
+            if session.tasks:
+                await asyncio.gather(*session.tasks, return_exceptions=True)
+        finally:
+            for task in session.tasks:
+                task.cancel()
+
+    async def _handle_frame(self, session, frame_type, payload):
+        if frame_type == HELLO:
+            fields = decode_message(payload)
+            session.version = max(1, min(int(fields.get('version', 1)), VERSION))
+            if session.multiplexed and self.compression:
+                # Only chunked transfers can carry a compressed stream
+                session.codec = choose_codec(fields.get('compression'))
+            # The listing follows the handshake, as in the legacy protocol
+            await session.send(
+                hello(session.version, session.codec) + self.listing.framed_payload()
+            )
+        elif frame_type == LIST:
+            await session.send(self.listing.framed_payload(decode_message(payload).get('id')))
+        elif frame_type == GET_FILE:
+            fields = decode_message(payload)
+            if not session.multiplexed:
+                await self._send_file_framed(session, fields)
+                return
+            # Waiting for a free stream slot also stops reading further requests
+            await session.streams.acquire()
+            task = asyncio.create_task(self._run_stream(session, fields))
+            session.tasks.add(task)
+            task.add_done_callback(session.tasks.discard)
+        else:
+            await session.send(encode_message(ERROR, error=f'Unexpected frame type {frame_type:#x}'))
+
+    async def _run_stream(self, session, fields):
+        """One multiplexed transfer; a failure mid-frame ends the connection"""
+        try:
+            await self._send_file_framed(session, fields)
+        except ConnectionError:
+            session.writer.close()
+        except Exception as e:
+            logger.error(f"❌ Error streaming {fields.get('name')}: {e}")
+            session.writer.close()
+        finally:
+            session.streams.release()
+
+    async def file_hash(self, path, stat):
+        """Hex digest of a file, computed once per version and shared by
+        concurrent requests; hashing runs in a worker thread"""
+        version = (stat.st_size, stat.st_mtime_ns)
+        cached = self._hashes.get(path)
+        if cached is None or cached[0] != version:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(None, lambda: hash_file(path).hexdigest())
+            cached = self._hashes[path] = (version, future)
+        return await asyncio.shield(cached[1])
+
+    async def _send_file_framed(self, session, fields):
+        """FILE_START then the requested range: one FILE_DATA frame (version 1)
+        or FILE_CHUNK frames that other replies can interleave with"""
+        writer = session.writer
+        request_id = fields.get('id')
+        name = fields.get('name', '')
+        path = self.listing.path(name)
+        if path is None:
+            await session.send(reply(ERROR, request_id, error=f'File not found: {name}', name=name))
+            return
+
+        with open(path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            size = stat.st_size
+            digest = await self.file_hash(path, stat)
+            if fields.get('if_none_match') == digest:
+                await session.send(reply(NOT_MODIFIED, request_id, name=name, size=size, hash=digest))
+                logger.info(f"📦 {name} not modified for {writer.get_extra_info('peername')}")
+                return
+
+            offset = fields.get('offset') or 0
+            if fields.get('if_hash') and fields['if_hash'] != digest:
+                offset = 0  # the file changed; the client's partial copy is stale
+            length = fields.get('length')
+            length = size - offset if length is None else min(length, size - offset)
+            if not 0 <= offset <= size or length < 0:
+                await session.send(reply(ERROR, request_id, error=f'Invalid range for {name}', name=name))
+                return
+
+            encoding = await self._transfer_encoding(session, name, path, stat, f, length)
+            extra = {'encoding': encoding} if encoding else {}
+            start = reply(FILE_START, request_id, name=name, size=size, offset=offset,
+                          length=length, hash=digest, **extra)
+            if encoding:
+                await session.send(start)
+                sent = await self._send_compressed(session, f, request_id, encoding, offset, length)
+            elif session.multiplexed:
+                await session.send(start)
+                await self._send_chunks(session, f, request_id, offset, length)
+                sent = length
+            else:
+                async with session.write_lock:
+                    writer.write(start + HEADER.pack(FILE_DATA, length))
+                    sent = await self._sendfile(writer, f, length, offset)
+                if sent != length:
+                    raise ConnectionError(f"{name} changed while being sent")
+
+        self.bytes_sent += sent
+        logger.info(
+            f"📤 Sent {name} [{offset}:{offset + length}] as {sent} bytes"
+            f"{f' ({encoding})' if encoding else ''} to {writer.get_extra_info('peername')}"
+        )
+
+    async def _send_chunks(self, session, f, request_id, offset, length):
+        """The range as FILE_CHUNK frames, each sent with sendfile"""
+        writer = session.writer
+        position, end = offset, offset + length
+        while position < end:
+            count = min(CHUNK_SIZE, end - position)
+            async with session.write_lock:
+                writer.write(chunk_header(request_id or 0, count))
+                sent = await self._sendfile(writer, f, count, position)
+            if sent != count:
+                # The file shrank mid-transfer; the frame can no longer be completed
+                raise ConnectionError(f"{f.name} changed while being sent")
+            position += count
+
+    async def _transfer_encoding(self, session, name, path, stat, f, length):
+        """Codec to compress this transfer with, or None to send it raw
+
+        Whether a file compresses well is decided once per file version from
+        a trial compression of its first SAMPLE_SIZE bytes.
+        """
+        if session.codec is None or length < MIN_COMPRESS_SIZE:
+            return None
+        version = (stat.st_size, stat.st_mtime_ns)
+        cached = self._compressible.get(path)
+        if cached is None or cached[0] != version:
+            loop = asyncio.get_running_loop()
+            compressible = await loop.run_in_executor(
+                None, lambda: worth_compressing(name, stat.st_size, read_at(f, 0, SAMPLE_SIZE))
+            )
+            cached = self._compressible[path] = (version, compressible)
+        return session.codec if cached[1] else None
+
+    async def _send_compressed(self, session, f, request_id, codec, offset, length):
+        """The range as one compressed stream split over FILE_CHUNK frames;
+        returns the compressed size. Reading and compressing run in worker
+        threads so the event loop keeps serving other clients."""
+        loop = asyncio.get_running_loop()
+        writer = session.writer
+        compressor = Compressor(codec)
+        position, end, sent = offset, offset + length, 0
+        while position < end:
+            count = min(CHUNK_SIZE, end - position)
+            final = position + count == end
+            data = await loop.run_in_executor(
+                None, compress_at, f, compressor, position, count, final
+            )
+            position += count
+            if not data:
+                continue  # the compressor is still buffering
+            async with session.write_lock:
+                writer.write(chunk_header(request_id or 0, len(data)))
+                writer.write(data)
+                await writer.drain()
+            sent += len(data)
+        return sent
+
+    async def _sendfile(self, writer, f, count, offset=0):
+        """Zero-copy when the transport supports it, falls back to reads"""
+        if not count:
+            return 0
+        return await asyncio.get_running_loop().sendfile(writer.transport, f, offset, count)
+
+    async def _serve_legacy(self, reader, writer, data):
+        writer.write(self.listing.legacy_payload())
+        await writer.drain()
+
+        while True:
+            data = data or await reader.read(4096)
+            if not data:
+                break
+
+            # Clicks can arrive coalesced: "GET_FILE:aGET_FILE:b"
+            for request in data.decode('utf-8', errors='ignore').split('GET_FILE:')[1:]:
+                name = request.strip()
+                if not await self._send_file_legacy(reader, writer, name):
+                    return
+            data = b''
+
+    async def _send_file_legacy(self, reader, writer, name):
+        """FILE_SIZE, wait for ACK, then the raw bytes; False drops the client"""
+        path = self.listing.path(name)
+        if path is None:
+            writer.write(f'ERROR:File not found: {name}'.encode('utf-8'))
+            await writer.drain()
+            return True
+
+        with open(path, 'rb') as f:
+            # Size of the file actually opened, even if it is replaced meanwhile
+            size = os.fstat(f.fileno()).st_size
+            writer.write(f'FILE_SIZE:{size}'.encode('utf-8'))
+            await writer.drain()
+
+            ack = await asyncio.wait_for(reader.readexactly(3), ACK_TIMEOUT)
+            if ack != b'ACK':
+                return False
+
+            await self._sendfile(writer, f, size)
+
+        self.bytes_sent += size
+        logger.info(f"📤 Sent {name} ({size} bytes) to {writer.get_extra_info('peername')}")
+        return True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve a directory to the dashboard file browser')
+    parser.add_argument('--root', default=DEFAULT_ROOT, help='directory to serve')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=5555)
+    parser.add_argument('--backlog', type=int, default=4096,
+                        help='pending connections queued by the kernel')
+    parser.add_argument('--no-compression', action='store_true',
+                        help='always send files uncompressed')
+    parser.add_argument('-v', '--verbose', action='store_true', help='log every transfer')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.WARNING,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    server = FileServer(args.root, args.host, args.port, args.backlog,
+                        compression=not args.no_compression)
+    print(f"🚀 Serving {server.listing.root} on {args.host}:{args.port}")
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
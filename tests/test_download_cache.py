@@ -0,0 +1,164 @@
+"""
+Unit tests for the dashboard download cache
+"""
+import pytest
+import sys
+import os
+import json
+import hashlib
+import threading
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from gui.download_cache import DownloadCache, INDEX_NAME
+
+
+class FakeDownload:
+    def __init__(self, name, data, verified=True, path=None):
+        """Just the fields DownloadCache.put() reads from a finished Download"""
+        self.name = name
+        self.data = data
+        self.size = len(data)
+        self.file_hash = hashlib.blake2b(data, digest_size=32).hexdigest()
+        self.verified = verified
+        self.path = path
+
+
+def saved_names(cache):
+    with open(os.path.join(cache.directory, INDEX_NAME), encoding='utf-8') as f:
+        return [name for name, _ in json.load(f)]
+
+
+def test_least_recently_used_evicted(tmp_path):
+    """Test a hit protects an entry and the oldest one is evicted"""
+    cache = DownloadCache(str(tmp_path), max_bytes=30, max_file_size=10)
+    a, b, c = FakeDownload('a', b'a' * 10), FakeDownload('b', b'b' * 10), FakeDownload('c', b'c' * 10)
+    for download in (a, b, c):
+        assert cache.put(download)
+
+    assert cache.get('a', a.file_hash) is not None
+    assert cache.put(FakeDownload('d', b'd' * 10))
+
+    assert cache.lookup('b') is None
+    assert not os.path.exists(os.path.join(cache.directory, b.file_hash))
+    assert [cache.lookup(name) is not None for name in 'acd'] == [True, True, True]
+    assert cache.total_bytes == 30
+    assert (cache.hits, cache.misses) == (1, 0)
+
+
+def test_shared_contents_stored_once(tmp_path):
+    """Test names with the same contents share one blob until the last goes"""
+    cache = DownloadCache(str(tmp_path), max_bytes=20, max_file_size=10)
+    shared = FakeDownload('one.txt', b's' * 10)
+    blob = os.path.join(cache.directory, shared.file_hash)
+    cache.put(shared)
+    cache.put(FakeDownload('x.txt', b'x' * 5))
+    cache.put(FakeDownload('two.txt', shared.data))
+    assert cache.total_bytes == 15
+
+    # Evicting one.txt frees nothing, so x.txt goes too; the blob stays for two.txt
+    cache.put(FakeDownload('y.txt', b'y' * 10))
+    assert cache.lookup('one.txt') is None and cache.lookup('x.txt') is None
+    assert os.path.isfile(blob)
+    assert cache.get('two.txt', shared.file_hash).preview(100) == shared.data
+    assert cache.total_bytes == 20
+
+    # The hit made y.txt the oldest; then two.txt is the last user of the blob
+    cache.put(FakeDownload('z.txt', b'z' * 10))
+    assert cache.lookup('y.txt') is None and os.path.isfile(blob)
+    cache.put(FakeDownload('w.txt', b'w' * 10))
+    assert cache.lookup('two.txt') is None
+    assert not os.path.exists(blob)
+
+
+def test_reload_keeps_order_and_drops_missing_blobs(tmp_path):
+    """Test reopening the cache restores the index and recency"""
+    cache = DownloadCache(str(tmp_path), max_bytes=100)
+    a, b, c = FakeDownload('a', b'aaa'), FakeDownload('b', b'bbb'), FakeDownload('c', b'ccc')
+    for download in (a, b, c):
+        cache.put(download)
+    os.remove(os.path.join(cache.directory, c.file_hash))
+
+    # A hit is not written until flush(), put() or clear()
+    cache.get('a', a.file_hash)
+    assert saved_names(cache) == ['a', 'b', 'c']
+    cache.flush()
+    assert saved_names(cache) == ['b', 'c', 'a']
+
+    reopened = DownloadCache(str(tmp_path), max_bytes=100)
+    assert list(reopened._entries) == ['b', 'a']
+    assert reopened.get('b', b.file_hash).size == 3
+    assert reopened.get('c', c.file_hash) is None
+
+    # Over a smaller limit, loading evicts the oldest
+    smaller = DownloadCache(str(tmp_path), max_bytes=3)
+    assert list(smaller._entries) == ['a']
+
+
+def test_only_small_verified_files_cached(tmp_path):
+    """Test the max_file_size guard and unverified downloads"""
+    cache = DownloadCache(str(tmp_path), max_bytes=100)
+    assert cache.max_file_size == 25
+    assert not cache.put(FakeDownload('big', b'b' * 26))
+    assert cache.put(FakeDownload('fits', b'f' * 25))
+    assert not cache.put(FakeDownload('unchecked', b'u', verified=None))
+    assert cache.lookup('big') is None and cache.lookup('unchecked') is None
+
+    source = tmp_path / 'saved.bin'
+    source.write_bytes(b'on disk')
+    saved = FakeDownload('saved.bin', b'on disk', path=str(source))
+    saved.data = None
+    assert cache.put(saved)
+    assert cache.get('saved.bin', saved.file_hash).preview(100) == b'on disk'
+
+
+def test_clear(tmp_path):
+    """Test clear() removes every blob and the index entries"""
+    cache = DownloadCache(str(tmp_path), max_bytes=100)
+    cache.put(FakeDownload('a', b'aaa'))
+    cache.clear()
+    assert os.listdir(cache.directory) == [INDEX_NAME]
+    assert saved_names(cache) == []
+
+
+@pytest.mark.parametrize('index', [
+    '{"a": {"hash": "x", "size": 1}}',
+    '[["a", {"size": 3}], ["b"], 7, null, ["c", {"hash": 5, "size": "3"}]]',
+    'null',
+    '[[',
+])
+def test_malformed_index_treated_as_empty(tmp_path, index):
+    """Test an index of the wrong shape does not stop the cache opening"""
+    (tmp_path / INDEX_NAME).write_text(index)
+    cache = DownloadCache(str(tmp_path), max_bytes=100)
+    assert cache.total_bytes == 0
+    assert cache.put(FakeDownload('a', b'aaa'))
+    assert saved_names(cache) == ['a']
+
+
+def test_same_contents_stored_from_several_threads(tmp_path):
+    """Test concurrent puts of one digest never share a temp file"""
+    cache = DownloadCache(str(tmp_path), max_bytes=1 << 20)
+    data = os.urandom(64 * 1024)
+    barrier = threading.Barrier(8)
+    stored = []
+
+    def put(i):
+        barrier.wait()
+        stored.append(cache.put(FakeDownload(f'copy_{i}', data)))
+
+    threads = [threading.Thread(target=put, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert stored == [True] * 8
+
+    file_hash = FakeDownload('', data).file_hash
+    assert sorted(os.listdir(cache.directory)) == sorted([INDEX_NAME, file_hash])
+    assert cache.get('copy_0', file_hash).preview(len(data) + 1) == data
+    assert cache.total_bytes == len(data)
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
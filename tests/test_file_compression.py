@@ -0,0 +1,56 @@
+"""
+Unit tests for file transfer compression
+"""
+import pytest
+import sys
+import os
+import zlib
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from servers.file_compression import ZLIB, Compressor, Decompressor, CompressionError
+from gui.file_client import Download
+
+# 64 MiB of zeros compresses to about 64 KiB
+BOMB = zlib.compress(b'\0' * (64 << 20), 9)
+
+
+def test_round_trip_in_pieces():
+    """Test output split across pieces reassembles within the limit"""
+    data = b''.join(b'%d,' % i for i in range(50000))
+    compressor = Compressor(ZLIB)
+    wire = compressor.compress(data) + compressor.flush()
+
+    decompressor = Decompressor(ZLIB)
+    output = b''
+    for i in range(0, len(wire), 1000):
+        output += decompressor.decompress(wire[i:i + 1000], limit=len(data) - len(output))
+    assert output == data
+
+
+def test_oversized_output_stops_early():
+    """Test a small frame that inflates past the limit fails without inflating"""
+    tracemalloc.start()
+    try:
+        with pytest.raises(CompressionError):
+            Decompressor(ZLIB).decompress(BOMB, limit=1000)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert peak < 8 << 20
+
+
+def test_download_rejects_oversized_payload():
+    """Test a compressed download larger than announced fails"""
+    download = Download('bomb.bin', 4096, encoding=ZLIB)
+    with pytest.raises(CompressionError):
+        download.write(BOMB[:len(BOMB) // 2])
+    assert download.received == 0
+
+    with pytest.raises(CompressionError):
+        Download('corrupt.bin', 10, encoding=ZLIB).write(b'not zlib at all')
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
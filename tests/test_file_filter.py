@@ -0,0 +1,85 @@
+"""
+Unit tests for the dashboard file list filter
+"""
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from gui.file_filter import FileFilter
+
+NAMES = ['Report.PDF', 'notes.txt', 'report-2024.csv', 'photo.jpg', 'rePOrt.txt']
+
+
+class CountingList(list):
+    """List that counts item reads, to see how many names a filter scans"""
+    reads = 0
+
+    def __getitem__(self, index):
+        self.reads += 1
+        return super().__getitem__(index)
+
+
+def matched(file_filter):
+    return [file_filter.name(i) for i in range(len(file_filter))]
+
+
+def test_extended_query_narrows_previous_matches():
+    """Test typing more only rescans the names that matched so far"""
+    file_filter = FileFilter(NAMES)
+    assert file_filter.filter('rep')
+    assert matched(file_filter) == ['Report.PDF', 'report-2024.csv', 'rePOrt.txt']
+
+    file_filter._folded = CountingList(file_filter._folded)
+    assert file_filter.filter('REPORT.')
+    assert matched(file_filter) == ['Report.PDF', 'rePOrt.txt']
+    assert file_filter._folded.reads == 3
+
+
+def test_shortened_query_widens():
+    """Test deleting characters brings back names the longer query hid"""
+    file_filter = FileFilter(NAMES)
+    file_filter.filter('report.t')
+    assert matched(file_filter) == ['rePOrt.txt']
+
+    assert file_filter.filter('.t')
+    assert matched(file_filter) == ['notes.txt', 'rePOrt.txt']
+    assert file_filter.filter('')
+    assert matched(file_filter) == NAMES
+    assert file_filter.filter('photo')
+    assert matched(file_filter) == ['photo.jpg']
+
+
+def test_unchanged_query_reports_no_change():
+    """Test whitespace and case changes alone do not refilter"""
+    file_filter = FileFilter(NAMES)
+    assert not file_filter.filter('  ')
+    assert file_filter.filter('Notes')
+    assert not file_filter.filter(' NOTES ')
+
+
+def test_new_listing_keeps_query():
+    """Test set_names applies the current query to the new names"""
+    file_filter = FileFilter(NAMES)
+    file_filter.filter('txt')
+    file_filter.set_names(['a.txt', 'b.bin', 'C.TXT'])
+    assert file_filter.query == 'txt'
+    assert matched(file_filter) == ['a.txt', 'C.TXT']
+
+    # Narrowing still works from the new listing's matches
+    file_filter.filter('c.txt')
+    assert matched(file_filter) == ['C.TXT']
+
+
+def test_blank_names_dropped():
+    """Test empty and whitespace-only names never show up"""
+    file_filter = FileFilter(['', 'a.txt', '   ', '\t', 'b.txt'])
+    assert file_filter.names == ['a.txt', 'b.txt']
+    assert len(file_filter) == 2
+    file_filter.filter('b')
+    assert matched(file_filter) == ['b.txt']
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
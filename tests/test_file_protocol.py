@@ -0,0 +1,127 @@
+"""
+Unit tests for the dashboard file protocol's framing
+"""
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from servers.file_protocol import (
+    HEADER, HELLO, LIST, FILE_LIST, FILE_START, FILE_DATA, FILE_CHUNK, ERROR,
+    FrameDecoder, ProtocolError, encode_frame, encode_message, decode_message,
+    hello, chunk_header, starts_with_hello
+)
+
+
+def collect(events):
+    """Join streamed pieces: list of (frame_type, payload bytes, stream_id)"""
+    frames = []
+    pending = None
+    for frame_type, payload, final, stream_id in events:
+        if pending is None:
+            pending = [frame_type, b'', stream_id]
+        pending[1] += bytes(payload)
+        if final:
+            frames.append(tuple(pending))
+            pending = None
+    return frames
+
+
+def sample_stream():
+    return (
+        hello()
+        + encode_message(FILE_LIST, files=['a.txt', 'b.txt'])
+        + encode_message(FILE_START, name='a.txt', size=5, offset=0, length=5, hash='x')
+        + encode_frame(FILE_DATA, b'hello')
+        + chunk_header(7, 3) + b'abc'
+        + encode_frame(LIST)
+        + encode_message(ERROR, error='nope')
+    )
+
+
+EXPECTED = [
+    (HELLO, None, None),
+    (FILE_LIST, None, None),
+    (FILE_START, None, None),
+    (FILE_DATA, b'hello', None),
+    (FILE_CHUNK, b'abc', 7),
+    (LIST, b'', None),
+    (ERROR, None, None),
+]
+
+
+def check(frames):
+    assert [(t, s) for t, _, s in frames] == [(t, s) for t, _, s in EXPECTED]
+    for (_, payload, _), (_, expected, _) in zip(frames, EXPECTED):
+        if expected is not None:
+            assert payload == expected
+    assert decode_message(frames[1][1])['files'] == ['a.txt', 'b.txt']
+    assert decode_message(frames[6][1])['error'] == 'nope'
+
+
+def test_frames_fed_byte_by_byte():
+    """Test frames split at every possible point decode the same"""
+    decoder = FrameDecoder()
+    events = []
+    for byte in sample_stream():
+        events.extend(decoder.feed(bytes([byte])))
+    check(collect(events))
+
+
+def test_frames_coalesced_in_one_buffer():
+    """Test several frames packed into one read all come out"""
+    check(collect(FrameDecoder().feed(sample_stream())))
+
+
+def test_streamed_payload_received_directly():
+    """Test advance() lets a receiver read a data frame's payload itself"""
+    decoder = FrameDecoder()
+    assert decoder.feed(HEADER.pack(FILE_DATA, 10) + b'abc') == [(FILE_DATA, b'abc', False, None)]
+    assert decoder.payload_remaining == 7
+    assert not decoder.advance(4)
+    with pytest.raises(ValueError):
+        decoder.advance(4)
+    assert decoder.advance(3)
+    assert decoder.payload_remaining == 0
+
+    # FILE_CHUNK: nothing remains until the stream id has been read
+    assert decoder.feed(chunk_header(42, 6)[:-2]) == []
+    assert decoder.payload_remaining == 0
+    decoder.feed(chunk_header(42, 6)[-2:])
+    assert decoder.stream_id == 42 and decoder.payload_remaining == 6
+    assert decoder.advance(6)
+    assert decoder.stream_id is None
+
+
+def test_zero_length_frames():
+    """Test empty control and data frames are reported once, complete"""
+    data = encode_frame(LIST) + encode_frame(FILE_DATA) + chunk_header(3, 0)
+    assert FrameDecoder().feed(data) == [
+        (LIST, b'', True, None), (FILE_DATA, b'', True, None), (FILE_CHUNK, b'', True, 3)
+    ]
+
+
+def test_invalid_frames_rejected():
+    """Test oversized control frames and unknown types raise ProtocolError"""
+    with pytest.raises(ProtocolError):
+        FrameDecoder(max_control_payload=16).feed(HEADER.pack(FILE_LIST, 17))
+    with pytest.raises(ProtocolError):
+        FrameDecoder().feed(HEADER.pack(0x7E, 0))
+    with pytest.raises(ProtocolError):
+        FrameDecoder().feed(HEADER.pack(FILE_CHUNK, 2))
+
+    # Data frames may be any size
+    assert FrameDecoder(max_control_payload=16).feed(HEADER.pack(FILE_DATA, 1 << 40)) == []
+
+
+def test_starts_with_hello():
+    """Test the handshake check used to tell framed from text clients"""
+    assert starts_with_hello(hello())
+    assert not starts_with_hello(hello()[:HEADER.size - 1])
+    assert not starts_with_hello(b'GET_FILE:a.txt')
+    assert not starts_with_hello(HEADER.pack(HELLO, 1 << 20))
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
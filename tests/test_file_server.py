@@ -0,0 +1,147 @@
+"""
+Loopback tests for the dashboard file server and client
+"""
+import pytest
+import sys
+import os
+import socket
+import asyncio
+import threading
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from servers.file_server import FileServer
+from servers.file_protocol import (
+    FILE_LIST, GET_FILE, FILE_DATA, FrameDecoder,
+    encode_message, decode_message, hello, hash_file
+)
+from gui.file_client import FileClient
+
+TEXT = b''.join(b'line %d of a compressible text file\n' % i for i in range(2000))
+
+
+@pytest.fixture
+def server(tmp_path):
+    """A FileServer on a free loopback port, run by an event loop thread"""
+    root = tmp_path / 'files'
+    root.mkdir()
+    (root / 'small.txt').write_bytes(b'hello')
+    (root / 'empty.txt').write_bytes(b'')
+    (root / 'text.log').write_bytes(TEXT)
+
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    file_server = FileServer(str(root), host='127.0.0.1', port=0)
+    asyncio.run_coroutine_threadsafe(file_server.start(), loop).result(5)
+    yield file_server
+
+    asyncio.run_coroutine_threadsafe(file_server.close(), loop).result(5)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(5)
+    loop.close()
+
+
+def read_frames(sock, decoder, until):
+    """Collect whole frames as (type, payload) until one of type until arrives"""
+    frames = []
+    data = {}
+    while True:
+        chunk = sock.recv(65536)
+        assert chunk, "server closed the connection"
+        for frame_type, payload, final, _ in decoder.feed(chunk):
+            data[frame_type] = data.get(frame_type, b'') + bytes(payload)
+            if final:
+                frames.append((frame_type, data.pop(frame_type)))
+                if frame_type == until:
+                    return frames
+
+
+def test_version_1_round_trip(server):
+    """Test the one-request-at-a-time framed protocol"""
+    with socket.create_connection(('127.0.0.1', server.port), timeout=5) as sock:
+        decoder = FrameDecoder()
+        sock.sendall(hello(version=1))
+        frames = read_frames(sock, decoder, FILE_LIST)
+        assert decode_message(frames[0][1])['version'] == 1
+        assert decode_message(frames[-1][1])['files'] == ['empty.txt', 'small.txt', 'text.log']
+
+        sock.sendall(encode_message(GET_FILE, name='small.txt', offset=1, length=3))
+        start, data = read_frames(sock, decoder, FILE_DATA)
+        fields = decode_message(start[1])
+        assert (fields['offset'], fields['length'], fields['size']) == (1, 3, 5)
+        assert data == (FILE_DATA, b'ell')
+
+
+def test_version_2_client(server, tmp_path):
+    """Test pipelined requests, compression and errors with the client"""
+    client = FileClient('127.0.0.1', server.port, download_dir=str(tmp_path / 'downloads'))
+    received, errors, listings = [], [], []
+    done = threading.Event()
+    client.on_file_received = lambda download: (received.append(download), done.set())
+    client.on_error = lambda message: (errors.append(message), done.set())
+    client.on_file_list = listings.append
+
+    assert client.connect() and client.multiplexed
+    client.request_file('text.log')
+    client.request_file('small.txt')
+    client.request_file('empty.txt')
+    client.request_file('missing.txt')
+    threading.Thread(target=client.run, daemon=True).start()
+    try:
+        while len(received) + len(errors) < 4:
+            assert done.wait(5)
+            done.clear()
+    finally:
+        client.close()
+
+    downloads = {download.name: download for download in received}
+    assert bytes(downloads['text.log'].data) == TEXT
+    assert downloads['text.log'].encoding == 'zlib'
+    assert downloads['text.log'].verified
+    assert bytes(downloads['small.txt'].data) == b'hello'
+    assert downloads['empty.txt'].size == 0
+    assert errors == ['File not found: missing.txt']
+    assert listings[0] == ['empty.txt', 'small.txt', 'text.log']
+    assert client.bytes_received < len(TEXT)
+
+
+def test_legacy_text_protocol(server):
+    """Test clients that never send HELLO get the text protocol"""
+    with socket.create_connection(('127.0.0.1', server.port), timeout=5) as sock:
+        assert sock.recv(4096) == b'FILE_LIST\nempty.txt\nsmall.txt\ntext.log'
+        sock.sendall(b'GET_FILE:small.txt')
+        assert sock.recv(4096) == b'FILE_SIZE:5'
+        sock.sendall(b'ACK')
+        assert sock.recv(4096) == b'hello'
+
+        sock.sendall(b'GET_FILE:missing.txt')
+        assert sock.recv(4096) == b'ERROR:File not found: missing.txt'
+
+
+def test_resume_from_stale_partial(server, tmp_path):
+    """Test a .part of an older file version is replaced, not resumed"""
+    download_dir = tmp_path / 'downloads'
+    download_dir.mkdir()
+    (download_dir / 'text.log.part').write_bytes(b'stale')
+    (download_dir / 'text.log.part.json').write_text('{"name": "text.log", "hash": "old"}')
+
+    client = FileClient('127.0.0.1', server.port, download_dir=str(download_dir))
+    received = []
+    done = threading.Event()
+    client.on_file_received = lambda download: (received.append(download), done.set())
+    client.connect()
+    client.request_file('text.log')
+    threading.Thread(target=client.run, daemon=True).start()
+    try:
+        assert done.wait(5)
+    finally:
+        client.close()
+
+    assert received[0].verified
+    assert received[0].file_hash == hash_file(os.path.join(server.listing.root, 'text.log')).hexdigest()
+    assert os.listdir(download_dir) == []
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,78 @@
+"""
+Unit tests for the dashboard transfer meter
+"""
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from gui.transfer_meter import TransferMeter, format_eta
+
+
+def test_rate_over_window():
+    """Test the rate spans the window and old samples are trimmed"""
+    meter = TransferMeter(window=2.0)
+    assert meter.update(0, now=0.0) == 0.0
+    assert meter.update(1000, now=1.0) == 1000.0
+    assert meter.update(2000, now=2.0) == 1000.0
+
+    # Faster now: samples older than the window stop counting
+    meter.update(6000, now=3.0)
+    meter.update(10000, now=4.0)
+    assert len(meter._samples) == 3
+    assert meter.rate == 4000.0
+
+
+def test_trimming_keeps_two_samples():
+    """Test a gap longer than the window still leaves a rate to report"""
+    meter = TransferMeter(window=1.0)
+    meter.update(0, now=0.0)
+    meter.update(500, now=10.0)
+    assert len(meter._samples) == 2
+    assert meter.rate == 50.0
+
+
+def test_counter_restart_resets():
+    """Test a smaller total (a new transfer) starts a fresh window"""
+    meter = TransferMeter()
+    meter.update(0, now=0.0)
+    meter.update(5000, now=1.0)
+    assert meter.update(100, now=1.5) == 0.0
+    assert meter.update(600, now=2.0) == 1000.0
+
+    meter.reset()
+    assert meter.rate == 0.0
+
+
+def test_no_rate_without_elapsed_time():
+    """Test samples at the same instant give no rate rather than dividing by zero"""
+    meter = TransferMeter()
+    meter.update(0, now=5.0)
+    assert meter.update(100, now=5.0) == 0.0
+
+
+def test_eta():
+    """Test ETA from the current rate, None while stalled"""
+    meter = TransferMeter()
+    assert meter.eta(1000) is None
+    meter.update(0, now=0.0)
+    meter.update(1000, now=1.0)
+    assert meter.eta(30000) == 30.0
+    meter.update(1000, now=3.0)
+    meter.update(1000, now=6.0)
+    assert meter.eta(30000) is None
+
+
+def test_format_eta():
+    """Test ETAs render as m:ss or h:mm:ss"""
+    assert format_eta(None) == "--:--"
+    assert format_eta(0) == "0:00"
+    assert format_eta(59.6) == "1:00"
+    assert format_eta(754) == "12:34"
+    assert format_eta(3600) == "1:00:00"
+    assert format_eta(3 * 3600 + 5 * 60 + 9) == "3:05:09"
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
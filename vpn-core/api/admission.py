@@ -0,0 +1,172 @@
+"""
+API Admission Control
+Per-client token-bucket rate limiting plus a global concurrency cap, so an
+overloaded API rejects requests quickly instead of stalling all of them
+"""
+import time
+import threading
+from collections import OrderedDict
+
+
+class RateLimiter:
+    def __init__(self, rate, burst, max_clients=100000):
+        """Token bucket per client key
+
+        rate: tokens added per second
+        burst: bucket size (requests allowed at once after being idle)
+        max_clients: buckets kept; the least recently seen are dropped, which
+                     is harmless since an idle bucket has refilled anyway
+        """
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets = OrderedDict()  # key -> [tokens, last refill time]
+        self._lock = threading.Lock()
+
+    def allow(self, key, now=None):
+        """Take one token for key, returns (allowed, seconds until next token)"""
+        if now is None:
+            now = time.monotonic()
+
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [self.burst, now]
+                if len(self._buckets) > self.max_clients:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+                bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+                bucket[1] = now
+
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return True, 0.0
+            return False, (1 - bucket[0]) / self.rate
+
+    def refund(self, key):
+        """Return the token an allow() call took, e.g. when a later check refuses the request"""
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket[0] = min(self.burst, bucket[0] + 1)
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class ConcurrencyLimiter:
+    def __init__(self, max_concurrent, max_queue, queue_timeout):
+        """Cap requests in flight
+
+        max_concurrent: requests handled at once
+        max_queue: requests allowed to wait for a slot; more are rejected at once
+        queue_timeout: seconds a queued request waits before being rejected
+        """
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self.waiting = 0
+        self.peak_waiting = 0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        """Take a slot, returns False if the server is overloaded"""
+        with self._condition:
+            if self.in_flight < self.max_concurrent and not self.waiting:
+                self.in_flight += 1
+                return True
+            if self.waiting >= self.max_queue:
+                return False
+
+            self.waiting += 1
+            self.peak_waiting = max(self.peak_waiting, self.waiting)
+            try:
+                admitted = self._condition.wait_for(
+                    lambda: self.in_flight < self.max_concurrent, self.queue_timeout
+                )
+            finally:
+                self.waiting -= 1
+            if admitted:
+                self.in_flight += 1
+            return admitted
+
+    def release(self):
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify()
+
+
+class AdmissionControl:
+    def __init__(self, config=None):
+        """Build limiters from the `api.admission` config section"""
+        config = config or {}
+        self.enabled = config.get('enabled', True)
+        self.exempt_paths = set(config.get('exempt_paths', ['/api/health']))
+        self.expensive_paths = set(config.get('expensive_paths', [
+            '/api/client/register', '/api/client/unregister', '/api/ip/allocate'
+        ]))
+
+        self.limiter = RateLimiter(
+            config.get('requests_per_second', 50), config.get('burst', 100)
+        )
+        self.expensive_limiter = RateLimiter(
+            config.get('expensive_per_second', 5), config.get('expensive_burst', 20)
+        )
+        self.concurrency = ConcurrencyLimiter(
+            config.get('max_concurrent', 32),
+            config.get('max_queue', 64),
+            config.get('queue_timeout', 2.0)
+        )
+
+        self.admitted = 0
+        self.rate_limited = 0
+        self.overloaded = 0
+        self._stats_lock = threading.Lock()
+
+    def _count(self, counter):
+        with self._stats_lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def check(self, path, client_key):
+        """Decide on a request, returns (status, retry_after) or None if exempt
+
+        Status 200 means admitted: the request holds a concurrency slot until
+        release(). 429 and 503 are rejections.
+        """
+        if not self.enabled or path in self.exempt_paths:
+            return None
+
+        allowed, retry_after = self.limiter.allow(client_key)
+        if allowed and path in self.expensive_paths:
+            allowed, retry_after = self.expensive_limiter.allow(client_key)
+            if not allowed:
+                self.limiter.refund(client_key)  # a refused request costs nothing
+        if not allowed:
+            self._count('rate_limited')
+            return 429, retry_after
+
+        if not self.concurrency.acquire():
+            self._count('overloaded')
+            return 503, self.concurrency.queue_timeout
+
+        self._count('admitted')
+        return 200, 0.0
+
+    def release(self):
+        self.concurrency.release()
+
+    def get_stats(self):
+        """Admission counters and current queue depth"""
+        return {
+            'enabled': self.enabled,
+            'in_flight': self.concurrency.in_flight,
+            'queue_depth': self.concurrency.waiting,
+            'peak_queue_depth': self.concurrency.peak_waiting,
+            'max_concurrent': self.concurrency.max_concurrent,
+            'admitted': self.admitted,
+            'rejected_rate_limited': self.rate_limited,
+            'rejected_overloaded': self.overloaded,
+            'tracked_clients': len(self.limiter)
+        }
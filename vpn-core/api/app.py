@@ -1,30 +1,110 @@
 """
 VPN Core API - Flask REST API
 Exposes VPN Core functionality to other team members
+
+State lives in vpn-core/ (config/, keys/, logs/) unless NOVA_LINK_DATA_DIR
+points elsewhere, e.g. a scratch directory for benchmarks.
 """
-from flask import Flask, request, jsonify
+import math
+from flask import Flask, Response, g, request, jsonify
 from flask_cors import CORS
 import sys
 import os
+import time
+import functools
+import threading
+
+_import_started = time.perf_counter()
 
 # Add parent directory to path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from src.vpn_server import VPNServer
-from src.utils import setup_logging
+from src.utils import setup_logging, StateLockedError
+from api.admission import AdmissionControl
 
 # Initialize Flask app
 app = Flask(__name__)
 CORS(app)  # Enable CORS for Member 2's client app
 
-# Initialize VPN Server
-vpn_server = VPNServer()
+# Initialize VPN Server; importing the app (tests, the reloader's watcher
+# process) must not start background work, see start_warm_up() below
+vpn_server = VPNServer(data_dir=os.environ.get('NOVA_LINK_DATA_DIR'), warm_up=False)
 
 # Setup logging
-logger = setup_logging('../logs/api_server.log')
+logger = setup_logging(os.path.join(vpn_server.data_dir, 'logs', 'api_server.log'))
+logger.info(f"API ready in {(time.perf_counter() - _import_started) * 1000:.1f} ms")
+
+# Rate limiting and concurrency cap, see api.admission in server_config.yaml
+admission = AdmissionControl(vpn_server.config.get('api', {}).get('admission'))
+
+
+@app.before_request
+def admit_request():
+    """Reject requests over the client's rate or the server's capacity"""
+    # Keyed on the peer address: headers are client-chosen and unauthenticated,
+    # so keying on one would hand out a fresh bucket per request
+    result = admission.check(request.path, request.remote_addr)
+    if result is None:
+        return None
+
+    status, retry_after = result
+    if status == 200:
+        g.admitted = True
+        return None
+
+    response = jsonify({
+        'success': False,
+        'error': 'Rate limit exceeded' if status == 429 else 'Server overloaded, retry later'
+    })
+    response.status_code = status
+    response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
+@app.teardown_request
+def release_request(error=None):
+    if g.pop('admitted', False):
+        admission.release()
+
+
+# Serialized bodies of read-only endpoints: view name -> (version, expires_at, bytes)
+_response_cache = {}
+_response_cache_lock = threading.Lock()
+
+
+def cached_response(version=lambda: vpn_server.state_version, max_age=None):
+    """Serve a GET endpoint's JSON from memory until the state version changes
+
+    version: callable returning the value the response depends on
+    max_age: also rebuild after this many seconds (for time-based fields)
+
+    Entries are keyed by view name only, so cached views must not depend on
+    query arguments (which also keeps callers from growing the cache).
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            # Read the version before building, so a change made while the
+            # body is built leaves it keyed to the older version
+            current = version()
+            now = time.monotonic()
+            entry = _response_cache.get(view.__name__)
+            if entry and entry[0] == current and (entry[1] is None or now < entry[1]):
+                return Response(entry[2], mimetype='application/json')
+
+            response = view(*args, **kwargs)
+            if response.status_code == 200:
+                expires_at = now + max_age if max_age else None
+                with _response_cache_lock:
+                    _response_cache[view.__name__] = (current, expires_at, response.get_data())
+            return response
+        return wrapper
+    return decorator
 
 
 @app.route('/api/health', methods=['GET'])
+@cached_response(version=lambda: None)
 def health_check():
     """Health check endpoint"""
     return jsonify({
@@ -35,11 +115,12 @@ def health_check():
 
 
 @app.route('/api/server/info', methods=['GET'])
+@cached_response(version=lambda: None)
 def server_info():
     """Get server information"""
     return jsonify({
         'server_public_key': vpn_server.server_keys['public_key'],
-        'server_ip': '10.8.0.1',
+        'server_ip': vpn_server.server_ip,
         'server_port': 51820,
         'endpoint': 'YOUR_SERVER_IP:51820'
     })
@@ -84,6 +165,7 @@ def stop_tunnel():
 
 
 @app.route('/api/tunnel/status', methods=['GET'])
+@cached_response(max_age=1)
 def tunnel_status():
     """Get tunnel status"""
     status = vpn_server.get_status()
@@ -114,6 +196,46 @@ def register_client():
         return jsonify(result), 500
 
 
+@app.route('/api/client/renew', methods=['POST'])
+def renew_client():
+    """Renew a VPN client's IP lease"""
+    data = request.json
+    client_id = data.get('client_id')
+
+    if not client_id:
+        return jsonify({
+            'success': False,
+            'error': 'client_id is required'
+        }), 400
+
+    result = vpn_server.renew_client(client_id)
+
+    if result['success']:
+        return jsonify(result)
+    else:
+        return jsonify(result), 404
+
+
+@app.route('/api/client/config', methods=['POST'])
+def client_config():
+    """Get a registered VPN client's WireGuard config"""
+    data = request.json
+    client_id = data.get('client_id')
+
+    if not client_id:
+        return jsonify({
+            'success': False,
+            'error': 'client_id is required'
+        }), 400
+
+    result = vpn_server.get_client_config(client_id)
+
+    if result['success']:
+        return jsonify(result)
+    else:
+        return jsonify(result), 404
+
+
 @app.route('/api/client/unregister', methods=['POST'])
 def unregister_client():
     """Unregister a VPN client"""
@@ -190,6 +312,7 @@ def release_ip():
 
 
 @app.route('/api/ip/list', methods=['GET'])
+@cached_response()
 def list_ips():
     """List all IP allocations"""
     allocations = vpn_server.ip_allocator.list_allocations()
@@ -200,6 +323,7 @@ def list_ips():
 
 
 @app.route('/api/ip/stats', methods=['GET'])
+@cached_response(max_age=1)
 def ip_stats():
     """Get IP allocation statistics"""
     stats = vpn_server.ip_allocator.get_stats()
@@ -262,6 +386,7 @@ def remove_peer():
 
 
 @app.route('/api/peer/list', methods=['GET'])
+@cached_response()
 def list_peers():
     """List all active peers"""
     peers = vpn_server.tunnel_manager.list_peers()
@@ -271,6 +396,24 @@ def list_peers():
     })
 
 
+@app.route('/api/state/reconcile', methods=['POST'])
+def reconcile_state():
+    """Check allocations, peers and keys for drift and repair it"""
+    data = request.get_json(silent=True) or {}
+    repair = data.get('repair', True)
+
+    logger.info(f"API: Reconciling state (repair={repair})")
+
+    report = vpn_server.reconciler.reconcile(repair=repair)
+    return jsonify(report)
+
+
+@app.route('/api/admission/stats', methods=['GET'])
+def admission_stats():
+    """Get rate limiting and queue depth metrics"""
+    return jsonify(admission.get_stats())
+
+
 # Error handlers
 @app.errorhandler(404)
 def not_found(error):
@@ -296,8 +439,24 @@ if __name__ == '__main__':
     print(f"📚 API Documentation: http://localhost:5000/api/health")
     print("=" * 60 + "\n")
 
+    # With the reloader this file runs in a watcher process and a serving
+    # child; only the child (WERKZEUG_RUN_MAIN set) claims the state,
+    # reconciles and schedules
+    debug = True
+    serving = not debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true'
+    if serving:
+        # Keeps nova-link-admin from rewriting the state under us
+        try:
+            vpn_server.lock_state()
+        except StateLockedError as e:
+            print(f"❌ {e}: is nova-link-admin or another server running?")
+            sys.exit(1)
+
     # Start the VPN server
     vpn_server.start()
 
+    if serving:
+        vpn_server.start_warm_up()
+
     # Run Flask API
-    app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
+    app.run(host='0.0.0.0', port=5000, debug=debug)
\ No newline at end of file
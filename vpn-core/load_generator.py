@@ -0,0 +1,385 @@
+"""
+Load Generator for the VPN Core REST API
+Drives a weighted mix of register/unregister/status/list calls at a target
+rate, reports throughput, latency percentiles and error rates, then checks
+that the server state is still consistent.
+
+The in-process server (--start-server) keeps its state in a temporary
+directory, so a run never touches the live pool, peers or keys.
+
+Usage:
+    python load_generator.py --start-server --rps 50 --duration 20
+    python load_generator.py --base-url http://localhost:5000/api --rps 200
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import threading
+import tempfile
+import time
+import uuid
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from colorama import init, Fore
+
+init(autoreset=True)
+
+DEFAULT_BASE_URL = 'http://localhost:5000/api'
+DEFAULT_MIX = 'register=4,unregister=3,status=2,list=1'
+OPERATIONS = ('register', 'unregister', 'status', 'list')
+
+
+def parse_mix(spec):
+    """Parse a mix spec like 'register=4,status=1' into {operation: weight}"""
+    mix = {}
+    for part in spec.split(','):
+        if not part.strip():
+            continue
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise ValueError(f"Unknown operation in mix: {name}")
+        mix[name] = float(weight or 1)
+
+    if not mix or sum(mix.values()) <= 0:
+        raise ValueError("Operation mix must contain at least one positive weight")
+    return mix
+
+
+def positive_float(value):
+    """argparse type for rates and durations, which must be above zero"""
+    number = float(value)
+    if not number > 0:  # also rejects nan
+        raise argparse.ArgumentTypeError(f"must be greater than 0, got {value}")
+    return number
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(pct / 100.0 * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def start_local_server(data_dir, host='127.0.0.1', port=5055):
+    """Start the Flask API in-process on a background thread
+
+    data_dir: where the server keeps its state; never the live vpn-core data
+    """
+    from werkzeug.serving import make_server
+
+    # Read by api.app at import
+    os.environ['NOVA_LINK_DATA_DIR'] = data_dir
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from api.app import app, vpn_server, admission
+
+    # Measure the server itself; every request comes from one address.
+    # This only changes the app instance inside this process.
+    admission.enabled = False
+    vpn_server.start()
+    server = make_server(host, port, app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f'http://{host}:{port}/api'
+
+
+class LoadGenerator:
+    def __init__(self, base_url, rps, duration, mix, workers=32, timeout=10):
+        """Initialize load generator"""
+        self.base_url = base_url.rstrip('/')
+        self.rps = rps
+        self.duration = duration
+        self.mix = mix
+        self.workers = workers
+        self.timeout = timeout
+
+        # Client IDs are unique per run so repeated runs never collide
+        self.run_id = uuid.uuid4().hex[:8]
+        self._next_client = 0
+        self._registered = set()
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+        self.latencies = defaultdict(list)
+        self.errors = Counter()
+        self.counts = Counter()
+        self.error_samples = []
+
+    def _session(self):
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            self._local.session = session
+        return session
+
+    def _new_client_id(self):
+        with self._lock:
+            self._next_client += 1
+            client_id = f'load_{self.run_id}_{self._next_client}'
+            self._pending.add(client_id)
+            return client_id
+
+    def _take_registered(self):
+        with self._lock:
+            if not self._registered:
+                return None
+            client_id = random.choice(tuple(self._registered))
+            self._registered.discard(client_id)
+            self._pending.add(client_id)
+            return client_id
+
+    def _call(self, method, path, payload=None):
+        session = self._session()
+        url = f'{self.base_url}{path}'
+        if method == 'GET':
+            return session.get(url, timeout=self.timeout)
+        return session.post(url, json=payload, timeout=self.timeout)
+
+    def _execute(self, operation):
+        """Run a single operation and record its latency and outcome"""
+        client_id = None
+        if operation == 'unregister':
+            client_id = self._take_registered()
+            if client_id is None:
+                # Nothing to unregister yet, register instead
+                operation = 'register'
+
+        if operation == 'register':
+            client_id = self._new_client_id()
+
+        started = time.perf_counter()
+        ok = False
+        try:
+            if operation == 'register':
+                response = self._call('POST', '/client/register', {
+                    'client_id': client_id,
+                    'client_name': 'Load Test Client'
+                })
+            elif operation == 'unregister':
+                response = self._call('POST', '/client/unregister', {
+                    'client_id': client_id
+                })
+            elif operation == 'status':
+                response = self._call('GET', '/tunnel/status')
+            else:
+                response = self._call('GET', '/peer/list')
+
+            ok = response.status_code == 200
+            if not ok:
+                self._record_error(operation, f'HTTP {response.status_code}: {response.text[:120]}')
+        except Exception as e:
+            self._record_error(operation, f'{type(e).__name__}: {e}')
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.latencies[operation].append(elapsed)
+                self.counts[operation] += 1
+                if client_id is not None:
+                    self._pending.discard(client_id)
+                    # A failed unregister may still have removed the client,
+                    # a failed register may still have allocated; keep both
+                    # around so cleanup catches them
+                    if operation == 'register' or not ok:
+                        self._registered.add(client_id)
+
+    def _record_error(self, operation, message):
+        with self._lock:
+            self.errors[operation] += 1
+            if len(self.error_samples) < 10:
+                self.error_samples.append(f'{operation}: {message}')
+
+    def run(self):
+        """Issue requests at the target rate for the configured duration"""
+        operations = list(self.mix)
+        weights = [self.mix[op] for op in operations]
+        total = int(self.rps * self.duration)
+        interval = 1.0 / self.rps
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for i in range(total):
+                # Open-loop pacing: schedule against the start time so slow
+                # responses show up as latency, not as a lower offered rate
+                delay = started + i * interval - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                executor.submit(self._execute, random.choices(operations, weights)[0])
+        self.elapsed = time.perf_counter() - started
+        return self.report()
+
+    def report(self):
+        """Build a summary of throughput, latency and errors"""
+        summary = {'elapsed': self.elapsed, 'operations': {}}
+        all_latencies = []
+        total_requests = 0
+        total_errors = 0
+
+        for operation in OPERATIONS:
+            values = sorted(self.latencies.get(operation, []))
+            if not values:
+                continue
+            all_latencies.extend(values)
+            count = self.counts[operation]
+            errors = self.errors[operation]
+            total_requests += count
+            total_errors += errors
+            summary['operations'][operation] = {
+                'count': count,
+                'errors': errors,
+                'error_rate': errors / count,
+                'p50_ms': percentile(values, 50) * 1000,
+                'p90_ms': percentile(values, 90) * 1000,
+                'p99_ms': percentile(values, 99) * 1000,
+                'max_ms': values[-1] * 1000
+            }
+
+        all_latencies.sort()
+        summary['total_requests'] = total_requests
+        summary['total_errors'] = total_errors
+        summary['throughput_rps'] = total_requests / self.elapsed if self.elapsed else 0.0
+        summary['error_rate'] = total_errors / total_requests if total_requests else 0.0
+        summary['p50_ms'] = percentile(all_latencies, 50) * 1000
+        summary['p99_ms'] = percentile(all_latencies, 99) * 1000
+        return summary
+
+    def verify_invariants(self):
+        """Check for duplicate IPs and peers that do not match allocations"""
+        problems = []
+
+        allocations = self._call('GET', '/ip/list').json()['allocations']
+        peers = self._call('GET', '/peer/list').json()['peers']
+
+        ip_counts = Counter(a['ip_address'] for a in allocations)
+        for ip, count in ip_counts.items():
+            if count > 1:
+                problems.append(f'IP {ip} allocated {count} times')
+
+        alloc_by_client = {}
+        for allocation in allocations:
+            if allocation['client_id'] in alloc_by_client:
+                problems.append(f"Client {allocation['client_id']} has multiple allocations")
+            alloc_by_client[allocation['client_id']] = allocation['ip_address']
+
+        peer_counts = Counter(p['client_id'] for p in peers)
+        for client_id, count in peer_counts.items():
+            if count > 1:
+                problems.append(f'Peer {client_id} listed {count} times')
+
+        for peer in peers:
+            ip = alloc_by_client.get(peer['client_id'])
+            if ip is None:
+                problems.append(f"Peer {peer['client_id']} has no IP allocation")
+            elif peer['allowed_ip'] != f'{ip}/32':
+                problems.append(
+                    f"Peer {peer['client_id']} allows {peer['allowed_ip']} but owns {ip}"
+                )
+
+        for client_id in set(alloc_by_client) - set(peer_counts):
+            problems.append(f'Allocation for {client_id} has no peer')
+
+        return problems
+
+    def cleanup(self):
+        """Unregister every client this run may have left behind"""
+        with self._lock:
+            leftover = self._registered | self._pending
+            self._registered = set()
+            self._pending = set()
+
+        for client_id in leftover:
+            try:
+                self._call('POST', '/client/unregister', {'client_id': client_id})
+            except Exception:
+                pass
+        return len(leftover)
+
+
+def print_report(summary):
+    print(f"\n{Fore.YELLOW}{'=' * 72}")
+    print(f"{Fore.YELLOW}  LOAD TEST RESULTS")
+    print(f"{Fore.YELLOW}{'=' * 72}\n")
+
+    print(f"  {'Operation':<12}{'Count':>8}{'Errors':>8}{'p50 ms':>10}"
+          f"{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for operation, stats in summary['operations'].items():
+        print(f"  {operation:<12}{stats['count']:>8}{stats['errors']:>8}"
+              f"{stats['p50_ms']:>10.1f}{stats['p90_ms']:>10.1f}"
+              f"{stats['p99_ms']:>10.1f}{stats['max_ms']:>10.1f}")
+
+    print(f"\n{Fore.CYAN}  Requests:   {summary['total_requests']} in {summary['elapsed']:.1f}s")
+    print(f"{Fore.CYAN}  Throughput: {summary['throughput_rps']:.1f} req/s")
+    print(f"{Fore.CYAN}  Latency:    p50 {summary['p50_ms']:.1f} ms, p99 {summary['p99_ms']:.1f} ms")
+
+    color = Fore.GREEN if summary['total_errors'] == 0 else Fore.RED
+    print(f"{color}  Errors:     {summary['total_errors']} ({summary['error_rate'] * 100:.2f}%)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Nova-Link VPN Core API load generator')
+    parser.add_argument('--base-url', default=DEFAULT_BASE_URL,
+                        help='API base URL (ignored with --start-server)')
+    parser.add_argument('--start-server', action='store_true',
+                        help='start the API in-process instead of using a running one')
+    parser.add_argument('--port', type=int, default=5055,
+                        help='port for --start-server')
+    parser.add_argument('--data-dir',
+                        help='state directory for --start-server (default: a temporary '
+                             'one, removed afterwards)')
+    parser.add_argument('--rps', type=positive_float, default=20.0, help='target requests per second')
+    parser.add_argument('--duration', type=positive_float, default=10.0, help='run time in seconds')
+    parser.add_argument('--mix', default=DEFAULT_MIX,
+                        help=f'weighted operation mix (default: {DEFAULT_MIX})')
+    parser.add_argument('--workers', type=int, default=32, help='concurrent request threads')
+    parser.add_argument('--no-cleanup', action='store_true',
+                        help='leave registered load-test clients in place')
+    args = parser.parse_args(argv)
+
+    base_url = args.base_url
+    server = None
+    scratch_dir = None
+    if args.start_server:
+        data_dir = args.data_dir
+        if data_dir is None:
+            data_dir = scratch_dir = tempfile.mkdtemp(prefix='nova-link-load-')
+        server, base_url = start_local_server(data_dir, port=args.port)
+        print(f"{Fore.CYAN}Server state in {data_dir}")
+
+    print(f"{Fore.CYAN}Load testing {base_url} at {args.rps:g} req/s for {args.duration:g}s")
+    print(f"{Fore.CYAN}Mix: {args.mix}")
+
+    generator = LoadGenerator(base_url, args.rps, args.duration, parse_mix(args.mix),
+                              workers=args.workers)
+    try:
+        summary = generator.run()
+        print_report(summary)
+
+        problems = generator.verify_invariants()
+        if problems:
+            print(f"\n{Fore.RED}✗ {len(problems)} state invariant violation(s):")
+            for problem in problems[:20]:
+                print(f"{Fore.RED}  - {problem}")
+        else:
+            print(f"\n{Fore.GREEN}✓ State invariants hold (unique IPs, peers match allocations)")
+
+        for sample in generator.error_samples:
+            print(f"{Fore.RED}  sample error: {sample}")
+    finally:
+        if not args.no_cleanup:
+            removed = generator.cleanup()
+            print(f"\n{Fore.CYAN}Cleaned up {removed} load-test client(s)")
+        if server is not None:
+            server.shutdown()
+        if scratch_dir is not None:
+            shutil.rmtree(scratch_dir, ignore_errors=True)
+
+    return 0 if not problems and summary['total_errors'] == 0 else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
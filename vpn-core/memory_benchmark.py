@@ -0,0 +1,82 @@
+"""
+Memory Benchmark for peer and allocation records
+Builds N peers and N allocations both as the dicts stored in peers.json /
+ip_pool.json and as the slotted records held in memory, and reports the
+bytes used per entry for each.
+
+Usage:
+    python memory_benchmark.py --count 100000
+"""
+import argparse
+import base64
+import gc
+import os
+import sys
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.records import Peer, Allocation
+
+
+def make_peer(i):
+    return {
+        'client_id': f'client_{i:06d}',
+        'public_key': base64.b64encode(i.to_bytes(32, 'big')).decode('utf-8'),
+        'allowed_ip': f'10.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}/32',
+        'added_at': datetime.now().isoformat(),
+        'status': 'active'
+    }
+
+
+def make_allocation(i):
+    return {
+        'client_id': f'client_{i:06d}',
+        'client_name': f'Client {i}',
+        'ip_address': f'10.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}',
+        'allocated_at': datetime.now().isoformat(),
+        'status': 'active'
+    }
+
+
+def measure(build):
+    """Bytes allocated (and still held) by build()"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    data = build()
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del data
+    return used
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compare dict and record memory use')
+    parser.add_argument('--count', type=int, default=100000)
+    args = parser.parse_args(argv)
+    n = args.count
+
+    rows = [
+        ('peers (dict)', lambda: {p['client_id']: p for p in map(make_peer, range(n))}),
+        ('peers (Peer)', lambda: {
+            p.client_id: p for p in (Peer.from_dict(make_peer(i)) for i in range(n))
+        }),
+        ('allocations (dict)', lambda: {
+            a['client_id']: a for a in map(make_allocation, range(n))
+        }),
+        ('allocations (Allocation)', lambda: {
+            a.client_id: a for a in (Allocation.from_dict(make_allocation(i)) for i in range(n))
+        }),
+    ]
+
+    print(f"📊 Memory for {n} entries")
+    for name, build in rows:
+        used = measure(build)
+        print(f"   {name:<26} {used / 2 ** 20:8.1f} MiB  {used / n:7.0f} bytes/entry")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
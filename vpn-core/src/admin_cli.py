@@ -0,0 +1,251 @@
+"""
+Nova-Link Admin CLI
+Operates directly on the VPN state stores, so the API server must be
+stopped first; the CLI refuses to run while the server holds the state lock.
+Lists and results are written as JSON lines; register, unregister and import
+read clients from stdin when no client ids are given, and apply them in
+batches.
+
+Usage:
+    ./nova-link-admin register laptop_01 phone_02 --name "Field team"
+    cut -d, -f1 clients.csv | ./nova-link-admin register
+    ./nova-link-admin list peers | jq -r .allowed_ip
+    ./nova-link-admin export clients.jsonl
+    ./nova-link-admin import clients.jsonl
+    ./nova-link-admin gc --keys
+    ./nova-link-admin stats
+"""
+import sys
+import json
+import argparse
+import logging
+from itertools import islice
+
+LIST_KINDS = ('allocations', 'peers', 'keys')
+
+
+def write_line(record, out=None):
+    """Write one record as a JSON line"""
+    out = out or sys.stdout
+    out.write(json.dumps(record, separators=(',', ':')) + '\n')
+
+
+def parse_client_line(line):
+    """Parse a stdin line: a JSON object, or `client_id[,client_name]`"""
+    line = line.strip()
+    if not line or line.startswith('#'):
+        return None
+    if line.startswith('{'):
+        record = json.loads(line)
+        return record['client_id'], record.get('client_name') or 'VPN Client'
+    client_id, _, client_name = line.partition(',')
+    return client_id.strip(), client_name.strip() or 'VPN Client'
+
+
+def batches(items, size):
+    """Split an iterable into lists of at most size items"""
+    items = iter(items)
+    while True:
+        batch = list(islice(items, size))
+        if not batch:
+            return
+        yield batch
+
+
+def open_input(path):
+    return sys.stdin if path in (None, '-') else open(path, 'r', encoding='utf-8')
+
+
+class AdminCommands:
+    def __init__(self, server, batch_size=500, out=None):
+        """Initialize admin commands over a VPNServer"""
+        self.server = server
+        self.batch_size = batch_size
+        self.out = out or sys.stdout
+
+    def _emit_results(self, results):
+        failures = 0
+        for result in results:
+            write_line(result, self.out)
+            failures += not result['success']
+        self.out.flush()
+        return failures
+
+    def register(self, clients):
+        """Register (client_id, client_name) pairs, returns the failure count"""
+        failures = 0
+        for batch in batches(clients, self.batch_size):
+            failures += self._emit_results(self.server.register_clients(batch))
+        return failures
+
+    def unregister(self, client_ids):
+        """Unregister clients, returns the failure count"""
+        failures = 0
+        for batch in batches(client_ids, self.batch_size):
+            failures += self._emit_results(self.server.unregister_clients(batch))
+        return failures
+
+    def list(self, kind):
+        """Stream allocations, peers or stored public keys"""
+        if kind == 'allocations':
+            records = self.server.ip_allocator.iter_allocations()
+        elif kind == 'peers':
+            records = self.server.tunnel_manager.iter_peers()
+        else:
+            records = self.server.peer_config_gen.key_store.iter_public()
+
+        count = 0
+        for record in records:
+            write_line(record, self.out)
+            count += 1
+        return count
+
+    def export(self, out):
+        """Write every registered client (allocation plus public key) to out"""
+        key_store = self.server.peer_config_gen.key_store
+        count = 0
+        for allocation in self.server.ip_allocator.iter_allocations():
+            allocation['public_key'] = key_store.get_public_key(allocation['client_id'])
+            write_line(allocation, out)
+            count += 1
+        return count
+
+    def import_clients(self, lines):
+        """Register exported clients that are not registered yet
+
+        New keys are issued; private keys never leave the key store.
+        """
+        allocator = self.server.ip_allocator
+        pending = (
+            client for client in map(parse_client_line, lines)
+            if client is not None and allocator.get_client_ip(client[0]) is None
+        )
+        return self.register(pending)
+
+    def gc(self, dry_run=False, keys=False):
+        """Reclaim expired leases, repair drift and optionally drop orphan keys"""
+        report = {'reclaimed_leases': []}
+        if not dry_run:
+            report['reclaimed_leases'] = [
+                client_id for client_id, _ in self.server.reclaim_expired_leases()
+            ]
+        report.update(self.server.reconciler.reconcile(repair=not dry_run))
+
+        if keys:
+            allocated = {a['client_id'] for a in self.server.ip_allocator.iter_allocations()}
+            key_store = self.server.peer_config_gen.key_store
+            orphans = sorted(key_store.client_ids() - allocated)
+            if not dry_run:
+                for client_id in orphans:
+                    key_store.remove(client_id)
+            report['orphan_key_ids'] = orphans
+            report['keys_removed'] = not dry_run
+
+        write_line(report, self.out)
+        return report
+
+    def stats(self):
+        """Print pool, tunnel and key store statistics"""
+        stats = {
+            'tunnel': self.server.tunnel_manager.get_status(),
+            'ip_pool': self.server.ip_allocator.get_stats(),
+            'stored_keys': len(self.server.peer_config_gen.key_store)
+        }
+        write_line(stats, self.out)
+        return stats
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='nova-link-admin',
+        description='Administer Nova-Link VPN state without the API server',
+        epilog='The API server must be stopped first: both keep the state in memory '
+               'and rewrite the same files, so the CLI refuses to run while the '
+               'server holds the data directory.'
+    )
+    parser.add_argument('--data-dir', help='directory holding config/, keys/ and logs/')
+    parser.add_argument('--batch-size', type=int, default=500,
+                        help='clients applied per batch (one peers.json save each)')
+    parser.add_argument('-v', '--verbose', action='store_true', help='log to stderr')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    register = commands.add_parser('register', help='register clients (ids or stdin)')
+    register.add_argument('client_ids', nargs='*')
+    register.add_argument('--name', default='VPN Client', help='client name for listed ids')
+
+    unregister = commands.add_parser('unregister', help='unregister clients (ids or stdin)')
+    unregister.add_argument('client_ids', nargs='*')
+
+    list_parser = commands.add_parser('list', help='stream records as JSON lines')
+    list_parser.add_argument('kind', nargs='?', choices=LIST_KINDS, default='allocations')
+
+    export = commands.add_parser('export', help='write registered clients as JSON lines')
+    export.add_argument('file', nargs='?', default='-')
+
+    import_parser = commands.add_parser('import', help='register clients from an export')
+    import_parser.add_argument('file', nargs='?', default='-')
+
+    gc = commands.add_parser('gc', help='reclaim expired leases and repair drift')
+    gc.add_argument('--dry-run', action='store_true', help='report without changing anything')
+    gc.add_argument('--keys', action='store_true',
+                    help='also delete stored keys of unregistered clients')
+
+    commands.add_parser('stats', help='show pool, tunnel and key statistics')
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    # stdout carries JSON lines only; configure logging before the server does
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.WARNING,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        stream=sys.stderr
+    )
+
+    from .vpn_server import VPNServer
+    from .utils import StateLockedError
+    server = VPNServer(data_dir=args.data_dir, warm_up=False)
+    try:
+        server.lock_state()
+    except StateLockedError as e:
+        print(f"❌ {e}: stop the API server (or other admin command) first", file=sys.stderr)
+        return 1
+    admin = AdminCommands(server, batch_size=args.batch_size)
+
+    if args.command == 'register':
+        if args.client_ids:
+            clients = ((client_id, args.name) for client_id in args.client_ids)
+        else:
+            clients = filter(None, map(parse_client_line, sys.stdin))
+        return 1 if admin.register(clients) else 0
+
+    if args.command == 'unregister':
+        if args.client_ids:
+            client_ids = args.client_ids
+        else:
+            client_ids = (client[0] for client in map(parse_client_line, sys.stdin) if client)
+        return 1 if admin.unregister(client_ids) else 0
+
+    if args.command == 'list':
+        admin.list(args.kind)
+    elif args.command == 'export':
+        if args.file == '-':
+            admin.export(sys.stdout)
+        else:
+            with open(args.file, 'w', encoding='utf-8') as out:
+                count = admin.export(out)
+            print(f"✅ Exported {count} client(s) to {args.file}", file=sys.stderr)
+    elif args.command == 'import':
+        with open_input(args.file) as lines:
+            return 1 if admin.import_clients(lines) else 0
+    elif args.command == 'gc':
+        admin.gc(dry_run=args.dry_run, keys=args.keys)
+    elif args.command == 'stats':
+        admin.stats()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,261 @@
+"""
+Client Key Store
+All client keys in one indexed SQLite database, with private keys encrypted
+at rest and an in-memory LRU of hot public keys
+
+Usage (move existing keys/clients/<id>_keys.json files into the store):
+    python -m src.client_key_store migrate --keys-dir keys
+    python -m src.client_key_store migrate --keys-dir keys --remove
+"""
+import os
+import sys
+import sqlite3
+import argparse
+import logging
+import threading
+from cryptography.fernet import Fernet
+from .key_store import KeyStore, intern_key, encode_key, decode_key
+from .utils import load_json, get_timestamp
+
+logger = logging.getLogger(__name__)
+
+SECRET_ENV = 'NOVA_LINK_KEY_SECRET'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS client_keys (
+    client_id    TEXT PRIMARY KEY,
+    client_name  TEXT,
+    client_ip    TEXT,
+    public_key   BLOB NOT NULL,
+    private_key  BLOB NOT NULL,
+    generated_at TEXT
+);
+CREATE INDEX IF NOT EXISTS client_keys_public_key ON client_keys (public_key);
+"""
+
+
+def load_or_create_secret(secret_path):
+    """Get the key-encryption secret from the environment or secret_path"""
+    secret = os.environ.get(SECRET_ENV)
+    if secret:
+        return secret.encode('utf-8')
+
+    if os.path.exists(secret_path):
+        with open(secret_path, 'rb') as f:
+            return f.read().strip()
+
+    # Readable by the owner only
+    secret = Fernet.generate_key()
+    fd = os.open(secret_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, 'wb') as f:
+        f.write(secret)
+    logger.info(f"🔑 Generated key store secret: {secret_path}")
+    return secret
+
+
+class ClientKeyStore:
+    def __init__(self, db_path, secret_path=None, cache_size=4096):
+        """Open (or create) the client key database
+
+        secret_path: file holding the private-key encryption secret
+                     (defaults to <db_path>.secret; NOVA_LINK_KEY_SECRET wins)
+        cache_size: public keys kept in memory for lookups in either direction
+        """
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+
+        self._fernet = Fernet(load_or_create_secret(secret_path or f'{db_path}.secret'))
+        self._cache = KeyStore(capacity=cache_size)
+        self._lock = threading.Lock()
+
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.executescript(SCHEMA)
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute('SELECT COUNT(*) FROM client_keys').fetchone()[0]
+
+    def __contains__(self, client_id):
+        return self.get_public_key(client_id) is not None
+
+    def _row(self, client_id, private_key, public_key, client_name, client_ip, generated_at):
+        return (
+            client_id, client_name, client_ip,
+            intern_key(public_key),
+            self._fernet.encrypt(decode_key(encode_key(private_key))),
+            generated_at or get_timestamp()
+        )
+
+    def put(self, client_id, private_key, public_key, client_name='VPN Client',
+            client_ip=None, generated_at=None):
+        """Store a client's keys (base64 or raw), replacing any previous ones"""
+        self.put_many([(client_id, private_key, public_key, client_name, client_ip, generated_at)])
+
+    def put_many(self, records):
+        """Store (client_id, private_key, public_key, client_name, client_ip,
+        generated_at) tuples in a single transaction, returns the count"""
+        rows = [self._row(*record) for record in records]
+        with self._lock:
+            with self._db:
+                self._db.executemany(
+                    'INSERT OR REPLACE INTO client_keys VALUES (?, ?, ?, ?, ?, ?)', rows
+                )
+            for row in rows:
+                self._cache.set(row[0], row[3])
+        return len(rows)
+
+    def remove(self, client_id):
+        """Delete a client's keys, returns True if they existed"""
+        with self._lock:
+            self._cache.remove(client_id)
+            with self._db:
+                cursor = self._db.execute(
+                    'DELETE FROM client_keys WHERE client_id = ?', (client_id,)
+                )
+            return cursor.rowcount > 0
+
+    def get_public_key(self, client_id):
+        """Get a client's public key as base64, or None"""
+        with self._lock:
+            key = self._cache.get_raw(client_id)
+            if key is None:
+                row = self._db.execute(
+                    'SELECT public_key FROM client_keys WHERE client_id = ?', (client_id,)
+                ).fetchone()
+                if row is None:
+                    return None
+                key = self._cache.set(client_id, row[0])
+        return encode_key(key)
+
+    def find_client(self, public_key):
+        """Get the client_id a public key (base64 or raw) belongs to, or None"""
+        key = intern_key(public_key)
+        with self._lock:
+            client_id = self._cache.find_client(key)
+            if client_id is None:
+                row = self._db.execute(
+                    'SELECT client_id FROM client_keys WHERE public_key = ?', (key,)
+                ).fetchone()
+                if row is None:
+                    return None
+                client_id = row[0]
+                self._cache.set(client_id, key)
+        return client_id
+
+    def get(self, client_id):
+        """Get all of a client's fields, private key decrypted, keys as base64"""
+        with self._lock:
+            row = self._db.execute(
+                'SELECT client_name, client_ip, public_key, private_key, generated_at '
+                'FROM client_keys WHERE client_id = ?', (client_id,)
+            ).fetchone()
+        if row is None:
+            return None
+
+        client_name, client_ip, public_key, private_key, generated_at = row
+        return {
+            'client_id': client_id,
+            'client_name': client_name,
+            'client_ip': client_ip,
+            'public_key': encode_key(public_key),
+            'private_key': encode_key(self._fernet.decrypt(private_key)),
+            'generated_at': generated_at
+        }
+
+    def iter_public(self):
+        """Yield every client's stored fields except the private key"""
+        with self._lock:
+            rows = self._db.execute(
+                'SELECT client_id, client_name, client_ip, public_key, generated_at '
+                'FROM client_keys ORDER BY client_id'
+            ).fetchall()
+        for client_id, client_name, client_ip, public_key, generated_at in rows:
+            yield {
+                'client_id': client_id,
+                'client_name': client_name,
+                'client_ip': client_ip,
+                'public_key': encode_key(public_key),
+                'generated_at': generated_at
+            }
+
+    def client_ids(self):
+        """Get the ids of all clients with stored keys"""
+        with self._lock:
+            return {row[0] for row in self._db.execute('SELECT client_id FROM client_keys')}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def migrate_key_files(clients_dir, store, remove_files=False):
+    """Import every <client_id>_keys.json in clients_dir into store
+
+    remove_files: delete each client's _keys.json and .conf once imported
+    Returns the number of clients imported.
+    """
+    suffix = '_keys.json'
+    if not os.path.isdir(clients_dir):
+        return 0
+
+    with os.scandir(clients_dir) as entries:
+        paths = [entry.path for entry in entries if entry.name.endswith(suffix)]
+
+    # One unreadable file must not stop the import (or server startup)
+    records = []
+    imported = []  # paths read, so removal never trusts the client_id inside
+    for path in paths:
+        try:
+            keys = load_json(path)
+            if not isinstance(keys, dict):
+                raise ValueError("not a JSON object")
+            if not keys.get('private_key') or not keys.get('public_key'):
+                raise ValueError("missing private_key or public_key")
+            decode_key(keys['private_key'])
+            decode_key(keys['public_key'])
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ Skipping unreadable key file {path}: {e}")
+            continue
+        records.append((
+            keys.get('client_id') or os.path.basename(path)[:-len(suffix)],
+            keys['private_key'],
+            keys['public_key'],
+            keys.get('client_name', 'VPN Client'),
+            keys.get('client_ip'),
+            keys.get('generated_at')
+        ))
+        imported.append(path)
+
+    count = store.put_many(records)
+
+    if remove_files:
+        for path in imported:
+            for name in (path, path[:-len(suffix)] + '.conf'):
+                if os.path.exists(name):
+                    os.remove(name)
+
+    logger.info(f"📦 Migrated {count} client key file(s) into {store.db_path}")
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Manage the client key store')
+    parser.add_argument('action', choices=['migrate'])
+    parser.add_argument('--keys-dir', default='keys',
+                        help='directory holding client_keys.db and clients/')
+    parser.add_argument('--remove', action='store_true',
+                        help='delete per-client key and config files after import')
+    args = parser.parse_args(argv)
+
+    store = ClientKeyStore(os.path.join(args.keys_dir, 'client_keys.db'))
+    count = migrate_key_files(os.path.join(args.keys_dir, 'clients'), store, args.remove)
+    store.close()
+
+    print(f"✅ Migrated {count} client(s) into {store.db_path}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
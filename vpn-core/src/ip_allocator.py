@@ -3,13 +3,37 @@ IP Address Allocator
 Manages VPN client IP address allocation and tracking
 """
 import os
+import time
+import ipaddress
+import heapq
+import bisect
+import logging
+import threading
+from collections import OrderedDict
 from tinydb import TinyDB, Query
-from datetime import datetime
+from .records import Allocation
+
+# Window used for the allocation-rate metric (seconds, one bucket each)
+RATE_WINDOW = 60
+
+logger = logging.getLogger(__name__)
 
 
 class IPAllocator:
-    def __init__(self, db_path='../config/ip_pool.json'):
-        """Initialize IP allocator with TinyDB database"""
+    def __init__(self, db_path='../config/ip_pool.json', lease_ttl=None, grace_period=0,
+                 sticky_cache_size=1024, subnet='10.8.0.0/24', clock=time.time):
+        """Initialize IP allocator with TinyDB database
+
+        subnet: network to allocate from; the first host address is the server
+        lease_ttl: seconds an allocation stays valid without renewal
+                   (None or 0 keeps allocations until released)
+        grace_period: extra seconds before an expired lease is reclaimed
+        sticky_cache_size: how many recently released clients remember
+                           their previous address (0 disables reuse)
+        clock: returns the current epoch time for lease expiry
+        """
+        self.clock = clock
+
         # Get absolute path
         base_dir = os.path.dirname(os.path.abspath(__file__))
         self.db_path = os.path.join(base_dir, db_path)
@@ -22,14 +46,124 @@ class IPAllocator:
         self.allocations = self.db.table('allocations')
 
         # IP pool configuration
-        self.subnet = '10.8.0.0/24'
-        self.start_ip = 2  # 10.8.0.1 is server
-        self.end_ip = 254
+        self.subnet = subnet
+        self.network = ipaddress.ip_network(subnet)
+        self.start_ip = 2  # first host (e.g. 10.8.0.1) is the server
+        self.end_ip = self.network.num_addresses - 2
 
         # Initialize IP pool if empty
         if len(self.allocations) == 0:
             self._initialize_pool()
 
+        # Serializes allocate/release so counters stay in step with the DB
+        self._lock = threading.RLock()
+
+        # Allocations are read from TinyDB once and kept as compact records
+        # keyed by client; lookups never touch the database file
+        self._index = {}
+        for document in self.allocations.all():
+            allocation = Allocation.from_dict(document)
+            self._index[allocation.client_id] = allocation
+        self._load_counters()
+
+        # Lease tracking: a min-heap of (expires_at, client_id) ordered by
+        # expiry plus the authoritative expiry per client. Renewals push a
+        # new heap entry; superseded entries are skipped when popped.
+        self.lease_ttl = lease_ttl or None
+        self.grace_period = grace_period
+        self.on_lease_expired = None  # callback(client_id, ip_address)
+        self._lease_expiry = {}
+        self._lease_heap = []
+        self._reclaimer = None
+        self._reclaimer_stop = threading.Event()
+        self._load_leases()
+
+        # Recently released addresses, client_id -> IP suffix in LRU order.
+        # A returning client gets its old address back if it is still free,
+        # and new clients avoid these suffixes while others are available.
+        self.sticky_cache_size = sticky_cache_size
+        self._sticky = OrderedDict()
+        self._sticky_owner = {}  # IP suffix -> client_id
+        self._sticky_hits = 0
+
+    def _load_leases(self):
+        """Build the expiry heap from persisted allocations"""
+        if not self.lease_ttl:
+            return
+
+        now = self.clock()
+        for allocation in self._index.values():
+            # Allocations made before leases were enabled start a fresh lease
+            expires_at = allocation.lease_expires_at or now + self.lease_ttl
+            self._lease_expiry[allocation.client_id] = expires_at
+
+        self._lease_heap = [(t, cid) for cid, t in self._lease_expiry.items()]
+        heapq.heapify(self._lease_heap)
+
+    def _set_lease(self, client_id, expires_at):
+        """Record a lease expiry and queue it for reclamation"""
+        self._lease_expiry[client_id] = expires_at
+        heapq.heappush(self._lease_heap, (expires_at, client_id))
+
+        # Renewals leave stale entries behind; compact once they dominate
+        if len(self._lease_heap) > 2 * len(self._lease_expiry) + 64:
+            self._lease_heap = [(t, cid) for cid, t in self._lease_expiry.items()]
+            heapq.heapify(self._lease_heap)
+
+    def _load_counters(self):
+        """Count the pool once; allocate/release keep the counters current"""
+        self._allocated = len(self._index)
+        self._available = len(self._get_available_ips())
+        self._high_watermark = self._allocated
+
+        # Bumped on every change to allocations, for cache invalidation
+        self.version = 0
+        self._allocations_total = 0
+        self._releases_total = 0
+
+        # Ring of per-second allocation counts for the rate metric
+        self._rate_counts = [0] * RATE_WINDOW
+        self._rate_seconds = [0] * RATE_WINDOW
+
+    def _record_allocation(self):
+        """Update counters after a new allocation"""
+        self.version += 1
+        self._allocated += 1
+        self._available -= 1
+        self._allocations_total += 1
+        self._high_watermark = max(self._high_watermark, self._allocated)
+
+        second = int(time.time())
+        slot = second % RATE_WINDOW
+        if self._rate_seconds[slot] != second:
+            self._rate_seconds[slot] = second
+            self._rate_counts[slot] = 0
+        self._rate_counts[slot] += 1
+
+    def _record_release(self):
+        """Update counters after a release"""
+        self.version += 1
+        self._allocated -= 1
+        self._available += 1
+        self._releases_total += 1
+
+    def _allocation_rate(self):
+        """Allocations per minute over the last RATE_WINDOW seconds"""
+        oldest = int(time.time()) - RATE_WINDOW
+        recent = sum(
+            count for count, second in zip(self._rate_counts, self._rate_seconds)
+            if second > oldest
+        )
+        return recent * 60.0 / RATE_WINDOW
+
+    def _suffix_to_ip(self, ip_suffix):
+        """Convert a host offset within the subnet to an integer address"""
+        return int(self.network.network_address) + ip_suffix
+
+    def _ip_to_suffix(self, ip):
+        """Convert an integer address to its host offset within the subnet"""
+        return ip - int(self.network.network_address)
+
     def _initialize_pool(self):
         """Initialize available IP pool"""
         available_ips = list(range(self.start_ip, self.end_ip + 1))
@@ -48,12 +182,18 @@ class IPAllocator:
 
     def allocate_ip(self, client_id, client_name='Unknown'):
         """Allocate an IP address to a client"""
+        with self._lock:
+            return self._allocate_ip(client_id, client_name)
+
+    def _allocate_ip(self, client_id, client_name):
         # Check if client already has an IP
-        Client = Query()
-        existing = self.allocations.search(Client.client_id == client_id)
+        existing = self._index.get(client_id)
 
-        if existing:
-            return existing[0]['ip_address']
+        if existing is not None:
+            # Re-registering counts as activity and renews the lease
+            if self.lease_ttl:
+                self._renew_lease(client_id)
+            return existing.ip_address
 
         # Get available IPs
         available_ips = self._get_available_ips()
@@ -61,72 +201,232 @@ class IPAllocator:
         if not available_ips:
             raise Exception("No available IP addresses in the pool")
 
-        # Allocate first available IP
-        ip_suffix = available_ips.pop(0)
-        ip_address = f"10.8.0.{ip_suffix}"
+        ip_suffix = self._pick_suffix(client_id, available_ips)
 
         # Save allocation
-        self.allocations.insert({
-            'client_id': client_id,
-            'client_name': client_name,
-            'ip_address': ip_address,
-            'allocated_at': datetime.now().isoformat(),
-            'status': 'active'
-        })
+        now = self.clock()
+        allocation = Allocation(
+            client_id, client_name, self._suffix_to_ip(ip_suffix),
+            allocated_at=now
+        )
+        if self.lease_ttl:
+            allocation.lease_expires_at = now + self.lease_ttl
+            self._set_lease(client_id, allocation.lease_expires_at)
+        self.allocations.insert(allocation.to_dict())
+        self._index[client_id] = allocation
 
         # Update available IPs
         self._update_available_ips(available_ips)
+        self._record_allocation()
 
-        return ip_address
+        return allocation.ip_address
 
     def release_ip(self, client_id):
         """Release an IP address back to the pool"""
-        Client = Query()
-        allocation = self.allocations.search(Client.client_id == client_id)
+        with self._lock:
+            return self._release_ip(client_id)
+
+    def _release_ip(self, client_id):
+        allocation = self._index.pop(client_id, None)
 
-        if not allocation:
+        if allocation is None:
             return False
 
         # Get IP suffix
-        ip_address = allocation[0]['ip_address']
-        ip_suffix = int(ip_address.split('.')[-1])
+        ip_suffix = self._ip_to_suffix(allocation.ip)
 
         # Add back to available pool
         available_ips = self._get_available_ips()
-        available_ips.append(ip_suffix)
-        available_ips.sort()
+        bisect.insort(available_ips, ip_suffix)
         self._update_available_ips(available_ips)
+        self._remember_release(client_id, ip_suffix)
 
         # Remove allocation
+        Client = Query()
         self.allocations.remove(Client.client_id == client_id)
+        self._record_release()
+
+        # Any queued heap entry is now stale and will be skipped
+        self._lease_expiry.pop(client_id, None)
 
         return True
 
+    def _pick_suffix(self, client_id, available_ips):
+        """Remove and return the IP suffix to hand out from available_ips"""
+        # Returning client: reuse its previous address if nobody took it
+        previous = self._sticky.pop(client_id, None)
+        if previous is not None:
+            del self._sticky_owner[previous]
+            index = bisect.bisect_left(available_ips, previous)
+            if index < len(available_ips) and available_ips[index] == previous:
+                self._sticky_hits += 1
+                return available_ips.pop(index)
+
+        # New client: lowest free address not remembered for someone else.
+        # At most len(self._sticky) entries are skipped.
+        for index, suffix in enumerate(available_ips):
+            if suffix not in self._sticky_owner:
+                return available_ips.pop(index)
+
+        # Every free address is remembered; give up the least recently
+        # released one (the oldest entry whose address is still free)
+        for owner, suffix in self._sticky.items():
+            index = bisect.bisect_left(available_ips, suffix)
+            if index < len(available_ips) and available_ips[index] == suffix:
+                del self._sticky[owner]
+                del self._sticky_owner[suffix]
+                return available_ips.pop(index)
+        return available_ips.pop(0)
+
+    def _remember_release(self, client_id, ip_suffix):
+        """Remember a released address for the client's next registration"""
+        if self.sticky_cache_size <= 0:
+            return
+
+        # A suffix belongs to at most one remembered client
+        previous_owner = self._sticky_owner.pop(ip_suffix, None)
+        if previous_owner is not None:
+            self._sticky.pop(previous_owner, None)
+        stale = self._sticky.pop(client_id, None)
+        if stale is not None:
+            self._sticky_owner.pop(stale, None)
+
+        self._sticky[client_id] = ip_suffix
+        self._sticky_owner[ip_suffix] = client_id
+
+        while len(self._sticky) > self.sticky_cache_size:
+            _, evicted = self._sticky.popitem(last=False)
+            del self._sticky_owner[evicted]
+
+    def renew_lease(self, client_id):
+        """Extend a client's lease by lease_ttl, returns the new expiry or None"""
+        if not self.lease_ttl:
+            return None
+
+        with self._lock:
+            if client_id not in self._lease_expiry:
+                return None
+            return self._renew_lease(client_id)
+
+    def _renew_lease(self, client_id):
+        expires_at = self.clock() + self.lease_ttl
+        self._set_lease(client_id, expires_at)
+        self.version += 1
+        self._index[client_id].lease_expires_at = expires_at
+
+        Client = Query()
+        self.allocations.update(
+            {'lease_expires_at': expires_at},
+            Client.client_id == client_id
+        )
+        return expires_at
+
+    def get_lease(self, client_id):
+        """Get the lease expiry (epoch seconds) for a client, if any"""
+        return self._lease_expiry.get(client_id)
+
+    def reclaim_expired(self, now=None):
+        """Release every lease past its expiry plus grace period
+
+        Only expired entries are popped from the heap, so the cost is
+        O(log n) per reclaimed (or superseded) lease, never a full scan.
+        Returns a list of (client_id, ip_address) that were reclaimed.
+        """
+        if now is None:
+            now = self.clock()
+
+        reclaimed = []
+        with self._lock:
+            heap = self._lease_heap
+            while heap and heap[0][0] + self.grace_period <= now:
+                expires_at, client_id = heapq.heappop(heap)
+
+                # Skip entries superseded by a renewal or release
+                if self._lease_expiry.get(client_id) != expires_at:
+                    continue
+
+                ip_address = self.get_client_ip(client_id)
+                if self._release_ip(client_id):
+                    reclaimed.append((client_id, ip_address))
+                else:
+                    self._lease_expiry.pop(client_id, None)
+
+        for client_id, ip_address in reclaimed:
+            logger.info(f"♻️ Lease expired, reclaimed {ip_address} from {client_id}")
+            if self.on_lease_expired:
+                try:
+                    self.on_lease_expired(client_id, ip_address)
+                except Exception as e:
+                    logger.error(f"❌ Lease expiry callback failed for {client_id}: {e}")
+
+        return reclaimed
+
+    def start_lease_reclaimer(self, interval=5, reclaim=None):
+        """Reclaim expired leases from a background thread
+
+        reclaim: called instead of reclaim_expired(), e.g. to hold a lock
+                 that also covers the on_lease_expired cleanup
+        """
+        if not self.lease_ttl or self._reclaimer is not None:
+            return
+        reclaim = reclaim or self.reclaim_expired
+
+        def run():
+            while not self._reclaimer_stop.wait(interval):
+                try:
+                    reclaim()
+                except Exception as e:
+                    logger.error(f"❌ Lease reclamation failed: {e}")
+
+        self._reclaimer_stop.clear()
+        self._reclaimer = threading.Thread(target=run, name='lease-reclaimer', daemon=True)
+        self._reclaimer.start()
+
+    def stop_lease_reclaimer(self):
+        """Stop the background reclaimer thread"""
+        if self._reclaimer is None:
+            return
+        self._reclaimer_stop.set()
+        self._reclaimer.join()
+        self._reclaimer = None
+
     def get_client_ip(self, client_id):
         """Get IP address for a specific client"""
-        Client = Query()
-        allocation = self.allocations.search(Client.client_id == client_id)
+        allocation = self._index.get(client_id)
 
-        if allocation:
-            return allocation[0]['ip_address']
+        if allocation is not None:
+            return allocation.ip_address
         return None
 
     def list_allocations(self):
         """List all current IP allocations"""
-        return self.allocations.all()
+        return list(self.iter_allocations())
+
+    def iter_allocations(self):
+        """Yield current IP allocations one at a time"""
+        for allocation in list(self._index.values()):
+            yield allocation.to_dict()
 
     def get_stats(self):
-        """Get allocation statistics"""
-        available = len(self._get_available_ips())
-        allocated = len(self.allocations)
-        total = self.end_ip - self.start_ip + 1
-
-        return {
-            'total_ips': total,
-            'allocated': allocated,
-            'available': available,
-            'utilization': f"{(allocated / total) * 100:.1f}%"
-        }
+        """Get allocation statistics (O(1), served from in-memory counters)"""
+        with self._lock:
+            allocated = self._allocated
+            total = self.end_ip - self.start_ip + 1
+
+            return {
+                'subnet': self.subnet,
+                'leased': len(self._lease_expiry),
+                'sticky_cached': len(self._sticky),
+                'sticky_reuse_hits': self._sticky_hits,
+                'total_ips': total,
+                'allocated': allocated,
+                'available': self._available,
+                'utilization': f"{(allocated / total) * 100:.1f}%",
+                'high_watermark': self._high_watermark,
+                'allocations_total': self._allocations_total,
+                'releases_total': self._releases_total,
+                'allocation_rate_per_min': self._allocation_rate()
+            }
 
 
 # Test the allocator
@@ -0,0 +1,110 @@
+"""
+Key Store
+Holds WireGuard public keys as raw 32-byte values with a reverse index from
+public key to client, encoding to base64 only when rendered
+"""
+import sys
+import base64
+import binascii
+from collections import OrderedDict
+
+KEY_SIZE = 32
+
+
+def decode_key(key):
+    """Decode a base64 WireGuard key to its 32 raw bytes"""
+    raw = base64.b64decode(key, validate=True)
+    if len(raw) != KEY_SIZE:
+        raise ValueError(f"Key is {len(raw)} bytes, expected {KEY_SIZE}")
+    return raw
+
+
+def encode_key(key):
+    """Render a stored key as base64 (strings are returned unchanged)"""
+    if isinstance(key, bytes):
+        return base64.b64encode(key).decode('utf-8')
+    return key
+
+
+def intern_key(key):
+    """Get the in-memory form of a key
+
+    Valid WireGuard keys become 32 raw bytes; anything else (placeholders,
+    legacy test data) is kept as an interned string so equal keys share
+    one object either way.
+    """
+    if isinstance(key, bytes):
+        return key
+    try:
+        raw = decode_key(key)
+    except (binascii.Error, ValueError):
+        return sys.intern(key)
+
+    # Non-canonical base64 would not render back to the same text
+    return raw if encode_key(raw) == key else sys.intern(key)
+
+
+class KeyStore:
+    def __init__(self, capacity=None):
+        """Initialize empty store of client public keys
+
+        capacity: keep at most this many keys, evicting the least recently
+                  used (None keeps everything)
+        """
+        self.capacity = capacity
+        self._keys = OrderedDict()  # client_id -> key, oldest use first
+        self._clients = {}          # key -> client_id
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, client_id):
+        return client_id in self._keys
+
+    def client_ids(self):
+        """Get the ids of all clients with a stored key"""
+        return self._keys.keys()
+
+    def set(self, client_id, public_key):
+        """Store a client's public key (base64 or raw), replacing any previous one"""
+        key = intern_key(public_key)
+        previous = self._keys.get(client_id)
+        if previous is not None and self._clients.get(previous) == client_id:
+            del self._clients[previous]
+
+        self._keys[client_id] = key
+        self._keys.move_to_end(client_id)
+        self._clients[key] = client_id
+
+        while self.capacity is not None and len(self._keys) > self.capacity:
+            self.remove(next(iter(self._keys)))
+        return key
+
+    def _touch(self, client_id):
+        if self.capacity is not None and client_id in self._keys:
+            self._keys.move_to_end(client_id)
+
+    def remove(self, client_id):
+        """Forget a client's key, returns True if it was stored"""
+        key = self._keys.pop(client_id, None)
+        if key is None:
+            return False
+        if self._clients.get(key) == client_id:
+            del self._clients[key]
+        return True
+
+    def get(self, client_id):
+        """Get a client's public key as base64, or None"""
+        key = self.get_raw(client_id)
+        return encode_key(key) if key is not None else None
+
+    def get_raw(self, client_id):
+        """Get a client's public key in its stored form, or None"""
+        self._touch(client_id)
+        return self._keys.get(client_id)
+
+    def find_client(self, public_key):
+        """Get the client_id owning a public key (base64 or raw), or None"""
+        client_id = self._clients.get(intern_key(public_key))
+        self._touch(client_id)
+        return client_id
@@ -3,46 +3,53 @@ Peer Configuration Generator
 Generates WireGuard configuration files for clients
 """
 import os
-from .utils import generate_keypair, get_timestamp, save_json, load_json
+import logging
+from .utils import generate_keypair
+from .key_store import encode_key
+from .client_key_store import ClientKeyStore, migrate_key_files
+
+logger = logging.getLogger(__name__)
 
 
 class PeerConfigGenerator:
-    def __init__(self, keys_dir='../keys', server_public_key=None):
-        """Initialize peer configuration generator"""
+    def __init__(self, keys_dir='../keys', server_public_key=None, server_ip='10.8.0.1',
+                 prefix_length=24, cache_size=4096, write_config_files=False):
+        """Initialize peer configuration generator
+
+        Client keys live in keys_dir/client_keys.db; configs are rendered
+        from it on demand.
+        cache_size: public keys kept in memory
+        write_config_files: also write keys_dir/clients/<client_id>.conf
+        """
         base_dir = os.path.dirname(os.path.abspath(__file__))
         self.keys_dir = os.path.join(base_dir, keys_dir)
         self.clients_dir = os.path.join(self.keys_dir, 'clients')
+        self.write_config_files = write_config_files
 
         # Create directories
         os.makedirs(self.keys_dir, exist_ok=True)
-        os.makedirs(self.clients_dir, exist_ok=True)
+        if write_config_files:
+            os.makedirs(self.clients_dir, exist_ok=True)
 
         # Server configuration
         self.server_endpoint = "YOUR_SERVER_IP:51820"  # Will be configured
         self.server_public_key = server_public_key
-        self.server_ip = "10.8.0.1"
+        self.server_ip = server_ip
+        self.prefix_length = prefix_length
 
-    def generate_client_config(self, client_id, client_ip, client_name='VPN Client'):
-        """Generate configuration file for a client"""
-        # Generate client keys
-        private_key, public_key = generate_keypair()
+        self.key_store = ClientKeyStore(
+            os.path.join(self.keys_dir, 'client_keys.db'), cache_size=cache_size
+        )
 
-        # Save client keys
-        client_key_file = os.path.join(self.clients_dir, f'{client_id}_keys.json')
-        save_json(client_key_file, {
-            'client_id': client_id,
-            'client_name': client_name,
-            'private_key': private_key,
-            'public_key': public_key,
-            'client_ip': client_ip,
-            'generated_at': get_timestamp()
-        })
+        # First start after upgrading: import the per-client key files
+        if len(self.key_store) == 0:
+            migrate_key_files(self.clients_dir, self.key_store)
 
-        # Generate WireGuard config file
-        config_content = f"""[Interface]
+    def _render_config(self, client_name, client_ip, private_key):
+        return f"""[Interface]
 # Client: {client_name}
 PrivateKey = {private_key}
-Address = {client_ip}/24
+Address = {client_ip}/{self.prefix_length}
 DNS = 8.8.8.8, 8.8.4.4
 
 [Peer]
@@ -53,10 +60,21 @@ AllowedIPs = 0.0.0.0/0, ::/0
 PersistentKeepalive = 25
 """
 
-        # Save config file
-        config_file = os.path.join(self.clients_dir, f'{client_id}.conf')
-        with open(config_file, 'w') as f:
-            f.write(config_content)
+    def generate_client_config(self, client_id, client_ip, client_name='VPN Client'):
+        """Generate configuration file for a client"""
+        # Generate client keys and store them (private key encrypted)
+        private_raw, public_raw = generate_keypair(raw=True)
+        self.key_store.put(client_id, private_raw, public_raw, client_name, client_ip)
+        private_key, public_key = encode_key(private_raw), encode_key(public_raw)
+
+        # Generate WireGuard config
+        config_content = self._render_config(client_name, client_ip, private_key)
+
+        config_file = None
+        if self.write_config_files:
+            config_file = os.path.join(self.clients_dir, f'{client_id}.conf')
+            with open(config_file, 'w') as f:
+                f.write(config_content)
 
         return {
             'client_id': client_id,
@@ -66,11 +84,24 @@ PersistentKeepalive = 25
             'config_content': config_content
         }
 
+    def render_client_config(self, client_id):
+        """Render a stored client's WireGuard config, or None if unknown"""
+        keys = self.key_store.get(client_id)
+        if keys is None:
+            return None
+        return self._render_config(keys['client_name'], keys['client_ip'], keys['private_key'])
+
+    def list_client_ids(self):
+        """List clients that have stored keys"""
+        return self.key_store.client_ids()
+
     def get_client_public_key(self, client_id):
         """Get client's public key"""
-        client_key_file = os.path.join(self.clients_dir, f'{client_id}_keys.json')
-        keys = load_json(client_key_file)
-        return keys.get('public_key') if keys else None
+        return self.key_store.get_public_key(client_id)
+
+    def find_client_by_public_key(self, public_key):
+        """Get the client_id a public key (base64 or raw) was issued to"""
+        return self.key_store.find_client(public_key)
 
 
 # Test the config generator
@@ -88,4 +119,4 @@ if __name__ == '__main__':
 
     print(f"✅ Generated config for {config['client_id']}")
     print(f"Public Key: {config['public_key'][:20]}...")
-    print(f"Config file: {config['config_file']}")
\ No newline at end of file
+    print(f"Config:\n{generator.render_client_config('client_001')}")
\ No newline at end of file
@@ -0,0 +1,155 @@
+"""
+State Reconciler
+Detects and repairs drift between IP allocations, tunnel peers and client keys
+"""
+import logging
+import threading
+from collections import defaultdict
+from .utils import get_timestamp
+
+logger = logging.getLogger(__name__)
+
+
+class StateReconciler:
+    def __init__(self, ip_allocator, tunnel_manager, peer_config_gen, lock=None):
+        """Initialize reconciler over the three VPN state stores
+
+        lock: held while checking/repairing so registrations cannot interleave
+        """
+        self.ip_allocator = ip_allocator
+        self.tunnel_manager = tunnel_manager
+        self.peer_config_gen = peer_config_gen
+        self._lock = lock or threading.RLock()
+        self._thread = None
+        self._stop = threading.Event()
+        self.last_report = None
+
+    def check(self):
+        """Compare the stores and describe any drift without changing anything"""
+        with self._lock:
+            report = self._check()
+        del report['_allocated'], report['_peers_by_client']
+        return report
+
+    def _check(self):
+        allocated = {
+            a['client_id']: a['ip_address']
+            for a in self.ip_allocator.list_allocations()
+        }
+        peers_by_client = defaultdict(list)
+        for peer in self.tunnel_manager.list_peers():
+            peers_by_client[peer['client_id']].append(peer)
+        keyed = self.peer_config_gen.list_client_ids()
+
+        allocated_ids = allocated.keys()
+        peer_ids = peers_by_client.keys()
+
+        # Allocated clients without a peer: restore the peer when the key
+        # exists, otherwise registration died before keys were written
+        missing = allocated_ids - peer_ids
+        restorable = missing & keyed
+
+        return {
+            'allocations': len(allocated),
+            'peers': sum(len(p) for p in peers_by_client.values()),
+            'stored_keys': len(keyed),
+            'duplicate_peers': sorted(c for c, p in peers_by_client.items() if len(p) > 1),
+            'orphan_peers': sorted(peer_ids - allocated_ids),
+            'missing_peers': sorted(restorable),
+            'incomplete_allocations': sorted(missing - keyed),
+            'stale_peer_ips': sorted(
+                c for c in peer_ids & allocated_ids
+                if peers_by_client[c][-1]['allowed_ip'] != f'{allocated[c]}/32'
+            ),
+            'orphan_keys': len(keyed - allocated_ids),
+            '_allocated': allocated,
+            '_peers_by_client': peers_by_client,
+        }
+
+    def reconcile(self, repair=True):
+        """Check for drift and, if repair is set, fix it
+
+        Peers are rewritten with a single save; incomplete allocations are
+        released. Orphaned keys are only counted, since unregistered
+        clients keep their keys.
+        """
+        with self._lock:
+            report = self._check()
+            allocated = report.pop('_allocated')
+            peers_by_client = report.pop('_peers_by_client')
+
+            drift = any(report[k] for k in (
+                'duplicate_peers', 'orphan_peers', 'missing_peers',
+                'incomplete_allocations', 'stale_peer_ips'
+            ))
+
+            if repair and drift:
+                self._repair(report, allocated, peers_by_client)
+
+        report['checked_at'] = get_timestamp()
+        report['drift'] = drift
+        report['repaired'] = repair and drift
+        self.last_report = report
+
+        if drift:
+            logger.warning(
+                f"⚠️ State drift: {len(report['duplicate_peers'])} duplicate, "
+                f"{len(report['orphan_peers'])} orphan, {len(report['missing_peers'])} missing, "
+                f"{len(report['stale_peer_ips'])} stale peer(s), "
+                f"{len(report['incomplete_allocations'])} incomplete allocation(s)"
+                + (" - repaired" if repair else "")
+            )
+        return report
+
+    def _repair(self, report, allocated, peers_by_client):
+        orphans = set(report['orphan_peers'])
+        peers = []
+        for client_id, client_peers in peers_by_client.items():
+            if client_id in orphans:
+                continue
+
+            # Keep the most recently added peer of any duplicates
+            peer = dict(client_peers[-1])
+            peer['allowed_ip'] = f'{allocated[client_id]}/32'
+            peers.append(peer)
+
+        for client_id in report['missing_peers']:
+            public_key = self.peer_config_gen.get_client_public_key(client_id)
+            if not public_key:
+                continue
+            peers.append({
+                'client_id': client_id,
+                'public_key': public_key,
+                'allowed_ip': f'{allocated[client_id]}/32',
+                'added_at': get_timestamp(),
+                'status': 'active'
+            })
+
+        self.tunnel_manager.set_peers(peers)
+
+        for client_id in report['incomplete_allocations']:
+            self.ip_allocator.release_ip(client_id)
+
+    def start(self, interval=300):
+        """Reconcile periodically from a background thread"""
+        if self._thread is not None:
+            return
+
+        def run():
+            while not self._stop.wait(interval):
+                try:
+                    self.reconcile()
+                except Exception as e:
+                    logger.error(f"❌ Reconciliation failed: {e}")
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=run, name='state-reconciler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background thread"""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
@@ -0,0 +1,247 @@
+"""
+Compact Record Store
+Fixed-width binary files for peers and IP allocations, with a memory-mapped
+reader for random access by record index
+
+This is an offline conversion tool for exports and inspection; the server
+itself keeps loading and saving peers.json and ip_pool.json.
+
+Usage:
+    python -m src.record_store export peers config/peers.json config/peers.bin
+    python -m src.record_store export allocations config/ip_pool.json config/allocations.bin
+    python -m src.record_store import peers config/peers.bin restored_peers.json
+    python -m src.record_store import allocations config/allocations.bin restored_pool.json
+"""
+import os
+import sys
+import mmap
+import base64
+import struct
+import argparse
+import ipaddress
+from .utils import load_json, save_json
+from .records import to_epoch, to_iso
+
+MAGIC = b'NLREC'
+VERSION = 1
+HEADER = struct.Struct('<5sBBxQ')  # magic, version, kind, count
+
+KIND_PEERS = 1
+KIND_ALLOCATIONS = 2
+
+# client_id, raw public key, IPv4 as uint32, prefix length, status, added_at
+PEER_RECORD = struct.Struct('<64s32sIBBxxd')
+# client_id, client_name, IPv4 as uint32, status, allocated_at, lease_expires_at
+ALLOCATION_RECORD = struct.Struct('<64s64sIB3xdd')
+
+RECORD_FORMATS = {
+    KIND_PEERS: PEER_RECORD,
+    KIND_ALLOCATIONS: ALLOCATION_RECORD,
+}
+KIND_NAMES = {
+    'peers': KIND_PEERS,
+    'allocations': KIND_ALLOCATIONS,
+}
+
+STATUSES = ['inactive', 'active']
+
+
+def _pack_text(value, size, field):
+    data = value.encode('utf-8')
+    if len(data) > size:
+        raise ValueError(f"{field} longer than {size} bytes: {value!r}")
+    return data
+
+
+def _unpack_text(data):
+    return data.rstrip(b'\0').decode('utf-8')
+
+
+def _pack_status(status):
+    return STATUSES.index(status) if status in STATUSES else 1
+
+
+def pack_peer(peer):
+    """Encode a peer dict as a fixed-width record"""
+    public_key = base64.b64decode(peer['public_key'], validate=True)
+    if len(public_key) != 32:
+        raise ValueError(f"Public key of {peer['client_id']} is not 32 bytes")
+
+    network = ipaddress.ip_interface(peer['allowed_ip'])
+    return PEER_RECORD.pack(
+        _pack_text(peer['client_id'], 64, 'client_id'),
+        public_key,
+        int(network.ip),
+        network.network.prefixlen,
+        _pack_status(peer.get('status')),
+        to_epoch(peer.get('added_at')) or 0.0
+    )
+
+
+def unpack_peer(data, offset=0):
+    """Decode a peer record back to the dict used in peers.json"""
+    client_id, public_key, ip, prefix, status, added_at = PEER_RECORD.unpack_from(data, offset)
+    return {
+        'client_id': _unpack_text(client_id),
+        'public_key': base64.b64encode(public_key).decode('utf-8'),
+        'allowed_ip': f'{ipaddress.IPv4Address(ip)}/{prefix}',
+        'added_at': to_iso(added_at),
+        'status': STATUSES[status]
+    }
+
+
+def pack_allocation(allocation):
+    """Encode an allocation dict as a fixed-width record"""
+    return ALLOCATION_RECORD.pack(
+        _pack_text(allocation['client_id'], 64, 'client_id'),
+        _pack_text(allocation.get('client_name', ''), 64, 'client_name'),
+        int(ipaddress.IPv4Address(allocation['ip_address'])),
+        _pack_status(allocation.get('status')),
+        to_epoch(allocation.get('allocated_at')) or 0.0,
+        allocation.get('lease_expires_at') or 0.0
+    )
+
+
+def unpack_allocation(data, offset=0):
+    """Decode an allocation record back to the dict stored in TinyDB"""
+    (client_id, client_name, ip, status,
+     allocated_at, lease_expires_at) = ALLOCATION_RECORD.unpack_from(data, offset)
+    allocation = {
+        'client_id': _unpack_text(client_id),
+        'client_name': _unpack_text(client_name),
+        'ip_address': str(ipaddress.IPv4Address(ip)),
+        'allocated_at': to_iso(allocated_at),
+        'status': STATUSES[status]
+    }
+    if lease_expires_at:
+        allocation['lease_expires_at'] = lease_expires_at
+    return allocation
+
+
+PACKERS = {KIND_PEERS: pack_peer, KIND_ALLOCATIONS: pack_allocation}
+UNPACKERS = {KIND_PEERS: unpack_peer, KIND_ALLOCATIONS: unpack_allocation}
+
+
+def write_records(path, kind, records):
+    """Write records (dicts) to a record file, returns the record count"""
+    pack = PACKERS[kind]
+    packed = [pack(record) for record in records]
+
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, kind, len(packed)))
+        f.write(b''.join(packed))
+    os.replace(tmp_path, path)
+    return len(packed)
+
+
+class RecordFile:
+    def __init__(self, path):
+        """Open a record file for memory-mapped random access"""
+        self.path = path
+        self._file = open(path, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        if size < HEADER.size:
+            self._file.close()
+            raise ValueError(f"Not a record file: {path}")
+
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, kind, count = HEADER.unpack_from(self._map)
+        if magic != MAGIC or version != VERSION or kind not in RECORD_FORMATS:
+            self.close()
+            raise ValueError(f"Not a record file: {path}")
+
+        self.kind = kind
+        self._record = RECORD_FORMATS[kind]
+        self._unpack = UNPACKERS[kind]
+        self._count = count
+        if HEADER.size + count * self._record.size > size:
+            self.close()
+            raise ValueError(f"Truncated record file: {path}")
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        """Decode record number index without reading the rest of the file"""
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError(index)
+        return self._unpack(self._map, HEADER.size + index * self._record.size)
+
+    def __iter__(self):
+        for index in range(self._count):
+            yield self[index]
+
+    def close(self):
+        if getattr(self, '_map', None) is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def export_json(kind, json_path, record_path):
+    """Convert peers.json or ip_pool.json into a record file"""
+    data = load_json(json_path)
+    if kind == KIND_PEERS:
+        records = data.get('active_peers', [])
+    else:
+        # TinyDB layout: {"allocations": {"<doc_id>": {...}}}
+        records = list(data.get('allocations', {}).values())
+    return write_records(record_path, kind, records)
+
+
+def import_json(kind, record_path, json_path, subnet='10.8.0.0/24'):
+    """Convert a record file back into peers.json or ip_pool.json layout"""
+    with RecordFile(record_path) as records:
+        if records.kind != kind:
+            raise ValueError(f"{record_path} does not hold {kind} records")
+        items = list(records)
+
+    if kind == KIND_PEERS:
+        data = load_json(json_path) or {'tunnel_status': 'inactive'}
+        data['active_peers'] = items
+    else:
+        network = ipaddress.ip_network(subnet)
+        base = int(network.network_address)
+        used = {int(ipaddress.IPv4Address(a['ip_address'])) - base for a in items}
+        available = [s for s in range(2, network.num_addresses - 1) if s not in used]
+        data = {
+            '_default': {'1': {'available_ips': available}},
+            'allocations': {str(i): a for i, a in enumerate(items, start=1)}
+        }
+
+    save_json(json_path, data)
+    return len(items)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Convert VPN state between JSON and record files')
+    parser.add_argument('action', choices=['export', 'import'],
+                        help='export: JSON -> records, import: records -> JSON')
+    parser.add_argument('kind', choices=sorted(KIND_NAMES))
+    parser.add_argument('source')
+    parser.add_argument('destination')
+    parser.add_argument('--subnet', default='10.8.0.0/24',
+                        help='pool subnet when importing allocations')
+    args = parser.parse_args(argv)
+
+    kind = KIND_NAMES[args.kind]
+    if args.action == 'export':
+        count = export_json(kind, args.source, args.destination)
+    else:
+        count = import_json(kind, args.source, args.destination, args.subnet)
+
+    print(f"✅ Converted {count} {args.kind} record(s): {args.source} -> {args.destination}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
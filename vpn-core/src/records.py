@@ -0,0 +1,110 @@
+"""
+Record Types
+Compact in-memory representations of peers and IP allocations
+"""
+import ipaddress
+from datetime import datetime
+from .key_store import intern_key, encode_key
+
+
+def to_epoch(timestamp):
+    """Convert an ISO timestamp (or None) to epoch seconds"""
+    return datetime.fromisoformat(timestamp).timestamp() if timestamp else None
+
+
+def to_iso(epoch):
+    """Convert epoch seconds (or None) to an ISO timestamp"""
+    return datetime.fromtimestamp(epoch).isoformat() if epoch else None
+
+
+class Peer:
+    """A tunnel peer; the address is held as an int, timestamps as epochs and
+    the public key as raw bytes"""
+    __slots__ = ('client_id', 'public_key', 'ip', 'prefix', 'added_at', 'status')
+
+    def __init__(self, client_id, public_key, ip, prefix=32, added_at=None, status='active'):
+        self.client_id = client_id
+        self.public_key = public_key
+        self.ip = ip
+        self.prefix = prefix
+        self.added_at = added_at
+        self.status = status
+
+    @property
+    def allowed_ip(self):
+        return f'{ipaddress.IPv4Address(self.ip)}/{self.prefix}'
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build a Peer from the dict layout used in peers.json and the API"""
+        interface = ipaddress.ip_interface(data['allowed_ip'])
+        return cls(
+            data['client_id'],
+            intern_key(data['public_key']),
+            int(interface.ip),
+            interface.network.prefixlen,
+            to_epoch(data.get('added_at')),
+            data.get('status', 'active')
+        )
+
+    def to_dict(self):
+        """Convert to the dict layout used in peers.json and the API"""
+        return {
+            'client_id': self.client_id,
+            'public_key': encode_key(self.public_key),
+            'allowed_ip': self.allowed_ip,
+            'added_at': to_iso(self.added_at),
+            'status': self.status
+        }
+
+    def to_tuple(self):
+        """Plain tuple for snapshots"""
+        return (self.client_id, self.public_key, self.ip, self.prefix,
+                self.added_at, self.status)
+
+    @classmethod
+    def from_tuple(cls, values):
+        return cls(*values)
+
+
+class Allocation:
+    """An IP allocation; the address is held as an int, timestamps as epochs"""
+    __slots__ = ('client_id', 'client_name', 'ip', 'allocated_at', 'status', 'lease_expires_at')
+
+    def __init__(self, client_id, client_name, ip, allocated_at=None, status='active',
+                 lease_expires_at=None):
+        self.client_id = client_id
+        self.client_name = client_name
+        self.ip = ip
+        self.allocated_at = allocated_at
+        self.status = status
+        self.lease_expires_at = lease_expires_at
+
+    @property
+    def ip_address(self):
+        return str(ipaddress.IPv4Address(self.ip))
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build an Allocation from the dict stored in TinyDB"""
+        return cls(
+            data['client_id'],
+            data.get('client_name', 'Unknown'),
+            int(ipaddress.IPv4Address(data['ip_address'])),
+            to_epoch(data.get('allocated_at')),
+            data.get('status', 'active'),
+            data.get('lease_expires_at')
+        )
+
+    def to_dict(self):
+        """Convert to the dict stored in TinyDB and returned by the API"""
+        data = {
+            'client_id': self.client_id,
+            'client_name': self.client_name,
+            'ip_address': self.ip_address,
+            'allocated_at': to_iso(self.allocated_at),
+            'status': self.status
+        }
+        if self.lease_expires_at:
+            data['lease_expires_at'] = self.lease_expires_at
+        return data
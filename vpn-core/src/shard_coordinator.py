@@ -0,0 +1,303 @@
+"""
+Shard Coordinator
+Spreads clients over several VPN server instances with a consistent-hash ring
+"""
+import os
+import bisect
+import hashlib
+import logging
+import ipaddress
+import threading
+import multiprocessing
+from .utils import load_json, save_json
+
+logger = logging.getLogger(__name__)
+
+# Calls a coordinator may forward to a shard's VPNServer
+SHARD_METHODS = {
+    'register_client',
+    'unregister_client',
+    'renew_client',
+    'get_status',
+    'start',
+    'stop',
+    'ip_allocator.list_allocations',
+    'ip_allocator.get_stats',
+}
+
+
+class HashRing:
+    def __init__(self, vnodes=64):
+        """Initialize an empty consistent-hash ring
+
+        vnodes: points per node; more points give a more even spread
+        """
+        self.vnodes = vnodes
+        self._points = []   # sorted hash points
+        self._owners = {}   # hash point -> node name
+        self.nodes = set()
+
+    @staticmethod
+    def _hash(key):
+        digest = hashlib.md5(key.encode('utf-8')).digest()
+        return int.from_bytes(digest[:8], 'big')
+
+    def add_node(self, node):
+        """Add a node to the ring"""
+        if node in self.nodes:
+            return
+        self.nodes.add(node)
+        for i in range(self.vnodes):
+            point = self._hash(f'{node}#{i}')
+            self._owners[point] = node
+            bisect.insort(self._points, point)
+
+    def remove_node(self, node):
+        """Remove a node from the ring"""
+        if node not in self.nodes:
+            return
+        self.nodes.discard(node)
+        self._points = [p for p in self._points if self._owners[p] != node]
+        self._owners = {p: self._owners[p] for p in self._points}
+
+    def get_node(self, key):
+        """Get the node that owns a key"""
+        if not self._points:
+            raise Exception("Hash ring has no nodes")
+        index = bisect.bisect(self._points, self._hash(key)) % len(self._points)
+        return self._owners[self._points[index]]
+
+
+def _shard_main(conn, data_dir, subnet):
+    """Entry point of a shard process: serve calls from the coordinator"""
+    from .vpn_server import VPNServer
+
+    server = VPNServer(data_dir=data_dir, subnet=subnet)
+    conn.send(('ready', None))
+
+    while True:
+        try:
+            method, args = conn.recv()
+        except EOFError:
+            break
+        if method == 'shutdown':
+            conn.send(('ok', None))
+            break
+
+        try:
+            target = server
+            for name in method.split('.'):
+                target = getattr(target, name)
+            conn.send(('ok', target(*args)))
+        except Exception as e:
+            conn.send(('error', str(e)))
+
+    server.ip_allocator.stop_lease_reclaimer()
+    conn.close()
+
+
+class Shard:
+    def __init__(self, name, data_dir, subnet):
+        """Start a VPN server for one shard in its own process"""
+        self.name = name
+        self.data_dir = data_dir
+        self.subnet = subnet
+        self._lock = threading.Lock()
+
+        self._conn, child_conn = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(
+            target=_shard_main,
+            args=(child_conn, data_dir, subnet),
+            name=f'shard-{name}',
+            daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+
+        status, _ = self._conn.recv()
+        if status != 'ready':
+            raise Exception(f"Shard {name} failed to start")
+
+    def call(self, method, *args):
+        """Call a VPNServer method inside the shard process"""
+        if method not in SHARD_METHODS:
+            raise ValueError(f"Method not allowed on shard: {method}")
+
+        # One request/response at a time per pipe
+        with self._lock:
+            self._conn.send((method, args))
+            status, result = self._conn.recv()
+
+        if status == 'error':
+            raise Exception(f"Shard {self.name}: {result}")
+        return result
+
+    def shutdown(self):
+        """Stop the shard process"""
+        with self._lock:
+            try:
+                self._conn.send(('shutdown', ()))
+                self._conn.recv()
+            except (EOFError, OSError):
+                pass
+            self._conn.close()
+        self.process.join(timeout=10)
+
+
+class ShardCoordinator:
+    def __init__(self, base_dir='../shards', supernet='10.9.0.0/16', vnodes=64):
+        """Initialize the coordinator
+
+        base_dir: parent directory for each shard's config/, keys/ and logs/
+        supernet: carved into disjoint /24 subnets, one per shard; a shard
+                  keeps its subnet across restarts (recorded in shards.json)
+        """
+        src_dir = os.path.dirname(os.path.abspath(__file__))
+        self.base_dir = os.path.join(src_dir, base_dir)
+        os.makedirs(self.base_dir, exist_ok=True)
+
+        self.ring = HashRing(vnodes=vnodes)
+        self.shards = {}
+        self.supernet = ipaddress.ip_network(supernet)
+        self._subnets_file = os.path.join(self.base_dir, 'shards.json')
+        self._subnets = load_json(self._subnets_file)  # shard name -> subnet
+        # Guards the ring and shard table only; calls into a shard are
+        # serialized by that shard's own lock
+        self._lock = threading.RLock()
+
+    def add_shard(self, name, subnet=None, rebalance=True):
+        """Start a shard, add it to the ring and move the clients it now owns"""
+        with self._lock:
+            if name in self.shards:
+                raise ValueError(f"Shard already exists: {name}")
+
+            subnet = self.assign_subnet(name, subnet)
+            data_dir = os.path.join(self.base_dir, name)
+            self.shards[name] = Shard(name, data_dir, subnet)
+            self.ring.add_node(name)
+            logger.info(f"✅ Added shard {name} ({subnet})")
+
+            if rebalance:
+                return self.rebalance()
+            return []
+
+    def assign_subnet(self, name, subnet=None):
+        """Subnet of a shard: the one it had before, the one given, or the
+        first free /24 of the supernet; the choice is saved"""
+        with self._lock:
+            if subnet is None:
+                subnet = self._subnets.get(name)
+            if subnet is None:
+                taken = set(self._subnets.values())
+                subnet = next(
+                    (str(candidate) for candidate in self.supernet.subnets(new_prefix=24)
+                     if str(candidate) not in taken),
+                    None
+                )
+                if subnet is None:
+                    raise Exception(f"No free subnet left in {self.supernet}")
+            if self._subnets.get(name) != subnet:
+                self._subnets[name] = subnet
+                save_json(self._subnets_file, self._subnets)
+            return subnet
+
+    def owner(self, client_id):
+        """Get the shard that owns a client"""
+        with self._lock:
+            return self.shards[self.ring.get_node(client_id)]
+
+    def register_client(self, client_id, client_name='VPN Client'):
+        """Register a client on its owning shard"""
+        shard = self.owner(client_id)
+        result = shard.call('register_client', client_id, client_name)
+        result['shard'] = shard.name
+        return result
+
+    def unregister_client(self, client_id):
+        """Unregister a client from its owning shard"""
+        shard = self.owner(client_id)
+        result = shard.call('unregister_client', client_id)
+        result['shard'] = shard.name
+        return result
+
+    def renew_client(self, client_id):
+        """Renew a client's lease on its owning shard"""
+        return self.owner(client_id).call('renew_client', client_id)
+
+    def rebalance(self):
+        """Move every client to the shard the ring assigns it to
+
+        Only clients whose owner changed are touched; with consistent
+        hashing that is roughly 1/N of them when a shard is added.
+        Moved clients get a new address (and keys) in the new shard's subnet.
+        Returns a list of (client_id, from_shard, to_shard).
+        """
+        moved = []
+        with self._lock:
+            for name, shard in self.shards.items():
+                for allocation in shard.call('ip_allocator.list_allocations'):
+                    client_id = allocation['client_id']
+                    target = self.ring.get_node(client_id)
+                    if target == name:
+                        continue
+
+                    result = self.shards[target].call(
+                        'register_client', client_id,
+                        allocation.get('client_name', 'VPN Client')
+                    )
+                    if not result['success']:
+                        logger.error(f"❌ Could not move {client_id} to {target}: {result['error']}")
+                        continue
+                    shard.call('unregister_client', client_id)
+                    moved.append((client_id, name, target))
+
+        if moved:
+            logger.info(f"♻️ Rebalanced {len(moved)} client(s)")
+        return moved
+
+    def get_status(self):
+        """Get per-shard pool statistics and totals"""
+        with self._lock:
+            shards = list(self.shards.items())
+        pools = {name: shard.call('ip_allocator.get_stats') for name, shard in shards}
+
+        return {
+            'shards': len(pools),
+            'total_ips': sum(p['total_ips'] for p in pools.values()),
+            'allocated': sum(p['allocated'] for p in pools.values()),
+            'available': sum(p['available'] for p in pools.values()),
+            'pools': pools
+        }
+
+    def shutdown(self):
+        """Stop every shard process"""
+        with self._lock:
+            for shard in self.shards.values():
+                shard.shutdown()
+            self.shards = {}
+
+
+# Test the coordinator
+if __name__ == '__main__':
+    import tempfile
+
+    coordinator = ShardCoordinator(base_dir=tempfile.mkdtemp(prefix='nova-shards-'))
+
+    print("🧪 Testing Shard Coordinator...")
+
+    coordinator.add_shard('shard_a')
+    coordinator.add_shard('shard_b')
+
+    for i in range(20):
+        result = coordinator.register_client(f'client_{i:03d}')
+        print(f"  client_{i:03d} -> {result['shard']} ({result['ip_address']})")
+
+    # Adding a shard moves only the clients it now owns
+    moved = coordinator.add_shard('shard_c')
+    print(f"\n♻️ Moved {len(moved)} client(s) to the new shard")
+
+    status = coordinator.get_status()
+    for name, pool in status['pools'].items():
+        print(f"📊 {name} {pool['subnet']}: {pool['allocated']} allocated")
+
+    coordinator.shutdown()
@@ -0,0 +1,68 @@
+"""
+State Snapshots
+Binary copies of JSON state files that load much faster than the JSON itself
+"""
+import os
+import struct
+import marshal
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Header: magic, marshal format version, source file mtime_ns and size
+MAGIC = b'NLSNAP1\n'
+HEADER = struct.Struct('<8sIqq')
+
+
+def _source_stat(source_path):
+    try:
+        stat = os.stat(source_path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def write_snapshot(snapshot_path, source_path, data):
+    """Save data as a snapshot of source_path's current contents
+
+    Only plain containers, strings, numbers, booleans and None are supported
+    (marshal, not pickle, so loading never runs code).
+    """
+    stat = _source_stat(source_path)
+    if stat is None:
+        return False
+
+    payload = HEADER.pack(MAGIC, marshal.version, *stat) + marshal.dumps(data)
+
+    # Write to a temp file first so a crash never leaves a torn snapshot
+    tmp_path = f'{snapshot_path}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(payload)
+    os.replace(tmp_path, snapshot_path)
+    return True
+
+
+def read_snapshot(snapshot_path, source_path):
+    """Load a snapshot, or None if it is missing, corrupt or out of date"""
+    try:
+        with open(snapshot_path, 'rb') as f:
+            payload = f.read()
+    except FileNotFoundError:
+        return None
+
+    if len(payload) < HEADER.size:
+        return None
+
+    magic, version, mtime_ns, size = HEADER.unpack_from(payload)
+    if magic != MAGIC or version != marshal.version:
+        return None
+
+    # The source was edited (or rewritten) after the snapshot was taken
+    if _source_stat(source_path) != (mtime_ns, size):
+        return None
+
+    try:
+        return marshal.loads(payload[HEADER.size:])
+    except (EOFError, ValueError, TypeError) as e:
+        logger.warning(f"⚠️ Ignoring corrupt snapshot {snapshot_path}: {e}")
+        return None
@@ -3,40 +3,112 @@ VPN Tunnel Manager
 Handles VPN tunnel lifecycle and peer connections
 """
 import os
+import time
 import logging
-from datetime import datetime
+import threading
 from .utils import load_json, save_json, get_timestamp
+from .snapshot import read_snapshot, write_snapshot
+from .records import Peer
+from .key_store import intern_key, encode_key
 
 logger = logging.getLogger(__name__)
 
+# Bump when the snapshot payload layout changes
+SNAPSHOT_FORMAT = 3
+
 
 class TunnelManager:
-    def __init__(self, config_dir='../config'):
-        """Initialize Tunnel Manager"""
+    def __init__(self, config_dir='../config', sync_engine=None):
+        """Initialize Tunnel Manager
+
+        sync_engine: optional InterfaceSync that programs the real interface
+        """
         base_dir = os.path.dirname(os.path.abspath(__file__))
         self.config_dir = os.path.join(base_dir, config_dir)
         self.peers_file = os.path.join(self.config_dir, 'peers.json')
+        self.snapshot_file = os.path.join(self.config_dir, 'peers.snapshot')
 
         # Create config directory
         os.makedirs(self.config_dir, exist_ok=True)
 
-        # Load or initialize peers
-        self.peers = load_json(self.peers_file)
-        if not self.peers:
-            self.peers = {'active_peers': [], 'tunnel_status': 'inactive'}
-            self._save_peers()
+        # Tunnel status fields, and peers as compact records keyed by client
+        self.state = {'tunnel_status': 'inactive'}
+        self.peers = {}
+        self._clients_by_key = {}  # public key -> client_id
+
+        # Bumped on every saved change, for cache invalidation
+        self.version = 0
+
+        # Load peers from the binary snapshot when it matches peers.json,
+        # otherwise parse the JSON and refresh the snapshot
+        snapshot = read_snapshot(self.snapshot_file, self.peers_file)
+        if snapshot is not None and snapshot.get('format') == SNAPSHOT_FORMAT:
+            self.state = snapshot['state']
+            for values in snapshot['peers']:
+                self._put_peer(Peer.from_tuple(values))
+        else:
+            data = load_json(self.peers_file)
+            if data:
+                self._load_dict(data)
+                self._write_snapshot()
+            else:
+                self._save_peers()
+
+        self.sync_engine = sync_engine
+        self._lock = threading.RLock()
 
         logger.info("TunnelManager initialized")
 
+    def _load_dict(self, data):
+        """Load the peers.json layout; later duplicates replace earlier ones"""
+        self.state = {k: v for k, v in data.items() if k != 'active_peers'}
+        self.state.setdefault('tunnel_status', 'inactive')
+        for item in data.get('active_peers', []):
+            self._pop_peer(item['client_id'])
+            self._put_peer(Peer.from_dict(item))
+
+    def _put_peer(self, peer):
+        self.peers[peer.client_id] = peer
+        self._clients_by_key[peer.public_key] = peer.client_id
+
+    def _pop_peer(self, client_id):
+        peer = self.peers.pop(client_id, None)
+        if peer is not None and self._clients_by_key.get(peer.public_key) == client_id:
+            del self._clients_by_key[peer.public_key]
+        return peer
+
+    def _write_snapshot(self):
+        write_snapshot(self.snapshot_file, self.peers_file, {
+            'format': SNAPSHOT_FORMAT,
+            'state': self.state,
+            'peers': [peer.to_tuple() for peer in self.peers.values()]
+        })
+
     def _save_peers(self):
         """Save peers configuration"""
-        save_json(self.peers_file, self.peers)
+        self.version += 1
+        save_json(self.peers_file, {'active_peers': self.list_peers(), **self.state})
+        self._write_snapshot()
+
+    def _desired_interface_peers(self):
+        """Get {public_key: allowed_ips} the interface should carry"""
+        return {
+            encode_key(peer.public_key): peer.allowed_ip
+            for peer in self.peers.values()
+        }
+
+    def _interface_active(self):
+        return self.sync_engine is not None and self.state.get('tunnel_status') == 'active'
 
     def start_tunnel(self):
         """Start VPN tunnel"""
         try:
-            self.peers['tunnel_status'] = 'active'
-            self.peers['started_at'] = get_timestamp()
+            # Bring the interface in line with peers.json in one batch
+            if self.sync_engine is not None:
+                self.sync_engine.sync(self._desired_interface_peers())
+
+            self.state['tunnel_status'] = 'active'
+            self.state['started_at'] = get_timestamp()
             self._save_peers()
 
             logger.info("✅ VPN tunnel started successfully")
@@ -48,8 +120,11 @@ class TunnelManager:
     def stop_tunnel(self):
         """Stop VPN tunnel"""
         try:
-            self.peers['tunnel_status'] = 'inactive'
-            self.peers['stopped_at'] = get_timestamp()
+            if self.sync_engine is not None:
+                self.sync_engine.sync({})
+
+            self.state['tunnel_status'] = 'inactive'
+            self.state['stopped_at'] = get_timestamp()
             self._save_peers()
 
             logger.info("✅ VPN tunnel stopped successfully")
@@ -60,71 +135,133 @@ class TunnelManager:
 
     def get_status(self):
         """Get current tunnel status"""
-        status = self.peers.get('tunnel_status', 'inactive')
-        active_peers = len(self.peers.get('active_peers', []))
+        status = self.state.get('tunnel_status', 'inactive')
+        active_peers = len(self.peers)
 
         return {
             'status': status,
             'active_peers': active_peers,
-            'started_at': self.peers.get('started_at', 'N/A'),
+            'started_at': self.state.get('started_at', 'N/A'),
             'details': f"Tunnel is {status} with {active_peers} connected peer(s)"
         }
 
     def add_peer(self, client_id, public_key, allowed_ip):
-        """Add a new peer to the tunnel"""
+        """Add a new peer to the tunnel, replacing any existing peer for the client"""
         try:
-            peer = {
-                'client_id': client_id,
-                'public_key': public_key,
-                'allowed_ip': allowed_ip,
-                'added_at': get_timestamp(),
-                'status': 'active'
-            }
-
-            if 'active_peers' not in self.peers:
-                self.peers['active_peers'] = []
-
-            self.peers['active_peers'].append(peer)
-            self._save_peers()
-
+            self._add_peers([(client_id, public_key, allowed_ip)])
             logger.info(f"✅ Added peer: {client_id} ({allowed_ip})")
             return True
         except Exception as e:
             logger.error(f"❌ Failed to add peer: {e}")
             return False
 
-    def remove_peer(self, client_id):
-        """Remove a peer from the tunnel"""
+    def add_peers(self, peers):
+        """Add several (client_id, public_key, allowed_ip) peers with one save"""
         try:
-            if 'active_peers' not in self.peers:
-                return False
+            count = self._add_peers(peers)
+            logger.info(f"✅ Added {count} peer(s)")
+            return True
+        except Exception as e:
+            logger.error(f"❌ Failed to add peers: {e}")
+            return False
+
+    def _add_peers(self, peers):
+        added_at = time.time()
+        count = 0
+        with self._lock:
+            active = self._interface_active()
+            for client_id, public_key, allowed_ip in peers:
+                peer = Peer.from_dict({
+                    'client_id': client_id,
+                    'public_key': public_key,
+                    'allowed_ip': allowed_ip
+                })
+                peer.added_at = added_at
+
+                # Retries and re-registrations replace rather than duplicate
+                replaced = self._pop_peer(client_id)
+                self._put_peer(peer)
+                count += 1
+
+                # Only these peers are pushed, not the whole configuration
+                if active:
+                    if replaced is not None and replaced.public_key != peer.public_key:
+                        self.sync_engine.remove_peer(encode_key(replaced.public_key))
+                    self.sync_engine.set_peer(encode_key(peer.public_key), peer.allowed_ip)
 
-            self.peers['active_peers'] = [
-                p for p in self.peers['active_peers']
-                if p['client_id'] != client_id
-            ]
             self._save_peers()
+            if active:
+                self.sync_engine.flush()
+        return count
 
+    def remove_peer(self, client_id):
+        """Remove a peer from the tunnel"""
+        try:
+            self._remove_peers([client_id])
             logger.info(f"✅ Removed peer: {client_id}")
             return True
         except Exception as e:
             logger.error(f"❌ Failed to remove peer: {e}")
             return False
 
+    def remove_peers(self, client_ids):
+        """Remove several peers with one save"""
+        try:
+            count = self._remove_peers(client_ids)
+            logger.info(f"✅ Removed {count} peer(s)")
+            return True
+        except Exception as e:
+            logger.error(f"❌ Failed to remove peers: {e}")
+            return False
+
+    def _remove_peers(self, client_ids):
+        count = 0
+        with self._lock:
+            active = self._interface_active()
+            for client_id in client_ids:
+                removed = self._pop_peer(client_id)
+                if removed is None:
+                    continue
+                count += 1
+                if active:
+                    self.sync_engine.remove_peer(encode_key(removed.public_key))
+
+            self._save_peers()
+            if active:
+                self.sync_engine.flush()
+        return count
+
     def get_peer(self, client_id):
         """Get peer information"""
-        if 'active_peers' not in self.peers:
-            return None
-
-        for peer in self.peers['active_peers']:
-            if peer['client_id'] == client_id:
-                return peer
+        peer = self.peers.get(client_id)
+        return peer.to_dict() if peer is not None else None
 
-        return None
+    def find_peer_by_public_key(self, public_key):
+        """Get the peer using a public key (base64 or raw), e.g. for a handshake"""
+        client_id = self._clients_by_key.get(intern_key(public_key))
+        return self.get_peer(client_id) if client_id is not None else None
 
     def list_peers(self):
         """List all active peers"""
-        return self.peers.get('active_peers', [])
+        return list(self.iter_peers())
+
+    def iter_peers(self):
+        """Yield active peers one at a time"""
+        for peer in list(self.peers.values()):
+            yield peer.to_dict()
+
+    def set_peers(self, peers):
+        """Replace the whole peer list with one save and one interface sync"""
+        with self._lock:
+            self.peers = {}
+            self._clients_by_key = {}
+            for item in peers:
+                self._pop_peer(item['client_id'])
+                self._put_peer(Peer.from_dict(item))
+            self._save_peers()
+
+            if self._interface_active():
+                self.sync_engine.sync(self._desired_interface_peers())
 
 
 # Test the tunnel manager
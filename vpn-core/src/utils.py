@@ -9,9 +9,18 @@ from cryptography.hazmat.primitives.asymmetric import x25519
 from cryptography.hazmat.primitives import serialization
 import base64
 
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
 
-def generate_keypair():
-    """Generate WireGuard-style public/private keypair"""
+
+def generate_keypair(raw=False):
+    """Generate WireGuard-style public/private keypair
+
+    raw: return the 32-byte keys instead of base64 strings
+    """
     private_key = x25519.X25519PrivateKey.generate()
     public_key = private_key.public_key()
 
@@ -26,6 +35,9 @@ def generate_keypair():
         format=serialization.PublicFormat.Raw
     )
 
+    if raw:
+        return private_bytes, public_bytes
+
     private_key_b64 = base64.b64encode(private_bytes).decode('utf-8')
     public_key_b64 = base64.b64encode(public_bytes).decode('utf-8')
 
@@ -66,6 +78,36 @@ def save_json(file_path, data):
         json.dump(data, f, indent=2)
 
 
+class StateLockedError(RuntimeError):
+    """Another process holds the state lock"""
+
+
+def lock_file(path):
+    """Take an exclusive lock on path without waiting
+
+    Returns the open lock file; the lock is held until it is closed or the
+    process exits. Raises StateLockedError if another holder has it.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    f = open(path, 'a+')
+    try:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        f.close()
+        raise StateLockedError(f"{path} is locked by another process")
+
+    # The holder's pid, for whoever finds the lock taken
+    f.seek(0)
+    f.truncate()
+    f.write(f"{os.getpid()}\n")
+    f.flush()
+    return f
+
+
 def get_timestamp():
     """Get current timestamp"""
     return datetime.now().isoformat()
@@ -4,41 +4,198 @@ Coordinates all VPN Core components
 """
 import os
 import logging
-from .utils import generate_keypair, setup_logging, save_json, load_json
+import time
+import ipaddress
+import threading
+from .utils import generate_keypair, setup_logging, save_json, load_json, load_config, lock_file
 from .ip_allocator import IPAllocator
 from .tunnel_manager import TunnelManager
 from .peer_config import PeerConfigGenerator
+from .wg_sync import create_sync_engine
+from .reconciler import StateReconciler
+
+STATE_LOCK_NAME = 'state.lock'
 
 
 class VPNServer:
-    def __init__(self):
-        """Initialize VPN Server"""
+    def __init__(self, data_dir=None, subnet=None, lazy=True, warm_up=True):
+        """Initialize VPN Server
+
+        data_dir: directory holding config/, keys/ and logs/ (defaults to vpn-core)
+        subnet: client subnet, overrides network.subnet from server_config.yaml
+        lazy: create components on first use and run startup checks in the
+              background, so the server is ready without loading any state
+        warm_up: run startup reconciliation and the periodic reconciler
+                 (one-shot tools such as the admin CLI turn this off, and
+                 the API calls start_warm_up() only in the serving process)
+        """
+        started = time.perf_counter()
+
         # Setup logging
         base_dir = os.path.dirname(os.path.abspath(__file__))
-        log_file = os.path.join(base_dir, '../logs/vpn_server.log')
+        self.data_dir = data_dir or os.path.join(base_dir, '..')
+        log_file = os.path.join(self.data_dir, 'logs/vpn_server.log')
         self.logger = setup_logging(log_file)
 
         self.logger.info("=" * 50)
         self.logger.info("🚀 Nova-Link VPN Server Starting...")
         self.logger.info("=" * 50)
 
-        # Initialize components
-        self.ip_allocator = IPAllocator()
-        self.tunnel_manager = TunnelManager()
+        # Load server configuration
+        self.config = load_config(os.path.join(base_dir, '../config/server_config.yaml'))
+        self.subnet = subnet or self.config.get('network', {}).get('subnet', '10.8.0.0/24')
+        self.network = ipaddress.ip_network(self.subnet)
+        self.server_ip = str(self.network.network_address + 1)
+        self.config_dir = os.path.join(self.data_dir, 'config')
+        self.keys_dir = os.path.join(self.data_dir, 'keys')
+
+        # Components are built on first access (see the properties below)
+        self._components = {}
+        self._init_lock = threading.RLock()
+
+        # Registrations and reconciliation must not interleave
+        self._state_lock = threading.RLock()
+        self._state_lock_file = None
+        self._warm_up_started = False
+
+        if warm_up and lazy:
+            self.start_warm_up()
+        elif warm_up:
+            self._warm_up_started = True
+            self._warm_up()
+
+        elapsed = (time.perf_counter() - started) * 1000
+        self.logger.info(f"✅ VPN Server initialized successfully in {elapsed:.1f} ms")
+
+    def lock_state(self):
+        """Claim the data dir for this process until it exits
+
+        The API server and the admin CLI both hold state in memory and
+        rewrite the same files, so only one of them may run at a time.
+        Raises StateLockedError if another process has claimed it.
+        """
+        if self._state_lock_file is None:
+            self._state_lock_file = lock_file(os.path.join(self.config_dir, STATE_LOCK_NAME))
+
+    def start_warm_up(self):
+        """Run startup checks and background loops in a thread, once"""
+        with self._init_lock:
+            if self._warm_up_started:
+                return
+            self._warm_up_started = True
+        threading.Thread(target=self._warm_up, name='vpn-warm-up', daemon=True).start()
+
+    def _warm_up(self):
+        """Run startup checks and background loops"""
+        try:
+            pool_config = self.config.get('ip_pool', {})
+            reconcile_config = self.config.get('reconcile', {})
 
-        # Setup server keys
-        self.keys_dir = os.path.join(base_dir, '../keys')
-        os.makedirs(self.keys_dir, exist_ok=True)
+            if reconcile_config.get('on_startup', True):
+                self.reconciler.reconcile()
+            elif pool_config.get('lease_ttl'):
+                # Creating the allocator starts the lease reclaimer
+                self.ip_allocator
 
-        self.server_keys = self._load_or_generate_server_keys()
-        self.peer_config_gen = PeerConfigGenerator(
-            server_public_key=self.server_keys['public_key']
+            if reconcile_config.get('interval'):
+                self.reconciler.start(reconcile_config['interval'])
+        except Exception as e:
+            self.logger.error(f"❌ Startup checks failed: {e}")
+
+    def _component(self, name, factory):
+        """Get a component, building it on first use"""
+        component = self._components.get(name)
+        if component is None:
+            with self._init_lock:
+                component = self._components.get(name)
+                if component is None:
+                    started = time.perf_counter()
+                    component = factory()
+                    self._components[name] = component
+                    elapsed = (time.perf_counter() - started) * 1000
+                    self.logger.info(f"⚙️ Loaded {name} in {elapsed:.1f} ms")
+        return component
+
+    @property
+    def ip_allocator(self):
+        return self._component('ip_allocator', self._create_ip_allocator)
+
+    @property
+    def tunnel_manager(self):
+        return self._component('tunnel_manager', self._create_tunnel_manager)
+
+    @property
+    def server_keys(self):
+        return self._component('server_keys', self._load_or_generate_server_keys)
+
+    @property
+    def peer_config_gen(self):
+        return self._component('peer_config_gen', self._create_peer_config_gen)
+
+    @property
+    def reconciler(self):
+        return self._component('reconciler', self._create_reconciler)
+
+    @property
+    def state_version(self):
+        """Number that changes whenever allocations, peers or tunnel status change
+
+        Only components that have been built are consulted, so reading it
+        never loads state.
+        """
+        return sum(
+            getattr(component, 'version', 0)
+            for component in list(self._components.values())
         )
 
-        self.logger.info("✅ VPN Server initialized successfully")
+    def _create_ip_allocator(self):
+        pool_config = self.config.get('ip_pool', {})
+        allocator = IPAllocator(
+            db_path=os.path.join(self.config_dir, 'ip_pool.json'),
+            subnet=self.subnet,
+            lease_ttl=pool_config.get('lease_ttl'),
+            grace_period=pool_config.get('lease_grace_period', 0),
+            sticky_cache_size=pool_config.get('sticky_cache_size', 1024)
+        )
+
+        # Expired leases also drop the client's peer
+        allocator.on_lease_expired = self._on_lease_expired
+        allocator.start_lease_reclaimer(
+            pool_config.get('lease_reclaim_interval', 5),
+            reclaim=self.reclaim_expired_leases
+        )
+        return allocator
+
+    def _create_tunnel_manager(self):
+        network_config = self.config.get('network', {})
+        return TunnelManager(
+            config_dir=self.config_dir,
+            sync_engine=create_sync_engine(
+                network_config.get('peer_sync'),
+                network_config.get('interface', 'wg0')
+            )
+        )
+
+    def _create_peer_config_gen(self):
+        keys_config = self.config.get('keys', {})
+        return PeerConfigGenerator(
+            keys_dir=self.keys_dir,
+            server_public_key=self.server_keys['public_key'],
+            server_ip=self.server_ip,
+            prefix_length=self.network.prefixlen,
+            cache_size=keys_config.get('cache_size', 4096),
+            write_config_files=keys_config.get('write_config_files', False)
+        )
+
+    def _create_reconciler(self):
+        return StateReconciler(
+            self.ip_allocator, self.tunnel_manager, self.peer_config_gen,
+            lock=self._state_lock
+        )
 
     def _load_or_generate_server_keys(self):
         """Load existing server keys or generate new ones"""
+        os.makedirs(self.keys_dir, exist_ok=True)
         keys_file = os.path.join(self.keys_dir, 'server_keys.json')
 
         if os.path.exists(keys_file):
@@ -66,6 +223,10 @@ class VPNServer:
 
     def register_client(self, client_id, client_name='VPN Client'):
         """Register a new VPN client"""
+        with self._state_lock:
+            return self._register_client(client_id, client_name)
+
+    def _register_client(self, client_id, client_name):
         try:
             self.logger.info(f"📝 Registering client: {client_id}")
 
@@ -102,8 +263,101 @@ class VPNServer:
                 'error': str(e)
             }
 
+    def register_clients(self, clients):
+        """Register several (client_id, client_name) clients, saving peers once
+
+        Returns one result per client, in order.
+        """
+        with self._state_lock:
+            results = []
+            peers = []
+            for client_id, client_name in clients:
+                try:
+                    client_ip = self.ip_allocator.allocate_ip(client_id, client_name)
+                    config = self.peer_config_gen.generate_client_config(
+                        client_id, client_ip, client_name
+                    )
+                    peers.append((client_id, config['public_key'], f"{client_ip}/32"))
+                    results.append({
+                        'success': True,
+                        'client_id': client_id,
+                        'ip_address': client_ip,
+                        'public_key': config['public_key'],
+                        'config_file': config['config_file']
+                    })
+                except Exception as e:
+                    self.logger.error(f"❌ Failed to register client {client_id}: {e}")
+                    results.append({'success': False, 'client_id': client_id, 'error': str(e)})
+
+            # Allocations and keys are stored; the reconciler restores
+            # their peers if this save fails
+            if peers and not self.tunnel_manager.add_peers(peers):
+                for result in results:
+                    if result['success']:
+                        result.update(success=False, error='Failed to add peers')
+
+            self.logger.info(f"✅ Registered {len(peers)} of {len(results)} client(s)")
+            return results
+
+    def renew_client(self, client_id):
+        """Renew a client's IP lease"""
+        expires_at = self.ip_allocator.renew_lease(client_id)
+        if expires_at is None:
+            return {
+                'success': False,
+                'error': 'Client has no active lease'
+            }
+        return {
+            'success': True,
+            'client_id': client_id,
+            'lease_expires_at': expires_at
+        }
+
+    def reclaim_expired_leases(self, now=None):
+        """Release expired leases and remove their peers
+
+        Both happen under the state lock, so a client registering again
+        cannot get a new peer that the expiry then removes.
+        Returns a list of (client_id, ip_address) that were reclaimed.
+        """
+        with self._state_lock:
+            return self.ip_allocator.reclaim_expired(now)
+
+    def _on_lease_expired(self, client_id, ip_address):
+        """Remove the peer of a client whose lease was reclaimed"""
+        with self._state_lock:
+            self.logger.info(f"⌛ Lease for {client_id} ({ip_address}) expired")
+            if self.ip_allocator.get_client_ip(client_id) is not None:
+                return  # registered again since; the peer is the new one
+            self.tunnel_manager.remove_peer(client_id)
+
+    def get_client_config(self, client_id):
+        """Get a registered client's WireGuard config"""
+        config = self.peer_config_gen.render_client_config(client_id)
+        if config is None:
+            return {
+                'success': False,
+                'error': 'Client has no stored keys'
+            }
+        return {
+            'success': True,
+            'client_id': client_id,
+            'config_content': config
+        }
+
+    def find_client_by_public_key(self, public_key):
+        """Map a peer public key (e.g. from a handshake) to its client_id"""
+        peer = self.tunnel_manager.find_peer_by_public_key(public_key)
+        if peer is not None:
+            return peer['client_id']
+        return self.peer_config_gen.find_client_by_public_key(public_key)
+
     def unregister_client(self, client_id):
         """Unregister a VPN client"""
+        with self._state_lock:
+            return self._unregister_client(client_id)
+
+    def _unregister_client(self, client_id):
         try:
             self.logger.info(f"🗑️ Unregistering client: {client_id}")
 
@@ -120,6 +374,29 @@ class VPNServer:
             self.logger.error(f"❌ Failed to unregister client: {e}")
             return {'success': False, 'error': str(e)}
 
+    def unregister_clients(self, client_ids):
+        """Unregister several clients, saving peers once
+
+        Returns one result per client, in order.
+        """
+        with self._state_lock:
+            client_ids = list(client_ids)
+            if not self.tunnel_manager.remove_peers(client_ids):
+                return [
+                    {'success': False, 'client_id': client_id, 'error': 'Failed to remove peers'}
+                    for client_id in client_ids
+                ]
+
+            results = []
+            for client_id in client_ids:
+                released = self.ip_allocator.release_ip(client_id)
+                results.append({'success': released, 'client_id': client_id})
+                if not released:
+                    results[-1]['error'] = 'Client has no IP allocation'
+
+            self.logger.info(f"✅ Unregistered {len(client_ids)} client(s)")
+            return results
+
     def start(self):
         """Start VPN server"""
         self.logger.info("▶️ Starting VPN tunnel...")
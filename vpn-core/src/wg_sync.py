@@ -0,0 +1,163 @@
+"""
+WireGuard Interface Sync
+Keeps a kernel interface's peers in step with TunnelManager by applying
+only the difference between desired and current peers, in one batch
+"""
+import logging
+import subprocess
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class FakeBackend:
+    def __init__(self):
+        """In-memory interface, for tests and hosts without WireGuard"""
+        self.interfaces = {}
+        self.batches = []  # (interface, upserts, removals) per apply call
+
+    def dump(self, interface):
+        """Get {public_key: allowed_ips} currently on the interface"""
+        return dict(self.interfaces.get(interface, {}))
+
+    def apply(self, interface, upserts, removals):
+        """Apply upserts and removals as one operation"""
+        peers = self.interfaces.setdefault(interface, {})
+        for public_key in removals:
+            peers.pop(public_key, None)
+        peers.update(upserts)
+        self.batches.append((interface, dict(upserts), set(removals)))
+
+
+class WgCommandBackend:
+    def __init__(self, wg_path='wg', batch_size=500):
+        """Program a real interface through the `wg` command line tool
+
+        batch_size: peers per `wg set` call, keeps argv under ARG_MAX
+        """
+        self.wg_path = wg_path
+        self.batch_size = batch_size
+
+    def dump(self, interface):
+        """Get {public_key: allowed_ips} currently on the interface"""
+        output = subprocess.run(
+            [self.wg_path, 'show', interface, 'allowed-ips'],
+            check=True, capture_output=True, text=True
+        ).stdout
+
+        peers = {}
+        for line in output.splitlines():
+            public_key, _, allowed = line.partition('\t')
+            allowed = allowed.strip()
+            peers[public_key] = '' if allowed == '(none)' else ','.join(allowed.split())
+        return peers
+
+    def apply(self, interface, upserts, removals):
+        """Apply upserts and removals with as few `wg set` calls as possible"""
+        args = []
+        for public_key in removals:
+            args.append(['peer', public_key, 'remove'])
+        for public_key, allowed_ips in upserts.items():
+            args.append(['peer', public_key, 'allowed-ips', allowed_ips])
+
+        for start in range(0, len(args), self.batch_size):
+            command = [self.wg_path, 'set', interface]
+            for peer_args in args[start:start + self.batch_size]:
+                command.extend(peer_args)
+            subprocess.run(command, check=True, capture_output=True)
+
+
+class InterfaceSync:
+    def __init__(self, backend, interface='wg0'):
+        """Initialize sync engine for one interface
+
+        The interface's peers are read once and then tracked in memory, so
+        each peer change is a dictionary comparison plus a small batch.
+        """
+        self.backend = backend
+        self.interface = interface
+        self._current = None
+        self._upserts = {}
+        self._removals = set()
+        self._lock = threading.Lock()
+
+    def _current_peers(self):
+        if self._current is None:
+            self._current = self.backend.dump(self.interface)
+        return self._current
+
+    def refresh(self):
+        """Re-read the interface's peers (e.g. after external changes)"""
+        with self._lock:
+            self._current = self.backend.dump(self.interface)
+
+    def _diff(self, desired):
+        current = self._current_peers()
+        upserts = {
+            key: ips for key, ips in desired.items()
+            if current.get(key) != ips
+        }
+        removals = current.keys() - desired.keys()
+        return upserts, removals
+
+    def diff(self, desired):
+        """Get (upserts, removals) turning the interface into desired"""
+        with self._lock:
+            return self._diff(desired)
+
+    def sync(self, desired):
+        """Make the interface match {public_key: allowed_ips} exactly"""
+        with self._lock:
+            # A full sync supersedes anything queued
+            self._upserts, self._removals = self._diff(desired)
+            return self._flush()
+
+    def set_peer(self, public_key, allowed_ips):
+        """Queue a peer add/update; no-op if the interface already has it"""
+        with self._lock:
+            self._removals.discard(public_key)
+            if self._current_peers().get(public_key) == allowed_ips:
+                self._upserts.pop(public_key, None)
+            else:
+                self._upserts[public_key] = allowed_ips
+
+    def remove_peer(self, public_key):
+        """Queue a peer removal; no-op if the interface does not have it"""
+        with self._lock:
+            self._upserts.pop(public_key, None)
+            if public_key in self._current_peers():
+                self._removals.add(public_key)
+
+    def flush(self):
+        """Apply queued changes in one batch, returns (added_or_updated, removed)"""
+        with self._lock:
+            return self._flush()
+
+    def _flush(self):
+        if not self._upserts and not self._removals:
+            return 0, 0
+
+        upserts, removals = self._upserts, self._removals
+        self.backend.apply(self.interface, upserts, removals)
+
+        current = self._current_peers()
+        for public_key in removals:
+            current.pop(public_key, None)
+        current.update(upserts)
+
+        self._upserts, self._removals = {}, set()
+        logger.info(
+            f"🔄 Synced {self.interface}: {len(upserts)} upserted, {len(removals)} removed"
+        )
+        return len(upserts), len(removals)
+
+
+def create_sync_engine(backend_name, interface='wg0'):
+    """Build an InterfaceSync from the network.peer_sync config value"""
+    if not backend_name or backend_name == 'none':
+        return None
+    if backend_name == 'wg':
+        return InterfaceSync(WgCommandBackend(), interface)
+    if backend_name == 'memory':
+        return InterfaceSync(FakeBackend(), interface)
+    raise ValueError(f"Unknown peer sync backend: {backend_name}")
@@ -0,0 +1,86 @@
+"""
+Unit tests for the admin CLI
+"""
+import pytest
+import sys
+import os
+import io
+import json
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.admin_cli import AdminCommands, parse_client_line, main
+from src.vpn_server import VPNServer
+
+
+def read_lines(out):
+    return [json.loads(line) for line in out.getvalue().splitlines()]
+
+
+def test_bulk_register_list_and_unregister(tmp_path):
+    """Test bulk operations stream one JSON line per client"""
+    server = VPNServer(data_dir=str(tmp_path), warm_up=False)
+    out = io.StringIO()
+    admin = AdminCommands(server, batch_size=2, out=out)
+
+    stdin = ['client_001,Laptop\n', '{"client_id": "client_002"}\n', '\n', 'client_003\n']
+    clients = filter(None, map(parse_client_line, stdin))
+    assert admin.register(clients) == 0
+    results = read_lines(out)
+    assert [r['client_id'] for r in results] == ['client_001', 'client_002', 'client_003']
+    assert len({r['ip_address'] for r in results}) == 3
+
+    out.truncate(0)
+    out.seek(0)
+    assert admin.list('peers') == 3
+    assert read_lines(out)[0]['allowed_ip'] == f"{results[0]['ip_address']}/32"
+
+    # Unknown clients are reported, not fatal
+    out.truncate(0)
+    out.seek(0)
+    assert admin.unregister(['client_002', 'missing']) == 1
+    assert [r['success'] for r in read_lines(out)] == [True, False]
+    assert server.tunnel_manager.get_peer('client_002') is None
+
+
+def test_export_import_and_gc(tmp_path):
+    """Test exported clients re-register and gc drops orphan keys"""
+    source = VPNServer(data_dir=str(tmp_path / 'a'), warm_up=False)
+    admin = AdminCommands(source, out=io.StringIO())
+    admin.register([('client_001', 'Laptop'), ('client_002', 'Phone')])
+
+    export = io.StringIO()
+    assert admin.export(export) == 2
+
+    target = VPNServer(data_dir=str(tmp_path / 'b'), warm_up=False)
+    target_admin = AdminCommands(target, out=io.StringIO())
+    target_admin.register([('client_001', 'Laptop')])
+    assert target_admin.import_clients(export.getvalue().splitlines()) == 0
+    assert {a['client_id'] for a in target.ip_allocator.list_allocations()} == {
+        'client_001', 'client_002'
+    }
+
+    admin.unregister(['client_001'])
+    report = admin.gc(dry_run=True, keys=True)
+    assert report['orphan_key_ids'] == ['client_001']
+    assert 'client_001' in source.peer_config_gen.key_store
+
+    report = admin.gc(keys=True)
+    assert report['drift'] is False
+    assert source.peer_config_gen.list_client_ids() == {'client_002'}
+
+
+def test_refuses_to_run_beside_the_server(tmp_path, capsys):
+    """Test the CLI exits while a server holds the data dir, and runs after"""
+    server = VPNServer(data_dir=str(tmp_path), warm_up=False)
+    server.lock_state()
+    assert main(['--data-dir', str(tmp_path), 'register', 'client_001']) == 1
+    assert 'stop the API server' in capsys.readouterr().err
+    assert server.ip_allocator.get_client_ip('client_001') is None
+
+    server._state_lock_file.close()
+    assert main(['--data-dir', str(tmp_path), 'stats']) == 0
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,81 @@
+"""
+Unit tests for API rate limiting and admission control
+"""
+import pytest
+import sys
+import os
+import threading
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from api.admission import RateLimiter, ConcurrencyLimiter, AdmissionControl
+
+
+def test_token_bucket_per_client():
+    """Test bursts are allowed, then requests refill at the configured rate"""
+    limiter = RateLimiter(rate=2, burst=3, max_clients=2)
+    assert [limiter.allow('a', now=0)[0] for _ in range(4)] == [True, True, True, False]
+    allowed, retry_after = limiter.allow('a', now=0)
+    assert not allowed and retry_after == pytest.approx(0.5)
+    assert limiter.allow('a', now=0.5)[0]
+
+    # Other clients have their own bucket; only max_clients are tracked
+    assert limiter.allow('b', now=0)[0]
+    limiter.allow('c', now=0)
+    assert len(limiter) == 2
+
+
+def test_concurrency_cap_rejects_fast():
+    """Test requests beyond the queue are rejected without waiting"""
+    limiter = ConcurrencyLimiter(max_concurrent=1, max_queue=1, queue_timeout=5)
+    assert limiter.acquire()
+
+    queued = []
+    waiter = threading.Thread(target=lambda: queued.append(limiter.acquire()))
+    waiter.start()
+    while limiter.waiting == 0:
+        pass
+
+    assert not limiter.acquire()  # queue full
+    limiter.release()
+    waiter.join()
+    assert queued == [True]
+    assert limiter.peak_waiting == 1
+
+    limiter = ConcurrencyLimiter(max_concurrent=1, max_queue=1, queue_timeout=0.01)
+    limiter.acquire()
+    assert not limiter.acquire()  # timed out in the queue
+
+
+def test_admission_control():
+    """Test expensive endpoints have their own limit and health is exempt"""
+    admission = AdmissionControl({'expensive_per_second': 1, 'expensive_burst': 1})
+    assert admission.check('/api/health', '1.2.3.4') is None
+    assert admission.check('/api/client/register', '1.2.3.4')[0] == 200
+    admission.release()
+    assert admission.check('/api/client/register', '1.2.3.4')[0] == 429
+    assert admission.check('/api/peer/list', '1.2.3.4')[0] == 200
+    admission.release()
+
+    stats = admission.get_stats()
+    assert stats['admitted'] == 2
+    assert stats['rejected_rate_limited'] == 1
+    assert stats['in_flight'] == 0
+
+
+def test_refused_expensive_request_refunds_general_token():
+    """Test a request refused by the expensive limit leaves the general bucket untouched"""
+    admission = AdmissionControl({
+        'requests_per_second': 0.001, 'burst': 2,
+        'expensive_per_second': 0.001, 'expensive_burst': 1
+    })
+    assert admission.check('/api/client/register', '1.2.3.4')[0] == 200
+    admission.release()
+    assert admission.check('/api/client/register', '1.2.3.4')[0] == 429
+    assert admission.check('/api/peer/list', '1.2.3.4')[0] == 200
+    admission.release()
+    assert admission.check('/api/peer/list', '1.2.3.4')[0] == 429
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,111 @@
+"""
+Unit tests for the SQLite client key store
+"""
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.client_key_store import ClientKeyStore, migrate_key_files
+from src.peer_config import PeerConfigGenerator
+from src.utils import generate_keypair, save_json
+
+
+def test_keys_encrypted_and_cached(tmp_path):
+    """Test private keys are encrypted at rest and lookups use the LRU"""
+    db_path = str(tmp_path / 'client_keys.db')
+    store = ClientKeyStore(db_path, cache_size=2)
+    private_key, public_key = generate_keypair()
+    store.put('client_001', private_key, public_key, 'Laptop', '10.8.0.2')
+
+    with open(db_path, 'rb') as f:
+        assert private_key.encode() not in f.read()
+    assert oct(os.stat(f'{db_path}.secret').st_mode & 0o777) == '0o600'
+
+    # Filling the cache evicts client_001; lookups fall back to the database
+    for i in range(2, 5):
+        store.put(f'client_00{i}', *generate_keypair())
+    assert len(store._cache) == 2
+    assert store.find_client(public_key) == 'client_001'
+    assert store.get_public_key('client_001') == public_key
+
+    reopened = ClientKeyStore(db_path)
+    assert reopened.get('client_001')['private_key'] == private_key
+    assert reopened.client_ids() == {'client_001', 'client_002', 'client_003', 'client_004'}
+    assert reopened.remove('client_001')
+    assert reopened.get('client_001') is None
+
+
+def test_migrate_per_client_files(tmp_path):
+    """Test existing key files are imported on first start"""
+    clients_dir = tmp_path / 'keys' / 'clients'
+    private_key, public_key = generate_keypair()
+    save_json(str(clients_dir / 'client_001_keys.json'), {
+        'client_id': 'client_001',
+        'client_name': 'Laptop',
+        'private_key': private_key,
+        'public_key': public_key,
+        'client_ip': '10.8.0.2',
+        'generated_at': '2025-01-01T12:00:00'
+    })
+    (clients_dir / 'client_001.conf').write_text('old config')
+
+    generator = PeerConfigGenerator(keys_dir=str(tmp_path / 'keys'))
+    assert generator.list_client_ids() == {'client_001'}
+    assert generator.get_client_public_key('client_001') == public_key
+    assert f'PrivateKey = {private_key}' in generator.render_client_config('client_001')
+
+    # Explicit migration can drop the old files
+    assert migrate_key_files(str(clients_dir), generator.key_store, remove_files=True) == 1
+    assert os.listdir(clients_dir) == []
+
+
+def test_migration_skips_corrupt_files(tmp_path):
+    """Test one bad key file does not stop the others from being imported"""
+    clients_dir = tmp_path / 'keys' / 'clients'
+    private_key, public_key = generate_keypair()
+    save_json(str(clients_dir / 'client_001_keys.json'), {
+        'client_id': 'client_001',
+        'private_key': private_key,
+        'public_key': public_key
+    })
+    save_json(str(clients_dir / 'client_002_keys.json'), {
+        'client_id': 'client_002',
+        'private_key': 'not base64!',
+        'public_key': public_key
+    })
+    (clients_dir / 'client_003_keys.json').write_text('{"client_id": ')
+
+    # Migration runs automatically when the store is created empty
+    generator = PeerConfigGenerator(keys_dir=str(tmp_path / 'keys'))
+    assert generator.list_client_ids() == {'client_001'}
+    assert generator.get_client_public_key('client_001') == public_key
+
+
+def test_migration_removes_the_files_it_read(tmp_path):
+    """Test --remove deletes the scanned files, whatever client_id they hold"""
+    keys_dir = tmp_path / 'keys'
+    clients_dir = keys_dir / 'clients'
+    private_key, public_key = generate_keypair()
+    save_json(str(clients_dir / 'renamed_keys.json'), {
+        'client_id': 'client_009', 'private_key': private_key, 'public_key': public_key
+    })
+    (clients_dir / 'renamed.conf').write_text('old config')
+    save_json(str(clients_dir / 'escape_keys.json'), {
+        'client_id': '../outside', 'private_key': private_key, 'public_key': public_key
+    })
+    (keys_dir / 'outside_keys.json').write_text('not ours')
+    (keys_dir / 'outside.conf').write_text('not ours')
+    (clients_dir / 'client_009.conf').write_text('not read')
+
+    store = ClientKeyStore(str(keys_dir / 'client_keys.db'))
+    assert migrate_key_files(str(clients_dir), store, remove_files=True) == 2
+    assert store.client_ids() == {'client_009', '../outside'}
+    assert sorted(os.listdir(clients_dir)) == ['client_009.conf']
+    assert (keys_dir / 'outside_keys.json').exists() and (keys_dir / 'outside.conf').exists()
+    store.close()
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
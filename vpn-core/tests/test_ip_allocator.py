@@ -56,5 +56,109 @@ def test_get_stats():
     os.remove('test_ip_pool.json')
 
 
+def test_stats_track_allocate_and_release(tmp_path):
+    """Test incrementally maintained statistics"""
+    allocator = IPAllocator(db_path=str(tmp_path / 'ip_pool.json'))
+
+    allocator.allocate_ip('client_a')
+    allocator.allocate_ip('client_b')
+    allocator.allocate_ip('client_a')  # already allocated, not counted twice
+    allocator.release_ip('client_a')
+
+    stats = allocator.get_stats()
+    assert stats['allocated'] == 1
+    assert stats['available'] == 252
+    assert stats['high_watermark'] == 2
+    assert stats['allocations_total'] == 2
+    assert stats['releases_total'] == 1
+    assert stats['allocation_rate_per_min'] == 2
+
+    # Counters agree with a fresh count of the database
+    reloaded = IPAllocator(db_path=str(tmp_path / 'ip_pool.json'))
+    assert reloaded.get_stats()['allocated'] == 1
+    assert reloaded.get_stats()['available'] == 252
+
+
+def test_expired_leases_are_reclaimed(tmp_path):
+    """Test lease expiry, renewal and grace period"""
+    clock = [1000.0]
+    allocator = IPAllocator(db_path=str(tmp_path / 'ip_pool.json'),
+                            lease_ttl=30, grace_period=10, clock=lambda: clock[0])
+    expired = []
+    allocator.on_lease_expired = lambda client_id, ip: expired.append(client_id)
+
+    allocator.allocate_ip('idle_client')
+    allocator.allocate_ip('busy_client')
+
+    # Within the grace period nothing is reclaimed
+    clock[0] = 1035.0
+    assert allocator.reclaim_expired() == []
+
+    # A renewal pushes busy_client's expiry to 1065, past the check below
+    assert allocator.renew_lease('busy_client') == 1065.0
+    clock[0] = 1045.0
+    reclaimed = allocator.reclaim_expired()
+
+    assert reclaimed == [('idle_client', '10.8.0.2')]
+    assert expired == ['idle_client']
+    assert allocator.get_client_ip('idle_client') is None
+    assert allocator.get_client_ip('busy_client') == '10.8.0.3'
+    assert allocator.get_stats()['available'] == 252
+
+    # renew_lease only applies to clients that hold a lease
+    assert allocator.renew_lease('busy_client') == 1075.0
+    assert allocator.renew_lease('idle_client') is None
+
+    # busy_client is reclaimed once its renewed lease runs out
+    clock[0] = 1085.0
+    assert allocator.reclaim_expired() == [('busy_client', '10.8.0.3')]
+
+
+def test_reconnecting_client_gets_previous_ip(tmp_path):
+    """Test the sticky reuse cache"""
+    allocator = IPAllocator(db_path=str(tmp_path / 'ip_pool.json'), sticky_cache_size=1)
+
+    assert allocator.allocate_ip('client_a') == '10.8.0.2'
+    assert allocator.allocate_ip('client_b') == '10.8.0.3'
+    allocator.release_ip('client_a')
+
+    # New clients skip the remembered address, client_a gets it back
+    assert allocator.allocate_ip('client_c') == '10.8.0.4'
+    assert allocator.allocate_ip('client_a') == '10.8.0.2'
+    assert allocator.get_stats()['sticky_reuse_hits'] == 1
+
+    # With room for one entry, releasing client_b evicts client_c's memory
+    allocator.release_ip('client_c')
+    allocator.release_ip('client_b')
+    assert allocator.allocate_ip('client_d') == '10.8.0.4'
+    assert allocator.allocate_ip('client_b') == '10.8.0.3'
+
+
+def test_full_sticky_cache_evicts_least_recently_released(tmp_path):
+    """Test a new client takes the oldest remembered address, not the lowest"""
+    allocator = IPAllocator(db_path=str(tmp_path / 'ip_pool.json'),
+                            subnet='10.9.4.0/29', sticky_cache_size=8)
+    clients = [f'client_{i}' for i in range(5)]  # fills 10.9.4.2 - .6
+    for client_id in clients:
+        allocator.allocate_ip(client_id)
+
+    # Released highest first, so the lowest suffix is the newest memory
+    for client_id in reversed(clients):
+        allocator.release_ip(client_id)
+
+    assert allocator.allocate_ip('newcomer') == '10.9.4.6'
+    assert allocator.allocate_ip('client_0') == '10.9.4.2'
+    assert allocator.allocate_ip('client_4') != '10.9.4.6'
+
+
+def test_allocate_from_custom_subnet(tmp_path):
+    """Test allocation from a non-default subnet"""
+    allocator = IPAllocator(db_path=str(tmp_path / 'ip_pool.json'), subnet='10.9.4.0/24')
+
+    assert allocator.allocate_ip('client_a') == '10.9.4.2'
+    assert allocator.release_ip('client_a') == True
+    assert allocator.get_stats()['subnet'] == '10.9.4.0/24'
+
+
 if __name__ == '__main__':
     pytest.main([__file__, '-v'])
\ No newline at end of file
@@ -0,0 +1,61 @@
+"""
+Unit tests for the raw public-key store
+"""
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.key_store import KeyStore, intern_key, encode_key, decode_key
+from src.peer_config import PeerConfigGenerator
+from src.tunnel_manager import TunnelManager
+from src.utils import generate_keypair
+
+
+def test_keys_stored_raw_and_indexed():
+    """Test keys are held as 32 bytes and found by public key"""
+    _, public_key = generate_keypair()
+    store = KeyStore()
+    store.set('client_001', public_key)
+
+    assert store.get_raw('client_001') == decode_key(public_key)
+    assert len(store.get_raw('client_001')) == 32
+    assert store.get('client_001') == public_key
+    assert store.find_client(public_key) == 'client_001'
+    assert store.find_client(decode_key(public_key)) == 'client_001'
+
+    # Replacing a key drops the old reverse entry
+    _, new_key = generate_keypair()
+    store.set('client_001', new_key)
+    assert store.find_client(public_key) is None
+    assert store.remove('client_001')
+    assert store.find_client(new_key) is None
+
+    # Invalid keys are kept as text
+    assert intern_key('dummy_key') == 'dummy_key'
+    assert encode_key(intern_key('dummy_key')) == 'dummy_key'
+
+
+def test_handshake_lookup(tmp_path):
+    """Test mapping a public key back to its client"""
+    generator = PeerConfigGenerator(keys_dir=str(tmp_path / 'keys'))
+    config = generator.generate_client_config('client_001', '10.8.0.2')
+    assert f"PrivateKey = {config['private_key']}" in config['config_content']
+
+    # A fresh generator finds the stored key on the first miss
+    reloaded = PeerConfigGenerator(keys_dir=str(tmp_path / 'keys'))
+    assert reloaded.find_client_by_public_key(config['public_key']) == 'client_001'
+
+    manager = TunnelManager(config_dir=str(tmp_path / 'config'))
+    manager.add_peer('client_001', config['public_key'], '10.8.0.2/32')
+    peer = manager.find_peer_by_public_key(config['public_key'])
+    assert peer['public_key'] == config['public_key']
+
+    reloaded = TunnelManager(config_dir=str(tmp_path / 'config'))
+    assert reloaded.find_peer_by_public_key(config['public_key'])['client_id'] == 'client_001'
+    assert reloaded.peers['client_001'].public_key == decode_key(config['public_key'])
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,88 @@
+"""
+Unit tests for the State Reconciler
+"""
+import pytest
+import ipaddress
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.ip_allocator import IPAllocator
+from src.tunnel_manager import TunnelManager
+from src.peer_config import PeerConfigGenerator
+from src.reconciler import StateReconciler
+
+
+def make_stores(tmp_path):
+    allocator = IPAllocator(db_path=str(tmp_path / 'ip_pool.json'))
+    manager = TunnelManager(config_dir=str(tmp_path / 'config'))
+    generator = PeerConfigGenerator(keys_dir=str(tmp_path / 'keys'))
+    return allocator, manager, generator
+
+
+def register(allocator, manager, generator, client_id):
+    ip = allocator.allocate_ip(client_id)
+    config = generator.generate_client_config(client_id, ip)
+    manager.add_peer(client_id, config['public_key'], f'{ip}/32')
+    return config['public_key']
+
+
+def test_consistent_state_has_no_drift(tmp_path):
+    """Test a clean registration reports no drift"""
+    stores = make_stores(tmp_path)
+    register(*stores, 'client_ok')
+
+    report = StateReconciler(*stores).reconcile()
+    assert report['drift'] == False
+    assert report['allocations'] == 1
+
+
+def test_drift_is_repaired(tmp_path):
+    """Test every kind of drift is detected and repaired"""
+    allocator, manager, generator = stores = make_stores(tmp_path)
+    register(*stores, 'client_ok')
+
+    # Crash after allocation + keys, before the peer was added
+    ip = allocator.allocate_ip('client_no_peer')
+    public_key = generator.generate_client_config('client_no_peer', ip)['public_key']
+
+    # Crash right after allocation
+    allocator.allocate_ip('client_no_keys')
+
+    # Peer left behind after its IP was released
+    manager.add_peer('client_orphan', 'orphan_key', '10.8.0.200/32')
+
+    # Peer pointing at the wrong address
+    manager.peers['client_ok'].ip = int(ipaddress.IPv4Address('10.8.0.99'))
+
+    reconciler = StateReconciler(*stores)
+    report = reconciler.reconcile()
+
+    assert report['missing_peers'] == ['client_no_peer']
+    assert report['incomplete_allocations'] == ['client_no_keys']
+    assert report['orphan_peers'] == ['client_orphan']
+    assert report['stale_peer_ips'] == ['client_ok']
+    assert report['repaired'] == True
+
+    peers = {p['client_id']: p for p in manager.list_peers()}
+    assert sorted(peers) == ['client_no_peer', 'client_ok']
+    assert peers['client_ok']['allowed_ip'] == '10.8.0.2/32'
+    assert peers['client_no_peer']['public_key'] == public_key
+    assert allocator.get_client_ip('client_no_keys') is None
+
+    assert reconciler.reconcile()['drift'] == False
+
+
+def test_add_peer_is_idempotent(tmp_path):
+    """Test retried add_peer does not duplicate"""
+    _, manager, _ = make_stores(tmp_path)
+
+    manager.add_peer('client_1', 'key_1', '10.8.0.2/32')
+    manager.add_peer('client_1', 'key_1', '10.8.0.2/32')
+
+    assert len(manager.list_peers()) == 1
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
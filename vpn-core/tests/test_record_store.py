@@ -0,0 +1,72 @@
+"""
+Unit tests for the compact binary record store
+"""
+import pytest
+import base64
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.record_store import (
+    RecordFile, write_records, export_json, import_json,
+    KIND_PEERS, KIND_ALLOCATIONS, PEER_RECORD
+)
+from src.utils import save_json, load_json
+
+
+def make_peer(i):
+    return {
+        'client_id': f'client_{i}',
+        'public_key': base64.b64encode(bytes([i % 256]) * 32).decode('utf-8'),
+        'allowed_ip': f'10.8.{i // 250}.{i % 250 + 2}/32',
+        'added_at': '2025-12-07T14:16:03.971002',
+        'status': 'active'
+    }
+
+
+def test_random_access_by_index(tmp_path):
+    """Test records are fixed width and readable by index"""
+    path = str(tmp_path / 'peers.bin')
+    peers = [make_peer(i) for i in range(1000)]
+    write_records(path, KIND_PEERS, peers)
+
+    assert os.path.getsize(path) == 16 + 1000 * PEER_RECORD.size
+    with RecordFile(path) as records:
+        assert len(records) == 1000
+        assert records[0] == peers[0]
+        assert records[737] == peers[737]
+        assert records[-1] == peers[-1]
+        with pytest.raises(IndexError):
+            records[1000]
+
+
+def test_json_round_trip(tmp_path):
+    """Test export/import of peers.json and TinyDB ip_pool.json"""
+    save_json(str(tmp_path / 'peers.json'), {
+        'active_peers': [make_peer(1)], 'tunnel_status': 'active'
+    })
+    save_json(str(tmp_path / 'ip_pool.json'), {
+        '_default': {'1': {'available_ips': list(range(3, 255))}},
+        'allocations': {'1': {
+            'client_id': 'client_1', 'client_name': 'Laptop',
+            'ip_address': '10.8.0.2', 'allocated_at': '2025-12-07T14:16:03.813732',
+            'status': 'active'
+        }}
+    })
+
+    export_json(KIND_PEERS, str(tmp_path / 'peers.json'), str(tmp_path / 'peers.bin'))
+    export_json(KIND_ALLOCATIONS, str(tmp_path / 'ip_pool.json'), str(tmp_path / 'alloc.bin'))
+    import_json(KIND_PEERS, str(tmp_path / 'peers.bin'), str(tmp_path / 'peers2.json'))
+    import_json(KIND_ALLOCATIONS, str(tmp_path / 'alloc.bin'), str(tmp_path / 'pool2.json'))
+
+    assert load_json(str(tmp_path / 'peers2.json'))['active_peers'] == [make_peer(1)]
+    assert load_json(str(tmp_path / 'pool2.json')) == load_json(str(tmp_path / 'ip_pool.json'))
+
+    # Wrong kind is rejected
+    with pytest.raises(ValueError):
+        import_json(KIND_PEERS, str(tmp_path / 'alloc.bin'), str(tmp_path / 'x.json'))
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
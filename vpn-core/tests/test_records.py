@@ -0,0 +1,63 @@
+"""
+Unit tests for compact peer and allocation records
+"""
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.records import Peer, Allocation
+from src.tunnel_manager import TunnelManager
+from src.ip_allocator import IPAllocator
+
+
+def test_records_round_trip_api_layout():
+    """Test records convert back to the same dicts at the API boundary"""
+    peer = {
+        'client_id': 'client_001',
+        'public_key': 'a' * 43 + '=',
+        'allowed_ip': '10.8.0.2/32',
+        'added_at': '2025-01-01T12:00:00.123456',
+        'status': 'active'
+    }
+    assert Peer.from_dict(peer).to_dict() == peer
+    assert Peer.from_tuple(Peer.from_dict(peer).to_tuple()).to_dict() == peer
+
+    allocation = {
+        'client_id': 'client_001',
+        'client_name': 'Laptop',
+        'ip_address': '10.8.0.2',
+        'allocated_at': '2025-01-01T12:00:00.123456',
+        'status': 'active'
+    }
+    assert Allocation.from_dict(allocation).to_dict() == allocation
+
+    # Slotted records carry no per-instance dict
+    assert not hasattr(Peer.from_dict(peer), '__dict__')
+
+
+def test_stores_reload_records(tmp_path):
+    """Test peers and allocations survive a restart as records"""
+    manager = TunnelManager(config_dir=str(tmp_path))
+    manager.add_peer('client_001', 'key1', '10.8.0.2/32')
+    manager.add_peer('client_001', 'key2', '10.8.0.2/32')
+
+    reloaded = TunnelManager(config_dir=str(tmp_path))
+    assert reloaded.list_peers() == manager.list_peers()
+    assert reloaded.get_peer('client_001')['public_key'] == 'key2'
+
+    db_path = str(tmp_path / 'ip_pool.json')
+    allocator = IPAllocator(db_path=db_path)
+    ip = allocator.allocate_ip('client_001', 'Laptop')
+    allocator.allocate_ip('client_002')
+    allocator.release_ip('client_002')
+
+    reloaded = IPAllocator(db_path=db_path)
+    assert reloaded.get_client_ip('client_001') == ip
+    assert reloaded.list_allocations() == allocator.list_allocations()
+    assert reloaded.get_stats()['allocated'] == 1
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,103 @@
+"""
+Unit tests for the API's cached GET responses
+"""
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import api.app as api_app
+from src.vpn_server import VPNServer
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    """Test client for an app serving a server in tmp_path, with an empty cache"""
+    server = VPNServer(data_dir=str(tmp_path), warm_up=False)
+    monkeypatch.setattr(api_app, 'vpn_server', server)
+    monkeypatch.setattr(api_app, '_response_cache', {})
+    monkeypatch.setattr(api_app.admission, 'enabled', False)
+    return api_app.app.test_client()
+
+
+def count_calls(monkeypatch, obj, name):
+    """Wrap obj.name to count calls; returns the list calls are appended to"""
+    calls = []
+    method = getattr(obj, name)
+
+    def counted(*args, **kwargs):
+        calls.append(1)
+        return method(*args, **kwargs)
+    monkeypatch.setattr(obj, name, counted)
+    return calls
+
+
+def test_repeat_get_served_from_cache(client, monkeypatch):
+    """Test an unchanged state serves the stored body without rebuilding it"""
+    builds = count_calls(monkeypatch, api_app.vpn_server.tunnel_manager, 'list_peers')
+    first = client.get('/api/peer/list')
+    second = client.get('/api/peer/list')
+    assert first.status_code == second.status_code == 200
+    assert second.get_data() == first.get_data()
+    assert second.get_json() == {'peers': [], 'count': 0}
+    assert len(builds) == 1
+
+
+def test_state_change_invalidates(client):
+    """Test registering and unregistering make the next GET fresh"""
+    assert client.get('/api/peer/list').get_json()['count'] == 0
+
+    response = client.post('/api/client/register', json={'client_id': 'client_001'})
+    assert response.status_code == 200
+    peers = client.get('/api/peer/list').get_json()
+    assert [peer['client_id'] for peer in peers['peers']] == ['client_001']
+    allocations = client.get('/api/ip/list').get_json()
+    assert allocations['count'] == 1
+
+    response = client.post('/api/client/unregister', json={'client_id': 'client_001'})
+    assert response.status_code == 200
+    assert client.get('/api/peer/list').get_json()['count'] == 0
+    assert client.get('/api/ip/list').get_json()['count'] == 0
+
+
+def test_max_age_expires(client, monkeypatch):
+    """Test time-based responses are rebuilt after max_age even without changes"""
+    now = [1000.0]
+    monkeypatch.setattr(api_app.time, 'monotonic', lambda: now[0])
+    builds = count_calls(monkeypatch, api_app.vpn_server.ip_allocator, 'get_stats')
+
+    client.get('/api/ip/stats')
+    now[0] += 0.5
+    client.get('/api/ip/stats')
+    assert len(builds) == 1
+
+    now[0] += 0.6
+    client.get('/api/ip/stats')
+    assert len(builds) == 2
+
+
+def test_keyed_by_view_not_query(client, monkeypatch):
+    """Test query strings share their view's entry and views do not share"""
+    builds = count_calls(monkeypatch, api_app.vpn_server.tunnel_manager, 'list_peers')
+    first = client.get('/api/peer/list?page=1')
+    second = client.get('/api/peer/list?page=2')
+    assert second.get_data() == first.get_data()
+    assert len(builds) == 1
+
+    allocations = client.get('/api/ip/list').get_json()
+    assert allocations == {'allocations': [], 'count': 0}
+    assert set(api_app._response_cache) == {'list_peers', 'list_ips'}
+
+
+def test_errors_not_cached(client, monkeypatch):
+    """Test error responses are never stored"""
+    def fail():
+        raise RuntimeError('store unavailable')
+    monkeypatch.setattr(api_app.vpn_server.tunnel_manager, 'list_peers', fail)
+    assert client.get('/api/peer/list').status_code == 500
+    assert 'list_peers' not in api_app._response_cache
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,111 @@
+"""
+Unit tests for the Shard Coordinator and its consistent-hash ring
+"""
+import pytest
+import sys
+import os
+import ipaddress
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.shard_coordinator import HashRing, ShardCoordinator
+
+
+def test_keys_are_spread_over_nodes():
+    """Test every node owns a share of the keys"""
+    ring = HashRing()
+    for node in ['shard_a', 'shard_b', 'shard_c']:
+        ring.add_node(node)
+
+    owners = [ring.get_node(f'client_{i}') for i in range(3000)]
+    for node in ['shard_a', 'shard_b', 'shard_c']:
+        assert owners.count(node) > 500
+
+
+def test_adding_node_only_moves_keys_to_it():
+    """Test minimal movement when a shard is added"""
+    ring = HashRing()
+    ring.add_node('shard_a')
+    ring.add_node('shard_b')
+    before = {f'client_{i}': ring.get_node(f'client_{i}') for i in range(2000)}
+
+    ring.add_node('shard_c')
+    moved = [key for key, node in before.items() if ring.get_node(key) != node]
+
+    assert all(ring.get_node(key) == 'shard_c' for key in moved)
+    assert len(moved) < len(before) / 2
+
+    # Removing the node restores the original assignment
+    ring.remove_node('shard_c')
+    assert all(ring.get_node(key) == node for key, node in before.items())
+
+
+def test_shard_subnets_survive_restart(tmp_path):
+    """Test a shard gets the same subnet from a new coordinator"""
+    coordinator = ShardCoordinator(base_dir=str(tmp_path), supernet='10.9.0.0/22')
+    assert coordinator.assign_subnet('shard_a') == '10.9.0.0/24'
+    assert coordinator.assign_subnet('shard_b', '10.9.2.0/24') == '10.9.2.0/24'
+
+    # Names come back in any order; new shards skip subnets already taken
+    restarted = ShardCoordinator(base_dir=str(tmp_path), supernet='10.9.0.0/22')
+    assert restarted.assign_subnet('shard_c') == '10.9.1.0/24'
+    assert restarted.assign_subnet('shard_b') == '10.9.2.0/24'
+    assert restarted.assign_subnet('shard_a') == '10.9.0.0/24'
+
+
+@pytest.fixture
+def coordinator(tmp_path):
+    coordinator = ShardCoordinator(base_dir=str(tmp_path), supernet='10.9.0.0/22')
+    yield coordinator
+    coordinator.shutdown()
+
+
+def test_shard_calls_are_checked_and_errors_returned(coordinator):
+    """Test the RPC allowlist and that shard exceptions reach the caller"""
+    coordinator.add_shard('shard_a')
+    shard = coordinator.shards['shard_a']
+
+    with pytest.raises(ValueError):
+        shard.call('tunnel_manager.set_peers', [])
+    with pytest.raises(ValueError):
+        shard.call('__class__')
+
+    with pytest.raises(Exception, match='Shard shard_a'):
+        shard.call('ip_allocator.get_stats', 'unexpected argument')
+
+    # The pipe is still in step after an error
+    assert shard.call('ip_allocator.get_stats')['subnet'] == '10.9.0.0/24'
+    assert coordinator.register_client('client_001')['shard'] == 'shard_a'
+
+
+def test_rebalance_moves_clients_to_their_owner(coordinator):
+    """Test every client ends up on its ring owner exactly once"""
+    coordinator.add_shard('shard_a')
+    client_ids = [f'client_{i:03d}' for i in range(30)]
+    for client_id in client_ids:
+        assert coordinator.register_client(client_id)['success']
+
+    moved = coordinator.add_shard('shard_b')
+    owners = {client_id: coordinator.ring.get_node(client_id) for client_id in client_ids}
+    assert sorted(moved) == sorted(
+        (client_id, 'shard_a', 'shard_b') for client_id, owner in owners.items() if owner == 'shard_b'
+    )
+    assert 0 < len(moved) < len(client_ids)
+
+    placed = []
+    for name, shard in coordinator.shards.items():
+        subnet = ipaddress.ip_network(shard.subnet)
+        for allocation in shard.call('ip_allocator.list_allocations'):
+            placed.append(allocation['client_id'])
+            assert owners[allocation['client_id']] == name
+            assert ipaddress.ip_address(allocation['ip_address']) in subnet
+    assert sorted(placed) == client_ids
+
+    # Nothing left to move
+    assert coordinator.rebalance() == []
+    status = coordinator.get_status()
+    assert status['shards'] == 2 and status['allocated'] == len(client_ids)
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
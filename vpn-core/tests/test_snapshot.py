@@ -0,0 +1,44 @@
+"""
+Unit tests for binary state snapshots
+"""
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.snapshot import read_snapshot, write_snapshot
+from src.tunnel_manager import TunnelManager
+
+
+def test_snapshot_round_trip_and_staleness(tmp_path):
+    """Test snapshots load only while they match their source file"""
+    source = tmp_path / 'peers.json'
+    snapshot = tmp_path / 'peers.snapshot'
+    source.write_text('{"active_peers": []}')
+
+    data = {'active_peers': [{'client_id': 'c1', 'allowed_ip': '10.8.0.2/32'}]}
+    assert write_snapshot(str(snapshot), str(source), data)
+    assert read_snapshot(str(snapshot), str(source)) == data
+
+    # Editing the source invalidates the snapshot
+    source.write_text('{"active_peers": [], "tunnel_status": "active"}')
+    assert read_snapshot(str(snapshot), str(source)) is None
+
+    # Corrupt snapshots are ignored
+    snapshot.write_bytes(b'garbage')
+    assert read_snapshot(str(snapshot), str(source)) is None
+
+
+def test_tunnel_manager_loads_from_snapshot(tmp_path):
+    """Test TunnelManager state survives a reload via the snapshot"""
+    manager = TunnelManager(config_dir=str(tmp_path))
+    manager.add_peer('client_1', 'key_1', '10.8.0.2/32')
+
+    assert os.path.exists(manager.snapshot_file)
+    reloaded = TunnelManager(config_dir=str(tmp_path))
+    assert reloaded.get_peer('client_1')['public_key'] == 'key_1'
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,35 @@
+"""
+Unit tests for the state version used to invalidate cached API responses
+"""
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.vpn_server import VPNServer
+
+
+def test_state_version_tracks_changes(tmp_path):
+    """Test every state change moves the version and reads do not"""
+    server = VPNServer(data_dir=str(tmp_path), warm_up=False)
+    assert server.state_version == 0  # nothing loaded yet
+
+    server.tunnel_manager.list_peers()
+    server.ip_allocator.get_stats()
+    version = server.state_version
+    server.get_status()
+    assert server.state_version == version
+
+    versions = [version]
+    server.register_client('client_001')
+    versions.append(server.state_version)
+    server.start()
+    versions.append(server.state_version)
+    server.unregister_client('client_001')
+    versions.append(server.state_version)
+    assert versions == sorted(set(versions))
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,88 @@
+"""
+Unit tests for VPN Server startup
+"""
+import pytest
+import sys
+import os
+import threading
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.vpn_server import VPNServer
+
+
+def _warm_up_threads():
+    return [t for t in threading.enumerate() if t.name == 'vpn-warm-up']
+
+
+def test_importing_api_does_not_warm_up():
+    """Test importing the API app starts no background work"""
+    from api.app import vpn_server
+    assert not vpn_server._warm_up_started
+    assert not _warm_up_threads()
+
+
+def test_warm_up_starts_once(tmp_path, monkeypatch):
+    """Test start_warm_up runs the startup checks a single time"""
+    server = VPNServer(data_dir=str(tmp_path), warm_up=False)
+    calls = []
+    monkeypatch.setattr(server, '_warm_up', lambda: calls.append(1))
+
+    server.start_warm_up()
+    server.start_warm_up()
+    for thread in _warm_up_threads():
+        thread.join(timeout=5)
+    assert calls == [1]
+
+
+def _leasing_server(tmp_path):
+    server = VPNServer(data_dir=str(tmp_path), warm_up=False)
+    server.config['ip_pool'] = dict(
+        server.config.get('ip_pool', {}),
+        lease_ttl=60, lease_grace_period=0, lease_reclaim_interval=3600
+    )
+    return server
+
+
+def test_lease_expiry_does_not_remove_new_registration(tmp_path):
+    """Test a client registering while its old lease is reclaimed keeps its peer"""
+    server = _leasing_server(tmp_path)
+    assert server.register_client('client_001')['success']
+    allocator = server.ip_allocator
+
+    # Register again in the gap between releasing the IP and removing the peer
+    registered = []
+    remove_expired_peer = allocator.on_lease_expired
+
+    def on_lease_expired(client_id, ip_address):
+        thread = threading.Thread(
+            target=lambda: registered.append(server.register_client('client_001'))
+        )
+        thread.start()
+        thread.join(timeout=0.3)  # blocked by the state lock until reclaim is done
+        remove_expired_peer(client_id, ip_address)
+        on_lease_expired.thread = thread
+
+    allocator.on_lease_expired = on_lease_expired
+    reclaimed = server.reclaim_expired_leases(now=time.time() + 120)
+    on_lease_expired.thread.join(timeout=5)
+    allocator.stop_lease_reclaimer()
+
+    assert [client_id for client_id, _ in reclaimed] == ['client_001']
+    assert registered[0]['success']
+    assert allocator.get_client_ip('client_001') == registered[0]['ip_address']
+    assert server.tunnel_manager.get_peer('client_001') is not None
+
+
+def test_late_expiry_callback_keeps_reallocated_peer(tmp_path):
+    """Test the expiry cleanup skips clients that hold an allocation again"""
+    server = _leasing_server(tmp_path)
+    result = server.register_client('client_001')
+    server._on_lease_expired('client_001', result['ip_address'])
+    assert server.tunnel_manager.get_peer('client_001') is not None
+    server.ip_allocator.stop_lease_reclaimer()
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
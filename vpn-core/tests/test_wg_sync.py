@@ -0,0 +1,65 @@
+"""
+Unit tests for the WireGuard interface sync engine
+"""
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.wg_sync import InterfaceSync, FakeBackend
+from src.tunnel_manager import TunnelManager
+
+
+def test_sync_applies_only_the_diff():
+    """Test full sync sends only changed peers"""
+    backend = FakeBackend()
+    backend.interfaces['wg0'] = {'key_a': '10.8.0.2/32', 'key_b': '10.8.0.3/32'}
+    sync = InterfaceSync(backend, 'wg0')
+
+    added, removed = sync.sync({'key_a': '10.8.0.2/32', 'key_c': '10.8.0.4/32'})
+
+    assert (added, removed) == (1, 1)
+    assert backend.interfaces['wg0'] == {'key_a': '10.8.0.2/32', 'key_c': '10.8.0.4/32'}
+    assert len(backend.batches) == 1
+
+
+def test_incremental_changes_are_batched():
+    """Test queued changes go out in one batch and no-ops are dropped"""
+    backend = FakeBackend()
+    backend.interfaces['wg0'] = {f'key_{i}': f'10.8.{i // 250}.{i % 250}/32' for i in range(10000)}
+    sync = InterfaceSync(backend, 'wg0')
+
+    sync.set_peer('new_key', '10.9.0.2/32')
+    sync.set_peer('key_1', '10.8.0.1/32')  # already present, nothing to do
+    sync.remove_peer('missing_key')        # not present, nothing to do
+    sync.remove_peer('key_2')
+
+    assert sync.flush() == (1, 1)
+    _, upserts, removals = backend.batches[-1]
+    assert upserts == {'new_key': '10.9.0.2/32'}
+    assert removals == {'key_2'}
+    assert sync.flush() == (0, 0)
+
+
+def test_tunnel_manager_programs_interface(tmp_path):
+    """Test TunnelManager pushes peers only while the tunnel is active"""
+    backend = FakeBackend()
+    manager = TunnelManager(config_dir=str(tmp_path), sync_engine=InterfaceSync(backend, 'wg0'))
+
+    manager.add_peer('client_1', 'key_1', '10.8.0.2/32')
+    assert backend.interfaces == {}
+
+    manager.start_tunnel()
+    manager.add_peer('client_2', 'key_2', '10.8.0.3/32')
+    assert backend.interfaces['wg0'] == {'key_1': '10.8.0.2/32', 'key_2': '10.8.0.3/32'}
+
+    manager.remove_peer('client_1')
+    assert backend.interfaces['wg0'] == {'key_2': '10.8.0.3/32'}
+
+    manager.stop_tunnel()
+    assert backend.interfaces['wg0'] == {}
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])